@@ -0,0 +1,117 @@
+"""Compare two sets of benchmark results
+
+    $ python examples/benchmarking/compare.py baseline.json candidate.json --threshold 0.1
+
+lists, for each configuration present in both sets of results written by
+:mod:`examples.benchmarking.suite`, the fastest time of each phase of a
+step before and after, and flags those that grew by more than the
+threshold fraction. The exit status is 1 if any phase regressed, so the
+comparison can gate an upgrade of :term:`FiPy`.
+
+    >>> def results(step, solve):
+    ...     phases = dict(step=dict(min=step, mean=step),
+    ...                   solve=dict(min=solve, mean=solve))
+    ...     return dict(results=[dict(scenario="diffusion", mesh="uniform",
+    ...                               cells=100, phases=phases)])
+    >>> for row in compare(results(1.0, 0.5), results(1.05, 0.8), threshold=0.1):
+    ...     print(row["phase"], "%.2f" % row["ratio"], row["regression"])
+    step 1.05 False
+    solve 1.60 True
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+import argparse
+import json
+import sys
+
+__all__ = ["compare"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+# phases in the order they are reported
+_phases = ["step", "assembly", "evaluation", "setup", "solve"]
+
+def _key(result):
+    return (result["scenario"], result["mesh"], result["cells"])
+
+def compare(baseline, candidate, threshold=0.1, statistic="min"):
+    """Compare each phase of each configuration in two sets of results
+
+    Parameters
+    ----------
+    baseline, candidate : dict
+        Results written by :mod:`examples.benchmarking.suite`.
+    threshold : float
+        Fractional growth in time beyond which a phase is a regression.
+    statistic : {'min', 'mean'}
+        Which time of the repeated runs to compare.
+
+    Returns
+    -------
+    list of dict
+        For each phase of each configuration in both sets of results, the
+        `scenario`, `mesh`, `cells`, `phase`, the `baseline` and
+        `candidate` times, their `ratio`, and whether it is a
+        `regression`.
+    """
+    candidates = dict((_key(result), result) for result in candidate["results"])
+    rows = []
+    for result in baseline["results"]:
+        other = candidates.get(_key(result))
+        if other is None:
+            continue
+        for phase in _phases:
+            if phase not in result["phases"] or phase not in other["phases"]:
+                continue
+            before = result["phases"][phase][statistic]
+            after = other["phases"][phase][statistic]
+            if before > 0:
+                ratio = after / before
+            else:
+                ratio = float('inf') if after > 0 else 1.
+            rows.append(dict(scenario=result["scenario"],
+                             mesh=result["mesh"],
+                             cells=result["cells"],
+                             phase=phase,
+                             baseline=before,
+                             candidate=after,
+                             ratio=ratio,
+                             regression=ratio > 1 + threshold))
+    return rows
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two sets of FiPy benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="fractional slow down that counts as a regression")
+    parser.add_argument("--statistic", choices=["min", "mean"], default="min")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.candidate, 'r') as f:
+        candidate = json.load(f)
+
+    print("baseline:  FiPy %s" % baseline["environment"]["fipy"])
+    print("candidate: FiPy %s" % candidate["environment"]["fipy"])
+    print("%-14s %-12s %8s %-10s %12s %12s %7s"
+          % ("scenario", "mesh", "cells", "phase", "baseline [s]", "candidate [s]", "ratio"))
+    rows = compare(baseline, candidate, threshold=args.threshold, statistic=args.statistic)
+    for row in rows:
+        print("%-14s %-12s %8d %-10s %12.4g %12.4g %7.2f%s"
+              % (row["scenario"], row["mesh"], row["cells"], row["phase"],
+                 row["baseline"], row["candidate"], row["ratio"],
+                 "  REGRESSION" if row["regression"] else ""))
+
+    return 1 if any(row["regression"] for row in rows) else 0
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    sys.exit(_main())
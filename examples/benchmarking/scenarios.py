@@ -0,0 +1,259 @@
+"""Named problems for benchmarking :term:`FiPy`
+
+Each scenario builds one kind of problem on a mesh and returns a function
+that takes one time step. The meshes are all of a unit square, with about
+the requested number of cells:
+
+`uniform`
+    a :class:`~fipy.meshes.factoryMeshes.Grid2D` of square cells,
+`nonuniform`
+    a :class:`~fipy.meshes.factoryMeshes.Grid2D` whose cells grow
+    geometrically in each direction, and
+`gmsh`
+    a :class:`~fipy.meshes.gmshMesh.Gmsh2D` of triangles, which requires
+    :term:`Gmsh`.
+
+:func:`runScenario` times the steps with an
+:class:`~fipy.tools.instrumentation.Instrumentation`, separating the time
+spent building the matrices of the terms, evaluating variables and
+solving, e.g.,
+
+    >>> result = runScenario("diffusion", "uniform", cells=100, steps=2)
+    >>> print(result["cells"])
+    100
+    >>> print(sorted(result["phases"].keys()))
+    ['assembly', 'evaluation', 'setup', 'solve', 'step']
+    >>> print(result["phases"]["step"] >= result["phases"]["solve"])
+    True
+
+Every scenario runs on every mesh
+
+    >>> for name in sorted(scenarios):
+    ...     result = runScenario(name, "nonuniform", cells=100, steps=1)
+    ...     print(name, result["solves"] > 0)
+    cahnHilliard True
+    convection True
+    coupled True
+    diffusion True
+    levelSet True
+"""
+from __future__ import division
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+import time
+
+from fipy import (CellVariable, DistanceVariable, Grid2D, Gmsh2D,
+                  TransientTerm, DiffusionTerm, ImplicitSourceTerm,
+                  ExponentialConvectionTerm, AdvectionTerm,
+                  GaussianNoiseVariable)
+from fipy.tools import numerix
+from fipy.tools.instrumentation import Instrumentation
+
+__all__ = ["meshes", "scenarios", "runScenario"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+def _uniform(cells):
+    n = max(int(round(numerix.sqrt(cells))), 2)
+    return Grid2D(nx=n, ny=n, dx=1. / n, dy=1. / n)
+
+def _nonuniform(cells):
+    n = max(int(round(numerix.sqrt(cells))), 2)
+    # the largest cell is ten times the smallest
+    d = (10.)**(numerix.arange(n) / (n - 1.))
+    d /= d.sum()
+    return Grid2D(dx=d, dy=d[::-1])
+
+def _gmsh(cells):
+    # a unit square holds about two triangles per cellSize**2
+    cellSize = numerix.sqrt(2. / cells)
+    return Gmsh2D('''
+        cellSize = %(cellSize)g;
+        Point(1) = {0, 0, 0, cellSize};
+        Point(2) = {1, 0, 0, cellSize};
+        Point(3) = {1, 1, 0, cellSize};
+        Point(4) = {0, 1, 0, cellSize};
+        Line(5) = {1, 2};
+        Line(6) = {2, 3};
+        Line(7) = {3, 4};
+        Line(8) = {4, 1};
+        Line Loop(9) = {5, 6, 7, 8};
+        Plane Surface(10) = {9};
+    ''' % locals())
+
+def _gmshAvailable():
+    from fipy.meshes.gmshMesh import gmshVersion
+    return gmshVersion() is not None
+
+# each mesh, with a test of whether it can be built here
+meshes = {
+    "uniform": (_uniform, lambda: True),
+    "nonuniform": (_nonuniform, lambda: True),
+    "gmsh": (_gmsh, _gmshAvailable)
+}
+
+def _diffusion(mesh):
+    phi = CellVariable(mesh=mesh, hasOld=True)
+    phi.constrain(1., where=mesh.facesLeft)
+    phi.constrain(0., where=mesh.facesRight)
+    eq = TransientTerm() == DiffusionTerm(coeff=1. + phi**2)
+    dt = 0.1
+
+    def step():
+        phi.updateOld()
+        for sweep in range(2):
+            eq.sweep(var=phi, dt=dt)
+    return step
+
+def _convection(mesh):
+    phi = CellVariable(mesh=mesh, hasOld=True)
+    phi.constrain(1., where=mesh.facesLeft)
+    phi.constrain(0., where=mesh.facesRight)
+    eq = (TransientTerm()
+          == DiffusionTerm(coeff=0.01)
+          - ExponentialConvectionTerm(coeff=(1., 0.5)))
+    dt = 0.01
+
+    def step():
+        phi.updateOld()
+        eq.solve(var=phi, dt=dt)
+    return step
+
+def _coupled(mesh):
+    v0 = CellVariable(mesh=mesh, hasOld=True)
+    v1 = CellVariable(mesh=mesh, hasOld=True)
+    v0.constrain(1., where=mesh.facesLeft)
+    v1.constrain(1., where=mesh.facesRight)
+    eq0 = (TransientTerm(var=v0) == DiffusionTerm(coeff=1., var=v0)
+           - ImplicitSourceTerm(coeff=1., var=v0)
+           + ImplicitSourceTerm(coeff=1., var=v1))
+    eq1 = (TransientTerm(var=v1) == DiffusionTerm(coeff=0.1, var=v1)
+           + ImplicitSourceTerm(coeff=1., var=v0)
+           - ImplicitSourceTerm(coeff=1., var=v1))
+    eq = eq0 & eq1
+    dt = 0.1
+
+    def step():
+        v0.updateOld()
+        v1.updateOld()
+        eq.solve(dt=dt)
+    return step
+
+def _levelSet(mesh):
+    x, y = mesh.cellCenters
+    distance = DistanceVariable(mesh=mesh, hasOld=True,
+                                value=numerix.sqrt((x - 0.5)**2 + (y - 0.5)**2) - 0.25)
+    # the circle grows at unit speed
+    eq = TransientTerm() + AdvectionTerm(coeff=1.)
+    # a CFL number of 0.1 on the smallest cells
+    dt = 0.1 * numerix.sqrt(min(mesh.cellVolumes))
+
+    from fipy.variables.distanceVariable import LSM_SOLVER
+
+    def step():
+        distance.updateOld()
+        eq.solve(var=distance, dt=dt)
+        if LSM_SOLVER is not None:
+            distance.calcDistanceFunction()
+    return step
+
+def _cahnHilliard(mesh):
+    phi = CellVariable(mesh=mesh, hasOld=True)
+    phi.setValue(GaussianNoiseVariable(mesh=mesh, mean=0.5, variance=0.01))
+    PHI = phi.arithmeticFaceValue
+    epsilon = numerix.sqrt(min(mesh.cellVolumes))
+    eq = (TransientTerm()
+          == DiffusionTerm(coeff=1. - 6. * PHI * (1. - PHI))
+          - DiffusionTerm(coeff=(1., epsilon**2)))
+    dt = 1e-3
+
+    def step():
+        phi.updateOld()
+        eq.solve(var=phi, dt=dt)
+    return step
+
+# each scenario builds its problem on a mesh and returns a function that
+# takes one step
+scenarios = {
+    "diffusion": _diffusion,
+    "convection": _convection,
+    "coupled": _coupled,
+    "levelSet": _levelSet,
+    "cahnHilliard": _cahnHilliard
+}
+
+def runScenario(scenario, mesh, cells, steps=5):
+    """Time `steps` steps of one scenario
+
+    Parameters
+    ----------
+    scenario : str
+        Key of :data:`scenarios`.
+    mesh : str
+        Key of :data:`meshes`.
+    cells : int
+        Approximate number of cells.
+    steps : int
+        Number of time steps to take, after one untimed step that sets
+        up the problem.
+
+    Returns
+    -------
+    dict
+        The actual number of `cells`, the time to build the mesh and
+        problem, `setup`, the total number of `solves` and `iterations`,
+        where the solver reports them, and the mean `phases` of a step, in
+        seconds: the whole `step`; the `assembly` of the terms' matrices,
+        excluding the evaluation of their coefficients; the `evaluation`
+        of all variables; the `setup` of the solver, e.g., the building of a
+        preconditioner or the factorization of the matrix; and the
+        `solve` itself.
+    """
+    build, available = meshes[mesh]
+    if not available():
+        raise RuntimeError("the %s mesh cannot be built here" % mesh)
+
+    start = time.time()
+    m = build(cells)
+    step = scenarios[scenario](m)
+    # the first step calculates the geometry and the matrix patterns
+    step()
+    setup = time.time() - start
+
+    instrumentation = Instrumentation()
+    for i in range(steps):
+        with instrumentation:
+            step()
+
+    phases = dict(step=0., assembly=0., evaluation=0., setup=0., solve=0.)
+    solves = 0
+    iterations = 0
+    for record in instrumentation.report():
+        phases["step"] += record["seconds"]
+        phases["assembly"] += sum(term["selfSeconds"] for term in record["terms"].values())
+        phases["evaluation"] += sum(var["selfSeconds"] for var in record["variables"].values())
+        for solve in record["solves"]:
+            solves += 1
+            phases["setup"] += solve["setupSeconds"]
+            phases["solve"] += solve["seconds"] - solve["setupSeconds"]
+            iterations += solve["iterations"] or 0
+
+    for phase in phases:
+        phases[phase] /= steps
+
+    return dict(scenario=scenario,
+                mesh=mesh,
+                cells=int(m.numberOfCells),
+                steps=steps,
+                setup=setup,
+                solves=solves,
+                iterations=iterations,
+                phases=phases)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,169 @@
+"""Run the benchmark scenarios and record the results
+
+    $ python examples/benchmarking/suite.py --scenario diffusion --scenario coupled \\
+    >     --mesh uniform --size 1000 --size 10000 --output results.json
+
+runs each of the named :data:`~examples.benchmarking.scenarios.scenarios`
+on each of the named :data:`~examples.benchmarking.scenarios.meshes`
+at each size, by default all of them at 1000, 10000 and 100000 cells, and
+writes the results, along with the versions of :term:`FiPy` and its
+dependencies and the suite of solvers, as JSON. Meshes that cannot be
+built here, e.g., `gmsh` without :term:`Gmsh`, are skipped. Any other
+arguments, e.g., `--trilinos`, are seen by :term:`FiPy`.
+
+Each configuration is run `--repeat` times, on a fresh mesh and problem,
+and the fastest and mean time of each phase kept. Compare two sets of
+results with :mod:`examples.benchmarking.compare`.
+
+    >>> import io, json
+    >>> stream = io.StringIO()
+    >>> document = runSuite(scenarios=["diffusion"], meshes=["uniform", "gmsh"],
+    ...                     sizes=[100], steps=1, repeat=2)
+    >>> writeResults(document, stream)
+    >>> document = json.loads(stream.getvalue())
+    >>> print(sorted(document["environment"].keys()))
+    ['fipy', 'machine', 'numpy', 'python', 'scipy', 'solvers']
+    >>> result = document["results"][0]
+    >>> print(result["scenario"], result["mesh"], result["cells"], result["repeat"])
+    diffusion uniform 100 2
+    >>> print(sorted(result["phases"]["step"].keys()))
+    ['mean', 'min']
+"""
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+import argparse
+import json
+import platform
+import sys
+import time
+
+__all__ = ["runSuite", "writeResults"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+def _environment():
+    import numpy
+    import fipy
+    import fipy.solvers
+    try:
+        import scipy
+        scipyVersion = scipy.__version__
+    except ImportError:
+        scipyVersion = None
+    return dict(fipy=fipy.__version__,
+                python=platform.python_version(),
+                numpy=numpy.__version__,
+                scipy=scipyVersion,
+                solvers=fipy.solvers.solver,
+                machine=platform.platform())
+
+def _summarize(runs):
+    """Fastest and mean of each phase of repeated runs of one configuration"""
+    summary = dict(runs[0])
+    summary["repeat"] = len(runs)
+    for key in ["setup", "solves", "iterations"]:
+        summary[key] = min(run[key] for run in runs)
+    summary["phases"] = {}
+    for phase in runs[0]["phases"]:
+        times = [run["phases"][phase] for run in runs]
+        summary["phases"][phase] = dict(min=min(times),
+                                        mean=sum(times) / len(times))
+    return summary
+
+def runSuite(scenarios=None, meshes=None, sizes=(1000, 10000, 100000),
+             steps=5, repeat=3, log=None):
+    """Run every combination of scenario, mesh and size
+
+    Parameters
+    ----------
+    scenarios, meshes : list of str
+        Keys of :data:`~examples.benchmarking.scenarios.scenarios` and
+        :data:`~examples.benchmarking.scenarios.meshes`. Default to all of
+        them.
+    sizes : list of int
+        Approximate numbers of cells.
+    steps : int
+        Number of timed steps of each run.
+    repeat : int
+        Number of runs of each configuration.
+    log : file
+        Where to report progress, if anywhere.
+
+    Returns
+    -------
+    dict
+        The `environment` and the `results` of each configuration.
+    """
+    from examples.benchmarking import scenarios as _scenarios
+
+    scenarios = scenarios or sorted(_scenarios.scenarios.keys())
+    meshes = meshes or sorted(_scenarios.meshes.keys())
+
+    results = []
+    for mesh in meshes:
+        build, available = _scenarios.meshes[mesh]
+        if not available():
+            if log is not None:
+                print("skipping %s meshes, which cannot be built here" % mesh, file=log)
+            continue
+        for scenario in scenarios:
+            for size in sizes:
+                runs = [_scenarios.runScenario(scenario, mesh, cells=size, steps=steps)
+                        for i in range(repeat)]
+                summary = _summarize(runs)
+                results.append(summary)
+                if log is not None:
+                    print("%-14s %-12s %8d cells %10.4g s / step"
+                          % (scenario, mesh, summary["cells"],
+                             summary["phases"]["step"]["min"]), file=log)
+
+    return dict(date=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                environment=_environment(),
+                results=results)
+
+def writeResults(document, stream):
+    """Write the results of :func:`runSuite` as JSON to a file name or stream"""
+    if hasattr(stream, 'write'):
+        json.dump(document, stream, indent=1, sort_keys=True)
+    else:
+        with open(stream, 'w') as f:
+            json.dump(document, f, indent=1, sort_keys=True)
+
+def _main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the FiPy benchmark scenarios")
+    parser.add_argument("--scenario", action="append",
+                        help="scenario to run (repeatable; default all)")
+    parser.add_argument("--mesh", action="append",
+                        help="mesh to run on (repeatable; default all)")
+    parser.add_argument("--size", action="append", type=int,
+                        help="approximate number of cells (repeatable)")
+    parser.add_argument("--steps", type=int, default=5,
+                        help="timed steps of each run")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs of each configuration")
+    parser.add_argument("--output", default="-",
+                        help="file for the JSON results (default stdout)")
+    # anything else, e.g., the choice of solvers, is for FiPy
+    args, unknown = parser.parse_known_args(argv)
+
+    document = runSuite(scenarios=args.scenario,
+                        meshes=args.mesh,
+                        sizes=args.size or (1000, 10000, 100000),
+                        steps=args.steps,
+                        repeat=args.repeat,
+                        log=sys.stderr)
+
+    if args.output == "-":
+        writeResults(document, sys.stdout)
+    else:
+        writeResults(document, args.output)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,17 @@
+"""Run all the test cases in examples/benchmarking/
+"""
+from __future__ import unicode_literals
+
+from fipy.tests.doctestPlus import _LateImportDocTestSuite
+import fipy.tests.testProgram
+
+def _suite():
+    return _LateImportDocTestSuite(docTestModuleNames = (
+                                       'scenarios',
+                                       'suite',
+                                       'compare'
+                                   ),
+                                   base = __name__)
+
+if __name__ == '__main__':
+    fipy.tests.testProgram.main(defaultTest='_suite')
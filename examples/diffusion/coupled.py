@@ -114,6 +114,35 @@ concentrations of two conserved species, then it is natural to write two
 separate governing equations and to couple them. If they represent two
 components of a vector field, then the vector formulation is obviously more
 natural. FiPy will solve the same matrix system either way.
+
+A vector `CellVariable` whose coefficients are scalars, or have one
+value per component, is instead treated as an ensemble of uncoupled
+problems on the same mesh, e.g., a parameter study. Each component is only
+coupled to itself, so all members are assembled into one block diagonal
+matrix and solved together
+
+>>> from fipy import Variable, numerix
+>>> D = numerix.array((0.1, 1., 10.))
+>>> ensemble = CellVariable(mesh=m, elementshape=(3,), hasOld=True)
+>>> ensemble.constrain(1., m.facesLeft)
+>>> ensembleEqn = TransientTerm() == DiffusionTerm(Variable(D))
+>>> ensemble.updateOld()
+>>> ensembleEqn.solve(var=ensemble, dt=1.)
+
+which gives the same result as solving for each member separately
+
+>>> for member, coeff in zip(ensemble, D):
+...     single = CellVariable(mesh=m, hasOld=True)
+...     single.constrain(1., m.facesLeft)
+...     (TransientTerm() == DiffusionTerm(coeff)).solve(var=single, dt=1.)
+...     print(numerix.allclose(member, single))
+True
+True
+True
+
+When all members share the same matrix and differ only in their initial or
+boundary values, the :class:`~fipy.solvers.scipy.linearLUSolver.LinearLUSolver`
+factors a single block and solves for every member at once.
 """
 from __future__ import unicode_literals
 __docformat__ = 'restructuredtext'
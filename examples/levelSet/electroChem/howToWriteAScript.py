@@ -370,6 +370,7 @@ If running interactively, create viewers.
 ...                                         datamin=0.0,
 ...                                         smooth=1)
 ...     except:
+...         from fipy import MultiViewer
 ...         viewer = MultiViewer(viewers=(
 ...             Viewer(distanceVar, datamin=-1e-9, datamax=1e-9),
 ...             Viewer(catalystVar.interfaceVar)))
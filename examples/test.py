@@ -17,7 +17,8 @@ def _suite():
         'flow.test',
         'meshing.test',
         'reactiveWetting.test',
-        'riemann.test'
+        'riemann.test',
+        'benchmarking.test'
         ), base = __name__)
 
 if __name__ == '__main__':
@@ -35,26 +35,39 @@ from __future__ import unicode_literals
 from builtins import input
 __docformat__ = 'restructuredtext'
 
+import os
 import sys
 
+if 'FIPY_IMPORT_PROFILE' in os.environ:
+    from fipy._importProfile import _ImportProfile
+    _importProfile = _ImportProfile()
+    _importProfile.start()
+
 from fipy.boundaryConditions import *
 from fipy.meshes import *
-from fipy.solvers import *
+from fipy import solvers
+from fipy.solvers.solver import *
 from fipy.steppers import *
 from fipy.terms import *
 from fipy.tools import *
 from fipy.variables import *
-from fipy.viewers import *
+from fipy import viewers
+
+if sys.version_info < (3, 7):
+    from fipy.solvers import *
+    from fipy.viewers import *
 
 __all__ = []
 __all__.extend(boundaryConditions.__all__)
 __all__.extend(meshes.__all__)
-__all__.extend(solvers.__all__)
 __all__.extend(steppers.__all__)
 __all__.extend(terms.__all__)
 __all__.extend(tools.__all__)
 __all__.extend(variables.__all__)
-__all__.extend(viewers.__all__)
+# the viewers that are only imported once they are used must be imported
+# by name, so that `from fipy import *` does not import them all
+__all__.extend([name for name in viewers.__all__
+                if name not in sum(viewers._lazyViewers.values(), [])])
 
 # fipy needs to export raw_input whether or not parallel
 
@@ -77,6 +90,27 @@ __all__.extend(['input', 'input_original'])
 from future.utils import text_to_native_str
 __all__ = [text_to_native_str(n) for n in __all__]
 
+if sys.version_info < (3, 7):
+    __all__.extend(solvers.__all__)
+else:
+    _namesWithoutSolvers = __all__
+    del __all__
+
+    def __getattr__(name):
+        # `from fipy import *` imports the suite of solvers, but not the
+        # viewers that are only imported by name
+        if name == "__all__":
+            globals()["__all__"] = _namesWithoutSolvers + list(solvers.__all__)
+            return globals()["__all__"]
+        elif name in viewers.__all__:
+            return getattr(viewers, name)
+        elif not name.startswith("_"):
+            try:
+                return getattr(solvers, name)
+            except AttributeError:
+                pass
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
 _saved_stdout = sys.stdout
 
 def _serial_doctest_raw_input(prompt):
@@ -147,3 +181,9 @@ def test(*args):
 from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
+
+if 'FIPY_IMPORT_PROFILE' in os.environ:
+    _importProfile.stop()
+    if parallelComm.procID == 0:
+        _importProfile.report()
+    del _importProfile
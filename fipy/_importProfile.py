@@ -0,0 +1,99 @@
+"""Time the imports made by `import fipy`
+
+Switched on by the :envvar:`FIPY_IMPORT_PROFILE` environment variable.
+Each module newly imported while :term:`FiPy` loads is timed, both
+including (cumulative) and excluding (self) the time taken by the modules
+it imports in turn, and failed imports, e.g., of the solver suites that
+are not installed, are reported as well.
+"""
+from __future__ import unicode_literals
+from __future__ import print_function
+__docformat__ = 'restructuredtext'
+
+import sys
+import time
+
+__all__ = []
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+class _ImportProfile(object):
+    """Wrapper of `__import__` that records the time of each new import
+
+        >>> profile = _ImportProfile()
+        >>> profile.start()
+        >>> import fipy.tools.numerix
+        >>> try:
+        ...     import fipy.noSuchModule
+        ... except ImportError:
+        ...     pass
+        >>> profile.stop()
+        >>> print([name for name, cumulative, own, failed in profile.records if failed])
+        ['fipy.noSuchModule']
+    """
+    def __init__(self):
+        self.records = []
+        self._stack = []
+        self._original = None
+
+    def _absoluteName(self, name, globals, level):
+        package = (globals or {}).get('__package__')
+        if level > 0 and package:
+            try:
+                from importlib.util import resolve_name
+            except ImportError:
+                return name
+            return resolve_name('.' * level + name, package)
+        return name
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        absolute = self._absoluteName(name, globals, level)
+        if absolute in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.)
+        start = time.time()
+        failed = False
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        except ImportError:
+            failed = True
+            raise
+        finally:
+            cumulative = time.time() - start
+            nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += cumulative
+            self.records.append((absolute, cumulative, cumulative - nested, failed))
+
+    def start(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def report(self, stream=None, limit=40):
+        """Print the slowest imports, most expensive first"""
+        if stream is None:
+            stream = sys.stderr
+        total = sum(own for name, cumulative, own, failed in self.records)
+        print("FiPy import profile: %.3f s" % total, file=stream)
+        print("%10s %10s  %s" % ("self [s]", "cumul [s]", "module"), file=stream)
+        records = sorted(self.records, key=lambda record: -record[1])
+        for name, cumulative, own, failed in records[:limit]:
+            print("%10.4f %10.4f  %s%s" % (own, cumulative, name,
+                                           " (failed)" if failed else ""),
+                  file=stream)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,489 @@
+from __future__ import unicode_literals
+from builtins import object
+from builtins import range
+__docformat__ = 'restructuredtext'
+
+__all__ = []
+
+import weakref
+
+import scipy.sparse as sp
+from scipy.sparse.linalg import LinearOperator
+
+from fipy.tools import numerix
+
+from fipy.matrices.sparseMatrix import _SparseMatrix
+
+# SciPy CSR structure of each sparsity pattern, shared by every
+# contribution with that pattern
+_structures = weakref.WeakKeyDictionary()
+
+def _csrView(data, pattern):
+    """SciPy CSR matrix of `data`, sharing the structure of `pattern`"""
+    if pattern not in _structures:
+        # SciPy converts the structure to its own index type on the first
+        # matrix, and uses it as it is after that
+        empty = sp.csr_matrix((numerix.zeros((pattern.nnz,), 'd'), pattern.indices, pattern.indptr),
+                              shape=pattern.shape)
+        _structures[pattern] = (empty.indices, empty.indptr)
+    indices, indptr = _structures[pattern]
+    return sp.csr_matrix((data, indices, indptr), shape=pattern.shape, copy=False)
+
+def _takeFromCSR(data, pattern, id1, id2):
+    """Entries (`id1`, `id2`) of the matrix with the structure of `pattern`
+    and the CSR `data`, without building the matrix
+
+        >>> from fipy.matrices.sparseMatrix import _SparsityPattern
+        >>> pattern = _SparsityPattern(id1=[0, 0, 1, 2, 0], id2=[2, 1, 1, 0, 2], shape=(3, 3))
+        >>> print(_takeFromCSR(pattern.scatter([1., 2., 3., 4., 5.]), pattern,
+        ...                    numerix.array([0, 2, 2, 1]), numerix.array([2, 0, 2, 1])))
+        [ 6.  4.  0.  3.]
+    """
+    rows, cols = pattern.shape
+    keys = numerix.repeat(numerix.arange(rows), numerix.diff(pattern.indptr)) * cols + pattern.indices
+    wanted = numerix.asarray(id1).ravel() * cols + numerix.asarray(id2).ravel()
+    if len(keys) == 0:
+        return numerix.zeros(wanted.shape, 'd')
+    slots = numerix.searchsorted(keys, wanted).clip(max=len(keys) - 1)
+    return numerix.where(keys[slots] == wanted, data[slots], 0.)
+
+class _SparsePart(object):
+    """Contribution held as a SciPy sparse matrix"""
+    def __init__(self, matrix, factor=1.):
+        self.matrix = matrix
+        self.factor = factor
+
+    def scaled(self, factor):
+        return _SparsePart(self.matrix, self.factor * factor)
+
+    def summable(self, other):
+        return isinstance(other, _SparsePart)
+
+    def plus(self, other):
+        """Sum of two contributions held as SciPy matrices"""
+        return _SparsePart((self.tocsr() + other.tocsr()).tocsr())
+
+    def matvec(self, x):
+        return self.factor * (self.matrix * x)
+
+    def diagonal(self):
+        return self.factor * self.matrix.diagonal()
+
+    def take(self, id1, id2):
+        return self.factor * numerix.asarray(self.matrix[id1, id2]).ravel()
+
+    def tocsr(self):
+        return self.factor * self.matrix
+
+class _PatternPart(object):
+    """Contribution held as the value of each (`id1`, `id2`) entry of
+    `pattern`, as the terms built it from the coefficients of the faces,
+    and applied by gathering from `x` at `id2` and summing into `id1`"""
+    def __init__(self, pattern, values, factor=1.):
+        self.pattern = pattern
+        self.values = values
+        self.factor = factor
+
+    def scaled(self, factor):
+        return _PatternPart(self.pattern, self.values, self.factor * factor)
+
+    def summable(self, other):
+        return isinstance(other, _PatternPart) and other.pattern is self.pattern
+
+    def plus(self, other):
+        """Sum of two contributions with the same pattern"""
+        return _PatternPart(self.pattern,
+                            self.factor * self.values + other.factor * other.values)
+
+    def matvec(self, x):
+        return self.factor * numerix.bincount(self.pattern.id1,
+                                              weights=self.values * x[self.pattern.id2],
+                                              minlength=self.pattern.shape[0])
+
+    def diagonal(self):
+        onDiagonal = self.pattern.id1 == self.pattern.id2
+        return self.factor * numerix.bincount(self.pattern.id1[onDiagonal],
+                                              weights=self.values[onDiagonal],
+                                              minlength=self.pattern.shape[0])
+
+    def take(self, id1, id2):
+        return self.factor * _takeFromCSR(self.pattern.scatter(self.values), self.pattern, id1, id2)
+
+    def tocsr(self):
+        return self.factor * _csrView(self.pattern.scatter(self.values), self.pattern)
+
+class _StencilPart(object):
+    """Contribution of the interior faces of a structured grid, held as
+    the coefficients of the faces"""
+    def __init__(self, stencil, coeffs, factor=1.):
+        self.stencil = stencil
+        self.coeffs = coeffs
+        self.factor = factor
+
+    def scaled(self, factor):
+        return _StencilPart(self.stencil, self.coeffs, self.factor * factor)
+
+    def summable(self, other):
+        return False
+
+    def matvec(self, x):
+        return self.factor * self.stencil.multiply(x, *self.coeffs)
+
+    def diagonal(self):
+        cell1diag, cell1offdiag, cell2offdiag, cell2diag = self.coeffs
+        return self.factor * self.stencil.diagonal(cell1diag, cell2diag)
+
+    def take(self, id1, id2):
+        return self.factor * _takeFromCSR(self.stencil.gather(*self.coeffs), self.stencil, id1, id2)
+
+    def tocsr(self):
+        return self.factor * _csrView(self.stencil.gather(*self.coeffs), self.stencil)
+
+class _MatrixFreeMatrix(_SparseMatrix):
+
+    """Matrix that is applied to vectors, rather than assembled.
+
+    The contributions of the terms are kept as they are built, in the
+    structure each term caches, and the product with a vector is the sum of
+    their products with it. The interior faces of a uniform grid are kept
+    as the coefficients of the faces, and applied in a pass over the faces
+    normal to each axis. On other meshes, the terms build the value of each
+    entry of their `_SparsityPattern` from the coefficients of the faces;
+    those of the same pattern are summed, and applied by gathering from
+    the vector and summing into the product. Only the diagonal is
+    accumulated, which is all that a Jacobi preconditioner needs.
+
+    Only the few entries added without a pattern, e.g., by boundary
+    conditions, are held in a SciPy matrix.
+
+        >>> L = _MatrixFreeMatrix(size=3)
+        >>> L.addAt([3., 10., numerix.pi, 2.5], [0, 0, 1, 2], [2, 1, 1, 0])
+        >>> L.addAtDiagonal([1., 2., 3.])
+        >>> print(L * numerix.array((1., 2., 3.)))
+        [ 30.          10.28318531  11.5       ]
+        >>> print(L.takeDiagonal())
+        [ 1.          5.14159265  3.        ]
+
+    Anything that needs the entries, e.g., printing the matrix or
+    multiplying it by another, assembles a SciPy matrix from the
+    contributions
+
+        >>> print(L)
+         1.000000  10.000000   3.000000  
+            ---     5.141593      ---    
+         2.500000      ---     3.000000  
+    """
+
+    def __init__(self, size, parts=(), diagonal=None):
+        """
+        Parameters
+        ----------
+        size : int
+            The number of rows and columns.
+        parts : :obj:`list`
+            The contributions that are not on the diagonal.
+        diagonal : array_like
+            The contributions on the diagonal.
+        """
+        self.size = size
+        self._parts = []
+        for part in parts:
+            self._addPart(part)
+        if diagonal is None:
+            diagonal = numerix.zeros((size,), 'd')
+        self._diagonal = diagonal
+
+    @property
+    def matrix(self):
+        """The assembled SciPy matrix"""
+        matrix = sp.diags(self._diagonal, format='csr')
+        for part in self._parts:
+            matrix = matrix + part.tocsr()
+        return matrix.tocsr()
+
+    @property
+    def numpyArray(self):
+        return self.matrix.toarray()
+
+    @property
+    def _shape(self):
+        return (self.size, self.size)
+
+    @property
+    def _range(self):
+        return list(range(self._shape[1])), list(range(self._shape[0]))
+
+    def copy(self):
+        return _MatrixFreeMatrix(size=self.size, parts=self._parts, diagonal=self._diagonal.copy())
+
+    def __getitem__(self, index):
+        return self.matrix[index]
+
+    def __str__(self):
+        from fipy.matrices.scipyMatrix import _ScipyMatrix
+        return str(_ScipyMatrix(matrix=self.matrix))
+
+    def _addPart(self, part):
+        """Sum `part` into the contribution with the same structure, if
+        there is one, or keep it as a contribution of its own"""
+        for i, existing in enumerate(self._parts):
+            if existing.summable(part):
+                self._parts[i] = existing.plus(part)
+                break
+        else:
+            self._parts.append(part)
+
+    def __iadd__(self, other):
+        for part in other._parts:
+            self._addPart(part)
+        self._diagonal = self._diagonal + other._diagonal
+        return self
+
+    def __add__(self, other):
+        if other == 0:
+            return self
+        else:
+            return _MatrixFreeMatrix(size=self.size,
+                                     parts=self._parts + other._parts,
+                                     diagonal=self._diagonal + other._diagonal)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if other == 0:
+            return self
+        else:
+            return self + (-other)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __isub__(self, other):
+        return self.__iadd__(-other)
+
+    def __mul__(self, other):
+        """
+        Multiply by a scalar, without assembling the matrix
+
+            >>> L = _MatrixFreeMatrix(size=2)
+            >>> L.addAt([1., 2.], [0, 1], [1, 0])
+            >>> print(numerix.allequal((-2 * L).numpyArray, [[0., -2.], [-4., 0.]]))
+            True
+
+        by another matrix, assembling both
+
+            >>> print(numerix.allequal((L * L).numpyArray, [[2., 0.], [0., 2.]]))
+            True
+
+        or by a vector
+
+            >>> print(L * numerix.array((3., 4.)))
+            [ 4.  6.]
+        """
+        if isinstance(other, _SparseMatrix):
+            return _MatrixFreeMatrix(size=self.size,
+                                     parts=[_SparsePart(self.matrix * other.matrix)],
+                                     diagonal=numerix.zeros((self.size,), 'd'))
+        else:
+            shape = numerix.shape(other)
+            if shape == ():
+                return _MatrixFreeMatrix(size=self.size,
+                                         parts=[part.scaled(other) for part in self._parts],
+                                         diagonal=self._diagonal * other)
+            elif shape == (self.size,):
+                return self.matvec(other)
+            else:
+                raise TypeError
+
+    def __rmul__(self, other):
+        if isinstance(numerix.ones(1, 'l'), type(other)):
+            return self.matrix.transpose() * other
+        else:
+            return self * other
+
+    def matvec(self, x):
+        """Product of the matrix with `x`, from each contribution in turn
+        """
+        x = numerix.asarray(x, dtype=float).ravel()
+        y = self._diagonal * x
+        for part in self._parts:
+            y += part.matvec(x)
+        return y
+
+    def asLinearOperator(self):
+        """A SciPy `LinearOperator` that applies the matrix"""
+        return _MatrixFreeOperator(self)
+
+    def put(self, vector, id1, id2):
+        """
+        Put elements of `vector` at positions of the matrix corresponding
+        to (`id1`, `id2`), by adding the difference from the entries there
+
+            >>> L = _MatrixFreeMatrix(size=2)
+            >>> L.addAt([1., 2., 3.], [0, 0, 1], [0, 1, 1])
+            >>> L.put([5., 7.], [0, 1], [1, 0])
+            >>> print(numerix.allequal(L.numpyArray, [[1., 5.], [7., 3.]]))
+            True
+        """
+        vector = numerix.asarray(vector, dtype=float)
+        self.addAt(vector - self.take(id1, id2), id1, id2)
+
+    def putDiagonal(self, vector):
+        """
+        Put elements of `vector` along diagonal of matrix
+
+            >>> L = _MatrixFreeMatrix(size=2)
+            >>> L.addAt([1., 2., 3.], [0, 0, 1], [0, 1, 1])
+            >>> L.putDiagonal([5., 6.])
+            >>> print(numerix.allequal(L.numpyArray, [[5., 2.], [0., 6.]]))
+            True
+        """
+        if type(vector) in [int, float]:
+            vector = numerix.repeat(vector, self.size)
+
+        self._diagonal = self._diagonal + (numerix.asarray(vector, dtype=float) - self.takeDiagonal())
+
+    def take(self, id1, id2):
+        """Entries (`id1`, `id2`), from each contribution in turn
+        """
+        id1 = numerix.asarray(id1).ravel()
+        id2 = numerix.asarray(id2).ravel()
+        values = numerix.where(id1 == id2, self._diagonal[id1], 0.)
+        for part in self._parts:
+            values = values + part.take(id1, id2)
+        return values
+
+    def takeDiagonal(self):
+        diagonal = self._diagonal.copy()
+        for part in self._parts:
+            diagonal += part.diagonal()
+        return diagonal
+
+    def addAt(self, vector, id1, id2):
+        vector = numerix.asarray(vector, dtype=float).ravel()
+        id1 = numerix.asarray(id1).ravel()
+        id2 = numerix.asarray(id2).ravel()
+        assert(len(id1) == len(id2) == len(vector))
+
+        if numerix.array_equal(id1, id2):
+            self._diagonal = self._diagonal + numerix.bincount(id1, weights=vector, minlength=self.size)
+        else:
+            self._addPart(_SparsePart(sp.csr_matrix((vector, (id1, id2)), shape=self._shape)))
+
+    def addAtDiagonal(self, vector):
+        if type(vector) in [type(1), type(1.)]:
+            vector = numerix.repeat(vector, self._shape[0])
+
+        ids = numerix.arange(len(vector))
+        self.addAt(vector, ids, ids)
+
+    def addAtPattern(self, vector, pattern):
+        """
+        Sum `vector` into the entries of `pattern`, in one array of values
+        for all the contributions with that pattern
+
+            >>> from fipy import Tri2D, CellVariable, DiffusionTerm
+            >>> from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
+            >>> mesh = Tri2D(nx=4, ny=3)
+            >>> var = CellVariable(mesh=mesh, value=mesh.x * mesh.y)
+            >>> var.constrain(1., where=mesh.facesLeft)
+            >>> eq = DiffusionTerm(coeff=1.) + DiffusionTerm(coeff=1. + mesh.faceCenters[0])
+            >>> v, L, b = eq._buildAndAddMatrices(var, _MatrixFreeMeshMatrix)
+            >>> print(len(L._parts), type(L._parts[0]).__name__)
+            1 _PatternPart
+            >>> print(numerix.allclose(L.take([0, 0, 5], [0, 1, 5]),
+            ...                        [L.numpyArray[0, 0], L.numpyArray[0, 1], L.numpyArray[5, 5]]))
+            True
+            >>> v, LL, bb = eq._buildAndAddMatrices(var, _ScipyMeshMatrix)
+            >>> print(numerix.allclose(L * var.value, LL * var.value))
+            True
+            >>> print(numerix.allclose(L.numpyArray, LL.numpyArray))
+            True
+        """
+        assert pattern.shape == self._shape
+
+        self._addPart(_PatternPart(pattern, numerix.asarray(vector, dtype=float).ravel()))
+
+    def addAtStencil(self, stencil, cell1diag, cell1offdiag, cell2offdiag, cell2diag):
+        """
+        Keep the coefficients of the interior faces, to be applied by
+        `stencil` in each product
+
+            >>> from fipy import Grid2D, CellVariable, DiffusionTerm
+            >>> from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
+            >>> mesh = Grid2D(nx=4, ny=3)
+            >>> var = CellVariable(mesh=mesh, value=mesh.x * mesh.y)
+            >>> var.constrain(1., where=mesh.facesLeft)
+            >>> eq = DiffusionTerm(coeff=1. + mesh.faceCenters[0])
+            >>> v, L, b = eq._buildAndAddMatrices(var, _MatrixFreeMeshMatrix)
+            >>> print(len(L._parts), type(L._parts[0]).__name__)
+            1 _StencilPart
+            >>> eq = DiffusionTerm(coeff=1. + mesh.faceCenters[0])
+            >>> v, LL, bb = eq._buildAndAddMatrices(var, _ScipyMeshMatrix)
+            >>> print(numerix.allclose(L * var.value, LL * var.value))
+            True
+            >>> print(numerix.allclose(L.takeDiagonal(), LL.takeDiagonal()))
+            True
+            >>> print(numerix.allclose(L.numpyArray, LL.numpyArray))
+            True
+        """
+        assert stencil.shape == self._shape
+
+        self._parts.append(_StencilPart(stencil, (cell1diag, cell1offdiag, cell2offdiag, cell2diag)))
+
+    def exportMmf(self, filename):
+        """Exports the matrix to a Matrix Market file of the given `filename`.
+        """
+        from scipy.io import mmio
+
+        mmio.mmwrite(filename, self.matrix)
+
+class _MatrixFreeMeshMatrix(_MatrixFreeMatrix):
+
+    def __init__(self, mesh, bandwidth=0, sizeHint=None, matrix=None, numberOfVariables=1, numberOfEquations=1, storeZeros=True):
+        """Creates a `_MatrixFreeMatrix` associated with a `Mesh`.
+
+        Parameters
+        ----------
+        mesh : ~fipy.meshes.mesh.Mesh
+            The `Mesh` to assemble the matrix for.
+        bandwidth : int
+            The proposed band width of the matrix. Ignored.
+        numberOfVariables : int
+            The columns of the matrix is determined by `numberOfVariables * self.mesh.numberOfCells`.
+        numberOfEquations : int
+            The rows of the matrix is determined by `numberOfEquations * self.mesh.numberOfCells`.
+        storeZeros : bool
+            Ignored.
+        """
+        self.mesh = mesh
+        self.numberOfVariables = numberOfVariables
+        assert numberOfEquations == self.numberOfVariables
+        _MatrixFreeMatrix.__init__(self, size=self.numberOfVariables * self.mesh.numberOfCells)
+
+    def flush(self):
+        pass
+
+class _MatrixFreeOperator(LinearOperator):
+    """SciPy `LinearOperator` that applies a `_MatrixFreeMatrix`, and
+    provides its diagonal to preconditioners"""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        LinearOperator.__init__(self, dtype=numerix.dtype('d'), shape=matrix._shape)
+
+    def _matvec(self, x):
+        return self.matrix.matvec(x)
+
+    def _rmatvec(self, x):
+        return self.matrix.matrix.transpose() * numerix.asarray(x).ravel()
+
+    def diagonal(self):
+        return self.matrix.takeDiagonal()
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
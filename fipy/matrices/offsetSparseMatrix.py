@@ -25,6 +25,13 @@ def OffsetSparseMatrix(SparseMatrix, numberOfVariables, numberOfEquations):
         def addAt(self, vector, id1, id2):
             SparseMatrix.addAt(self, vector, id1 + self.mesh.numberOfCells * self.equationIndex, id2 + self.mesh.numberOfCells * self.varIndex)
 
+        def addAtPattern(self, vector, pattern):
+            # the cached pattern is expressed in unshifted indices
+            self.addAt(vector, pattern.id1, pattern.id2)
+
+        def addAtStencil(self, stencil, cell1diag, cell1offdiag, cell2offdiag, cell2diag):
+            self.addAtPattern(stencil.gather(cell1diag, cell1offdiag, cell2offdiag, cell2diag), stencil)
+
         def addAtDiagonal(self, vector):
             if type(vector) in [type(1), type(1.)]:
                 tmp = numerix.zeros((self.mesh.numberOfCells,), 'd')
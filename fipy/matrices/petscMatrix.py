@@ -5,11 +5,40 @@ __docformat__ = 'restructuredtext'
 
 __all__ = []
 
+import weakref
+
 from petsc4py import PETSc
 
 from fipy.tools import numerix
+from fipy.tools.numerix import MA
 from fipy.matrices.sparseMatrix import _SparseMatrix
 
+# neighbours of each cell that this process owns, by mesh
+_neighbourCounts = weakref.WeakKeyDictionary()
+
+def _countNeighbours(mesh):
+    """Number of the neighbours of each cell owned by this process that are
+    also owned by it, and that are ghosts, kept for as long as `mesh`
+    """
+    if mesh not in _neighbourCounts:
+        owned = numerix.zeros((mesh.numberOfCells,), dtype=bool)
+        owned[mesh._localNonOverlappingCellIDs] = True
+
+        neighbours = mesh._cellToCellIDs[..., mesh._localNonOverlappingCellIDs]
+        exists = ~MA.getmaskarray(neighbours)
+        neighbours = MA.filled(neighbours, 0)
+
+        _neighbourCounts[mesh] = ((exists & owned[neighbours]).sum(axis=0),
+                                  (exists & ~owned[neighbours]).sum(axis=0))
+    return _neighbourCounts[mesh]
+
+# the assembled matrices whose structure new matrices take, by mesh and
+# by number of equations and variables
+_structures = weakref.WeakKeyDictionary()
+
+def _nonZerosUsed(matrix):
+    return matrix.getInfo(PETSc.Mat.InfoType.GLOBAL_SUM)['nz_used']
+
 class _PETScMatrix(_SparseMatrix):
     
     def __init__(self, matrix):
@@ -401,7 +430,7 @@ class _PETScMatrix(_SparseMatrix):
     
 class _PETScMatrixFromShape(_PETScMatrix):
     
-    def __init__(self, rows, cols, bandwidth=0, sizeHint=None, matrix=None, comm=PETSc.COMM_SELF):
+    def __init__(self, rows, cols, bandwidth=0, sizeHint=None, matrix=None, comm=PETSc.COMM_SELF, nonZeros=None):
         """Instantiates and wraps a PETSc `Mat` matrix
 
         :Parameters:
@@ -411,7 +440,19 @@ class _PETScMatrixFromShape(_PETScMatrix):
           - `sizeHint`: estimate of the number of non-zeros
           - `matrix`: pre-assembled `ll_mat` to use for storage
           - `comm`: communicator
-          
+          - `nonZeros`: the number of non-zeros of each local row in the
+            columns owned by this process and in the others, to
+            preallocate instead of `bandwidth`
+
+        Values outside the preallocation are still accepted, at the
+        cost of allocating memory for them
+
+            >>> L = _PETScMatrixFromShape(rows=3, cols=3, bandwidth=1)
+            >>> L.addAt([1., 2., 3., 4.], [0, 0, 1, 2], [0, 2, 1, 2])
+            >>> print(L)
+             1.000000      ---     2.000000  
+                ---     3.000000      ---    
+                ---        ---     4.000000  
         """
         bandwidth = bandwidth 
         if (bandwidth == 0) and (sizeHint is not None):
@@ -423,7 +464,14 @@ class _PETScMatrixFromShape(_PETScMatrix):
             # cols are owned by everyone
             matrix.setSizes([[rows, None], [cols, None]])
             matrix.setType('aij') # sparse
-            matrix.setPreallocationNNZ(None) # FIXME: ??? #bandwidth)
+            if nonZeros is not None:
+                matrix.setPreallocationNNZ(nonZeros)
+            elif bandwidth > 0:
+                matrix.setPreallocationNNZ(bandwidth)
+            else:
+                matrix.setPreallocationNNZ(None)
+            # the preallocation need not hold every value
+            matrix.setOption(PETSc.Mat.Option.NEW_NONZERO_ALLOCATION_ERR, False)
                 
         _PETScMatrix.__init__(self, matrix=matrix)
 
@@ -444,14 +492,113 @@ class _PETScMeshMatrix(_PETScMatrixFromShape):
         self.numberOfVariables = numberOfVariables
         self.numberOfEquations = numberOfEquations
 
+        nonZeros = None
+        structured = matrix is None and bandwidth != 1
+        if structured:
+            matrix = self._structuredMatrix()
+        if matrix is None:
+            nonZeros = self._nonZeros(bandwidth=bandwidth)
+
         _PETScMatrixFromShape.__init__(self, 
                                        rows=numberOfEquations * len(self.mesh._localNonOverlappingCellIDs), 
                                        cols=numberOfVariables * len(self.mesh._localNonOverlappingCellIDs), # self.mesh.globalNumberOfCells, # , # 
                                        bandwidth=bandwidth, 
                                        sizeHint=sizeHint, 
                                        matrix=matrix,
-                                       comm=mesh.communicator.petsc4py_comm)
-                                       
+                                       comm=mesh.communicator.petsc4py_comm,
+                                       nonZeros=nonZeros)
+
+        if structured:
+            structures = _structures.setdefault(self.mesh, {})
+            key = (numberOfEquations, numberOfVariables)
+            template, latest = structures.get(key, (None, None))
+            structures[key] = (template, self.matrix)
+
+    def _structuredMatrix(self):
+        """An empty matrix with the structure of the fullest matrix
+        assembled so far on this mesh, or `None` if there is none yet
+
+        The values of each assembly then go into places that already
+        exist, rather than into ones that PETSc has to make. The last
+        matrix created is kept until the next one is, so that its
+        structure can be taken once it has been assembled.
+
+            >>> from fipy import Grid2D
+            >>> from fipy.tools import serialComm
+            >>> mesh = Grid2D(nx=3, ny=2, communicator=serialComm)
+            >>> def assemble():
+            ...     L = _PETScMeshMatrix(mesh=mesh, numberOfVariables=2, numberOfEquations=2)
+            ...     faces = mesh.interiorFaceIDs
+            ...     cell1 = mesh.faceCellIDs[0, faces].filled()
+            ...     cell2 = mesh.faceCellIDs[1, faces].filled()
+            ...     N = mesh.numberOfCells
+            ...     for row in (0, N):
+            ...         for col in (0, N):
+            ...             L.addAt(numerix.ones(len(faces)), row + cell1, col + cell2)
+            ...             L.addAt(numerix.ones(len(faces)), row + cell2, col + cell1)
+            ...             L.addAtDiagonal(numerix.ones(2 * N))
+            ...     L.matrix.assemble()
+            ...     return L
+            >>> first = assemble()
+            >>> second = assemble()
+            >>> print(second.matrix.getInfo()['mallocs'])
+            0.0
+            >>> print(numerix.allclose(first.numpyArray, second.numpyArray))
+            True
+            >>> template, latest = _structures[mesh][(2, 2)]
+            >>> print(template is first.matrix, latest is second.matrix)
+            True True
+        """
+        structures = _structures.get(self.mesh, {})
+        template, latest = structures.get((self.numberOfEquations, self.numberOfVariables),
+                                          (None, None))
+        if (latest is not None and latest.assembled
+            and (template is None or _nonZerosUsed(latest) > _nonZerosUsed(template))):
+            template = latest
+
+        if template is None or not template.assembled:
+            return None
+
+        structures[(self.numberOfEquations, self.numberOfVariables)] = (template, latest)
+        # the structure, with every value zero
+        matrix = template.duplicate(copy=False)
+        matrix.setOption(PETSc.Mat.Option.NEW_NONZERO_ALLOCATION_ERR, False)
+        return matrix
+
+    def _nonZeros(self, bandwidth):
+        """Number of non-zeros of each local row, in the columns owned by
+        this process and in the others
+
+        Each row of a cell couples every variable of the cell and of its
+        neighbours, unless `bandwidth` is 1, when the matrix is diagonal.
+        The rows are ordered as the `_ao` orders them, every cell owned by
+        this process for the first equation, then for the next, so the
+        counts of the cells are repeated for each equation
+
+            >>> from fipy import Grid2D
+            >>> from fipy.tools import serialComm
+            >>> mesh = Grid2D(nx=3, ny=2, communicator=serialComm)
+            >>> L = _PETScMeshMatrix(mesh=mesh, numberOfVariables=2, numberOfEquations=2)
+            >>> owned, ghosts = L._nonZeros(bandwidth=0)
+            >>> print(owned)
+            [6 8 6 6 8 6 6 8 6 6 8 6]
+            >>> print(ghosts)
+            [0 0 0 0 0 0 0 0 0 0 0 0]
+            >>> owned, ghosts = L._nonZeros(bandwidth=1)
+            >>> print(owned)
+            [2 2 2 2 2 2 2 2 2 2 2 2]
+        """
+        if bandwidth == 1:
+            owned = numerix.ones((len(self.mesh._localNonOverlappingCellIDs),), dtype=int)
+            ghosts = numerix.zeros((len(self.mesh._localNonOverlappingCellIDs),), dtype=int)
+        else:
+            owned, ghosts = _countNeighbours(self.mesh)
+            owned = owned + 1
+
+        return (numerix.tile(owned * self.numberOfVariables,
+                             self.numberOfEquations).astype(PETSc.IntType),
+                numerix.tile(ghosts * self.numberOfVariables,
+                             self.numberOfEquations).astype(PETSc.IntType))
     
     @property
     def _ao(self):
@@ -9,6 +9,85 @@ from fipy.tools import numerix
 
 from fipy.matrices.sparseMatrix import _SparseMatrix
 
+class _TripletBuffer(object):
+    """Growable buffer of the values added to a matrix, with their rows
+    and columns, until they are converted to CSR all at once
+
+        >>> buffer = _TripletBuffer(capacity=2)
+        >>> buffer.append([1., 2.], [0, 1], [1, 0])
+        >>> buffer.append([3., 4.], [0, 0], [1, 0])
+        >>> print(len(buffer), len(buffer.data) >= 4)
+        4 True
+        >>> print(buffer.tocsr(shape=(2, 2)).toarray())
+        [[ 4.  4.]
+         [ 2.  0.]]
+    """
+
+    def __init__(self, capacity=0):
+        self.size = 0
+        self.data = numerix.empty((capacity,), 'd')
+        self.row = numerix.empty((capacity,), 'l')
+        self.col = numerix.empty((capacity,), 'l')
+
+    def __len__(self):
+        return self.size
+
+    def append(self, vector, id1, id2):
+        vector = numerix.asarray(vector, dtype=float).ravel()
+        n = len(vector)
+        end = self.size + n
+        if end > len(self.data):
+            capacity = max(end, 2 * len(self.data))
+            for name in ["data", "row", "col"]:
+                old = getattr(self, name)
+                new = numerix.empty((capacity,), old.dtype)
+                new[:self.size] = old[:self.size]
+                setattr(self, name, new)
+
+        self.data[self.size:end] = vector
+        self.row[self.size:end] = numerix.asarray(id1).ravel()
+        self.col[self.size:end] = numerix.asarray(id2).ravel()
+        self.size = end
+
+    def _triplets(self, position=None):
+        data = self.data[:self.size]
+        row = self.row[:self.size]
+        col = self.col[:self.size]
+        if position is not None:
+            row = position[row]
+            col = position[col]
+        return data, row, col
+
+    def tocsr(self, shape, position=None):
+        """CSR matrix of the values, with those at the same position summed
+
+        `position`, if given, maps the rows and columns of the values to
+        those of the matrix.
+        """
+        data, row, col = self._triplets(position=position)
+        return sp.csr_matrix((data, (row, col)), shape=shape)
+
+    def replace(self, matrix, position=None):
+        """`matrix` with its entries at the positions of the values
+        replaced by them, the last value at a position winning
+
+            >>> buffer = _TripletBuffer()
+            >>> buffer.append([1., 2., 3.], [0, 1, 0], [0, 0, 0])
+            >>> print(buffer.replace(sp.csr_matrix(numerix.ones((2, 2)))).toarray())
+            [[ 3.  1.]
+             [ 2.  1.]]
+        """
+        data, row, col = self._triplets(position=position)
+        keys = row * matrix.shape[1] + col
+        # the first of the reversed values at a position is the last one
+        unique, last = numerix.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last
+        row, col = row[last], col[last]
+
+        cleared = sp.csr_matrix((numerix.ones(len(last)), (row, col)), shape=matrix.shape)
+        values = sp.csr_matrix((data[last], (row, col)), shape=matrix.shape)
+        return matrix - matrix.multiply(cleared) + values
+
 class _ScipyMatrix(_SparseMatrix):
 
     """class wrapper for a scipy sparse matrix.
@@ -16,17 +95,91 @@ class _ScipyMatrix(_SparseMatrix):
     `_ScipyMatrix` is always `NxN`.
     Allows basic python operations __add__, __sub__ etc.
     Facilitate matrix populating in an easy way.
+
+    Values added with `addAt`, or put with `put`, are held in a
+    `_TripletBuffer`, and only applied to the SciPy matrix, in a single
+    conversion, when it is next needed. Values added with `addAtPattern`
+    are summed into a CSR matrix with the structure of their
+    `_SparsityPattern`, which is likewise only added when needed.
     """
 
-    def __init__(self, matrix):
+    _buffer = None
+    _puts = None
+    _patterns = None
+
+    def __init__(self, matrix, capacity=0):
         """Creates a `_ScipyMatrix`.
 
         Parameters
         ----------
         matrix : ~scipy.sparse.csr_matrix
             The internal SciPy matrix
+        capacity : int
+            The number of values that `addAt` can hold before its buffer
+            has to grow.
         """
         self.matrix = matrix
+        self._capacity = capacity
+
+    @property
+    def _pending(self):
+        return (self._buffer is not None
+                or self._puts is not None
+                or self._patterns is not None)
+
+    @property
+    def _adding(self):
+        return self._buffer is not None or self._patterns is not None
+
+    def _applyPending(self, matrix, position=None):
+        """`matrix` with the values held by `put`, and then by `addAt` and
+        `addAtPattern`, applied; `position` maps their rows and columns to
+        those of `matrix`
+        """
+        puts, self._puts = self._puts, None
+        buffer, self._buffer = self._buffer, None
+        patterns, self._patterns = self._patterns, None
+        if puts is not None:
+            matrix = puts.replace(matrix, position=position)
+        if buffer is not None:
+            matrix = matrix + buffer.tocsr(shape=matrix.shape, position=position)
+        for pattern, added in (patterns or []):
+            if position is not None:
+                coo = added.tocoo()
+                added = sp.csr_matrix((coo.data, (position[coo.row], position[coo.col])),
+                                      shape=matrix.shape)
+            elif matrix.nnz == 0:
+                # the matrix takes over `added`, so it must not share the
+                # structure of the pattern, which other matrices use
+                if numerix.may_share_memory(added.indices, pattern.indices):
+                    added.indices = added.indices.copy()
+                if numerix.may_share_memory(added.indptr, pattern.indptr):
+                    added.indptr = added.indptr.copy()
+                matrix = added
+                continue
+            matrix = matrix + added
+        return matrix
+
+    @property
+    def matrix(self):
+        """The SciPy matrix, with any values held by `put` and `addAt` applied"""
+        if self._pending:
+            self._matrix = self._applyPending(self._matrix)
+        return self._matrix
+
+    @matrix.setter
+    def matrix(self, matrix):
+        self._matrix = matrix
+        self._buffer = None
+        self._puts = None
+        self._patterns = None
+
+    @matrix.deleter
+    def matrix(self):
+        del self._matrix
+        self._buffer = None
+        self._puts = None
+        self._patterns = None
 
     def getCoupledClass(self):
         return _CoupledScipyMeshMatrix
@@ -155,7 +308,8 @@ class _ScipyMatrix(_SparseMatrix):
 
     @property
     def _shape(self):
-        return self.matrix.shape
+        # held values do not change the shape, so they are left held
+        return self._matrix.shape
 
     @property
     def _range(self):
@@ -171,14 +325,29 @@ class _ScipyMatrix(_SparseMatrix):
                 ---    10.000000   3.000000  
                 ---     3.141593      ---    
              2.500000      ---        ---    
+
+        Like those of `addAt`, the values are held until the matrix is
+        needed. They replace any added before them, and any added after
+        them are added to them
+
+            >>> L.addAt([1., 1.], [0, 1], [1, 1])
+            >>> L.put([5., 7.], [0, 2], [1, 2])
+            >>> L.addAt([2.], [2], [2])
+            >>> print(len(L._puts), len(L._buffer))
+            2 1
+            >>> print(L)
+                ---     5.000000   3.000000  
+                ---     4.141593      ---    
+             2.500000      ---     9.000000  
         """
         assert(len(id1) == len(id2) == len(vector))
 
-        # done in such a way to vectorize everything
-        tempVec = numerix.array(vector) - self.matrix[id1, id2].flat
-        tempMat = sp.csr_matrix((tempVec, (id1, id2)), self.matrix.shape)
-
-        self.matrix = self.matrix + tempMat
+        if self._adding:
+            # the values added so far are under those put now
+            self.matrix
+        if self._puts is None:
+            self._puts = _TripletBuffer(capacity=len(vector))
+        self._puts.append(vector, id1, id2)
 
     def putDiagonal(self, vector):
         """
@@ -218,12 +387,75 @@ class _ScipyMatrix(_SparseMatrix):
             12.300000  10.000000   3.000000  
                 ---     3.141593   2.960000  
              2.500000      ---     2.200000  
+
+        The values are only added to the SciPy matrix when it is needed
+
+            >>> L.addAt([1., 2.], [0, 1], [0, 1])
+            >>> L.addAt([3.], [0], [0])
+            >>> print(len(L._buffer))
+            3
+            >>> print(L.matrix[0, 0])
+            16.3
+            >>> print(L._buffer)
+            None
         """
         assert(len(id1) == len(id2) == len(vector))
 
-        temp = sp.csr_matrix((vector, (id1, id2)), self.matrix.shape)
+        if self._buffer is None:
+            self._buffer = _TripletBuffer(capacity=max(self._capacity, len(vector)))
+        self._buffer.append(vector, id1, id2)
+
+    def addAtPattern(self, vector, pattern):
+        """
+        Add elements of `vector` to the positions in the matrix described
+        by a precomputed `_SparsityPattern`, reusing its CSR structure
 
-        self.matrix = self.matrix + temp
+            >>> from fipy.matrices.sparseMatrix import _SparsityPattern
+            >>> pattern = _SparsityPattern(id1=[1, 2, 0, 0, 1], id2=[2, 2, 0, 0, 2], shape=(3, 3))
+            >>> L = _ScipyMatrixFromShape(size=3)
+            >>> L.addAtPattern([1.73, 2.2, 8.4, 3.9, 1.23], pattern)
+            >>> print(L)
+            12.300000      ---        ---    
+                ---        ---     2.960000  
+                ---        ---     2.200000  
+            >>> L.put([3., 10., numerix.pi, 2.5], [0, 0, 1, 2], [2, 1, 1, 0])
+            >>> L.addAtPattern([1.73, 2.2, 8.4, 3.9, 1.23], pattern)
+            >>> print(L)
+            24.600000  10.000000   3.000000  
+                ---     3.141593   5.920000  
+             2.500000      ---     4.400000  
+
+        The values of each pattern are summed into the `data` of one CSR
+        matrix with its structure, which is only added to the SciPy matrix
+        when that is needed
+
+            >>> L.addAtPattern([1., 1., 1., 1., 1.], pattern)
+            >>> L.addAt([1.], [1], [1])
+            >>> L.addAtPattern([1., 1., 1., 1., 1.], pattern)
+            >>> (held, added), = L._patterns
+            >>> print(held is pattern, added.data)
+            True [ 4.  4.  2.]
+            >>> print(L)
+            28.600000  10.000000   3.000000  
+                ---     4.141593   9.920000  
+             2.500000      ---     6.400000  
+            >>> print(L._patterns, pattern.indices)
+            None [0 2 2]
+        """
+        assert pattern.shape == self._shape
+
+        if self._patterns is None:
+            self._patterns = []
+        for held, added in self._patterns:
+            if held is pattern:
+                added.data += pattern.scatter(vector)
+                break
+        else:
+            self._patterns.append((pattern,
+                                   sp.csr_matrix((pattern.scatter(vector),
+                                                  pattern.indices,
+                                                  pattern.indptr),
+                                                 shape=pattern.shape)))
 
     def addAtDiagonal(self, vector):
         if type(vector) in [type(1), type(1.)]:
@@ -232,6 +464,26 @@ class _ScipyMatrix(_SparseMatrix):
         ids = numerix.arange(len(vector))
         self.addAt(vector, ids, ids)
 
+    def addMatrices(self, matrices):
+        """
+        Add each of `matrices` to this one, summing all their entries
+        in a single conversion to CSR
+
+            >>> L = _ScipyMatrixFromShape(size=3)
+            >>> L.put([3., 10., numerix.pi, 2.5], [0, 0, 1, 2], [2, 1, 1, 0])
+            >>> L.addMatrices([_ScipyIdentityMatrix(size=3), L.copy(), _ScipyMatrixFromShape(size=3)])
+            >>> print(L)
+             1.000000  20.000000   6.000000  
+                ---     7.283185      ---    
+             5.000000      ---     1.000000  
+        """
+        coos = [self.matrix.tocoo()] + [matrix.matrix.tocoo() for matrix in matrices]
+
+        self.matrix = sp.csr_matrix((numerix.concatenate([coo.data for coo in coos]),
+                                     (numerix.concatenate([coo.row for coo in coos]),
+                                      numerix.concatenate([coo.col for coo in coos]))),
+                                    shape=self.matrix.shape)
+
     @property
     def numpyArray(self):
         return self.matrix.toarray()
@@ -268,10 +520,242 @@ class _ScipyMatrixFromShape(_ScipyMatrix):
         if matrix is None:
             matrix = sp.csr_matrix((size, size))
 
-        _ScipyMatrix.__init__(self, matrix=matrix)
+        _ScipyMatrix.__init__(self, matrix=matrix, capacity=sizeHint or bandwidth * size)
+
+class _ScipyBlockMatrix(_ScipyMatrix):
+
+    """Coupled matrix held as a SciPy BSR matrix, with the unknowns of each
+    cell interleaved, so that each block couples the variables of a pair
+    of cells.
+
+    The matrix is assembled from the matrix of each equation for each
+    variable, each built as though it were uncoupled, in a single
+    conversion. Everything outside sees the unknowns in the usual order,
+    every cell of the first variable before any of the next; only the
+    solvers see them interleaved, by way of `_inSolverOrder`.
+
+        >>> from fipy import Grid1D
+        >>> mesh = Grid1D(nx=3)
+        >>> A = _ScipyMeshMatrix(mesh=mesh)
+        >>> A.addAtDiagonal([1., 2., 3.])
+        >>> B = _ScipyMeshMatrix(mesh=mesh)
+        >>> B.addAt([4., 5.], [0, 2], [1, 1])
+        >>> L = _ScipyBlockMatrix(mesh=mesh, blocks=[[A, B], [None, A]])
+        >>> print(L)
+         1.000000      ---        ---        ---     4.000000      ---    
+            ---     2.000000      ---        ---        ---        ---    
+            ---        ---     3.000000      ---     5.000000      ---    
+            ---        ---        ---     1.000000      ---        ---    
+            ---        ---        ---        ---     2.000000      ---    
+            ---        ---        ---        ---        ---     3.000000  
+        >>> print(L.takeDiagonal())
+        [ 1.  2.  3.  1.  2.  3.]
+        >>> x = numerix.arange(6.)
+        >>> print(L * x)
+        [ 16.   2.  26.   3.   8.  15.]
+
+    The solvers see the interleaved BSR matrix
+
+        >>> M, order = L._inSolverOrder()
+        >>> print(M.matrix.format, M.matrix.blocksize)
+        bsr (2, 2)
+        >>> print(order)
+        [0 3 1 4 2 5]
+        >>> print(numerix.allclose(M * x[order], (L * x)[order]))
+        True
+
+    Values added with `addAt`, or put with `put`, are held in the usual
+    order until the interleaved matrix is next needed
+
+        >>> L.put([9.], [1], [1])
+        >>> L.addAt([6., 7.], [0, 3], [3, 0])
+        >>> print(len(L._puts), len(L._buffer))
+        1 2
+        >>> print(L._bsr.blocksize, L._puts, L._buffer)
+        (2, 2) None None
+        >>> print(L.takeDiagonal())
+        [ 1.  9.  3.  1.  2.  3.]
+        >>> print(L.matrix[0, 3], L.matrix[3, 0])
+        6.0 7.0
+    """
+
+    def __init__(self, mesh, blocks):
+        """
+        Parameters
+        ----------
+        mesh : ~fipy.meshes.mesh.Mesh
+            The `Mesh` to assemble the matrix for.
+        blocks : :obj:`list` of :obj:`list` of ~fipy.matrices.scipyMatrix._ScipyMatrix
+            The matrix of each equation (row) for each variable (column),
+            or `None` where the equation does not involve the variable.
+        """
+        self.mesh = mesh
+        self.numberOfVariables = len(blocks[0])
+        numberOfEquations = len(blocks)
+        assert numberOfEquations == self.numberOfVariables
+
+        N = mesh.numberOfCells
+        size = self.numberOfVariables * N
+        unknowns = numerix.arange(size)
+        # the unknown in the usual order at each interleaved position
+        self._order = (unknowns % self.numberOfVariables) * N + unknowns // self.numberOfVariables
+        # the interleaved position of each unknown in the usual order
+        self._position = numerix.argsort(self._order)
+
+        rows = [numerix.zeros((0,), 'l')]
+        columns = [numerix.zeros((0,), 'l')]
+        data = [numerix.zeros((0,), 'd')]
+        for equationIndex, equationBlocks in enumerate(blocks):
+            for varIndex, block in enumerate(equationBlocks):
+                if block is not None:
+                    coo = block.matrix.tocoo()
+                    rows.append(equationIndex * N + coo.row)
+                    columns.append(varIndex * N + coo.col)
+                    data.append(coo.data)
+
+        self._blocksize = (numberOfEquations, self.numberOfVariables)
+
+        # assembled in the usual order, and interleaved by the `matrix` setter
+        coo = sp.coo_matrix((numerix.concatenate(data),
+                             (numerix.concatenate(rows), numerix.concatenate(columns))),
+                            shape=(size, size))
+        super(_ScipyBlockMatrix, self).__init__(matrix=coo, capacity=coo.nnz)
+
+    def _interleave(self, matrix):
+        coo = matrix.tocoo()
+        return sp.coo_matrix((coo.data, (self._position[coo.row], self._position[coo.col])),
+                             shape=coo.shape).tobsr(blocksize=self._blocksize)
+
+    @property
+    def _bsr(self):
+        """The interleaved BSR matrix, with any values held by `put` and
+        `addAt` applied"""
+        if self._pending:
+            matrix = self._applyPending(self._bsrMatrix, position=self._position)
+            self._bsrMatrix = matrix.tobsr(blocksize=self._blocksize)
+        return self._bsrMatrix
+
+    @_bsr.setter
+    def _bsr(self, bsr):
+        self._bsrMatrix = bsr
+
+    def _like(self, bsr):
+        other = _ScipyBlockMatrix.__new__(_ScipyBlockMatrix)
+        other.mesh = self.mesh
+        other.numberOfVariables = self.numberOfVariables
+        other._order = self._order
+        other._position = self._position
+        other._blocksize = self._blocksize
+        super(_ScipyBlockMatrix, other).__init__(matrix=None, capacity=self._capacity)
+        other._bsr = bsr
+        return other
+
+    def _matches(self, other):
+        return (isinstance(other, _ScipyBlockMatrix)
+                and other._bsr.shape == self._bsr.shape
+                and other._bsr.blocksize == self._bsr.blocksize)
+
+    @property
+    def matrix(self):
+        """The matrix as SciPy CSR, with the unknowns in the usual order"""
+        coo = self._bsr.tocoo()
+        return sp.csr_matrix((coo.data, (self._order[coo.row], self._order[coo.col])),
+                             shape=coo.shape)
+
+    @matrix.setter
+    def matrix(self, matrix):
+        self._buffer = None
+        self._puts = None
+        self._patterns = None
+        if matrix is not None:
+            self._bsr = self._interleave(matrix)
+
+    @property
+    def _shape(self):
+        return self._bsrMatrix.shape
+
+    def copy(self):
+        return self._like(self._bsr.copy())
+
+    def _iadd(self, other, sign=1):
+        if self._matches(other):
+            self._bsr = self._bsr + sign * other._bsr
+            return self
+        else:
+            return _ScipyMatrix._iadd(self, other, sign=sign)
+
+    def __add__(self, other):
+        if self._matches(other):
+            return self._like(self._bsr + other._bsr)
+        else:
+            return _ScipyMatrix.__add__(self, other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if self._matches(other):
+            return self._like(self._bsr - other._bsr)
+        else:
+            return _ScipyMatrix.__sub__(self, other)
+
+    def __mul__(self, other):
+        """
+        Multiply by a scalar, keeping the blocks
+
+            >>> from fipy import Grid1D
+            >>> mesh = Grid1D(nx=2)
+            >>> A = _ScipyMeshMatrix(mesh=mesh)
+            >>> A.addAt([1., 2., 3.], [0, 0, 1], [0, 1, 1])
+            >>> L = _ScipyBlockMatrix(mesh=mesh, blocks=[[A, None], [A, A]])
+            >>> print(numerix.allequal((-2 * L).numpyArray, -2 * L.numpyArray))
+            True
+            >>> print(type(-2 * L).__name__)
+            _ScipyBlockMatrix
+
+        or by a vector, in the usual order
+
+            >>> print(L * numerix.array((1., 2., 3., 4.)))
+            [  5.   6.  16.  18.]
+        """
+        if not isinstance(other, _SparseMatrix) and numerix.shape(other) == ():
+            return self._like(self._bsr * other)
+        elif numerix.shape(other) == (self._bsr.shape[1],):
+            return (self._bsr * numerix.asarray(other)[self._order])[self._position]
+        else:
+            return _ScipyMatrix.__mul__(self, other)
+
+    def putDiagonal(self, vector):
+        """
+        Put elements of `vector` along diagonal of matrix
+
+            >>> from fipy import Grid1D
+            >>> mesh = Grid1D(nx=2)
+            >>> A = _ScipyMeshMatrix(mesh=mesh)
+            >>> A.addAt([1., 2., 3.], [0, 0, 1], [0, 1, 1])
+            >>> L = _ScipyBlockMatrix(mesh=mesh, blocks=[[A, None], [None, A]])
+            >>> L.putDiagonal([5., 6., 7., 8.])
+            >>> print(L)
+             5.000000   2.000000      ---        ---    
+                ---     6.000000      ---        ---    
+                ---        ---     7.000000   2.000000  
+                ---        ---        ---     8.000000  
+        """
+        if type(vector) in [int, float]:
+            vector = numerix.repeat(vector, self._shape[0])
+
+        difference = numerix.asarray(vector, dtype=float)[self._order] - self._bsr.diagonal()
+        self._bsr = self._bsr + sp.diags(difference).tobsr(blocksize=self._bsr.blocksize)
+
+    def takeDiagonal(self):
+        return self._bsr.diagonal()[self._position]
+
+    def _inSolverOrder(self):
+        return _ScipyMatrix(matrix=self._bsr), self._order
 
 class _ScipyMeshMatrix(_ScipyMatrixFromShape):
 
+    _blockMatrixClass = _ScipyBlockMatrix
+
     def __init__(self, mesh, bandwidth=0, sizeHint=None, matrix=None, numberOfVariables=1, numberOfEquations=1, storeZeros=True):
 
         """Creates a `_ScipyMatrixFromShape` associated with a `Mesh`.
@@ -293,7 +777,7 @@ class _ScipyMeshMatrix(_ScipyMatrixFromShape):
         self.numberOfVariables = numberOfVariables
         size = self.numberOfVariables * self.mesh.numberOfCells
         assert numberOfEquations == self.numberOfVariables
-        _ScipyMatrixFromShape.__init__(self, size=size, matrix=matrix)
+        _ScipyMatrixFromShape.__init__(self, size=size, bandwidth=bandwidth, sizeHint=sizeHint, matrix=matrix)
 
     def __mul__(self, other):
         if isinstance(other, _ScipyMeshMatrix):
@@ -19,6 +19,11 @@ class _SparseMatrix(object):
     numpyArray = property()
     _shape     = property()
 
+    # class that couples the matrices of each equation for each variable,
+    # built by this class as though they were uncoupled, if it has one;
+    # otherwise, coupled equations are assembled with `OffsetSparseMatrix`
+    _blockMatrixClass = None
+
     __array_priority__ = 100.0
 
     def __array_wrap(self, arr, context=None):
@@ -116,11 +121,416 @@ class _SparseMatrix(object):
     def addAtDiagonal(self, vector):
         pass
 
+    def addAtPattern(self, vector, pattern):
+        """
+        Add elements of `vector` to the positions in the matrix described
+        by a precomputed `_SparsityPattern`.
+
+        Matrix classes that can exploit the cached structure override this
+        method; the default simply falls back to `addAt`.
+
+        Parameters
+        ----------
+        vector : array_like
+            Values, in the same order as `pattern.id1` and `pattern.id2`
+        pattern : ~fipy.matrices.sparseMatrix._SparsityPattern
+        """
+        self.addAt(vector, pattern.id1, pattern.id2)
+
+    def addAtStencil(self, stencil, cell1diag, cell1offdiag, cell2offdiag, cell2diag):
+        """
+        Add the contributions of the interior faces of a structured grid,
+        given by their coefficients on every face.
+
+        Matrix classes that can apply the coefficients directly override
+        this method; the default arranges them with `stencil` and adds them
+        with `addAtPattern`.
+
+        Parameters
+        ----------
+        stencil : ~fipy.matrices.sparseMatrix._StencilPattern
+        cell1diag, cell1offdiag, cell2offdiag, cell2diag : array_like
+            Values on every face, as for :meth:`_StencilPattern.gather`.
+        """
+        self.addAtPattern(stencil.gather(cell1diag, cell1offdiag, cell2offdiag, cell2diag), stencil)
+
+    def addMatrices(self, matrices):
+        """
+        Add each of `matrices` to this one.
+
+        Matrix classes that can sum many matrices in a single pass override
+        this method; the default adds them one at a time.
+
+        Parameters
+        ----------
+        matrices : :obj:`list` of ~fipy.matrices.sparseMatrix._SparseMatrix
+        """
+        for matrix in matrices:
+            self.__iadd__(matrix)
+
     def exportMmf(self, filename):
         pass
 
+    def _inSolverOrder(self):
+        """The matrix to hand to a solver, and the order of the unknowns in
+        it, as indices into the usual order, or `None` if it is the same.
+        """
+        return self, None
+
 ##     def __array__(self):
 ##      shape = self._shape
 ##      indices = numerix.indices(shape)
 ##         numMatrix = self.take(indices[0].ravel(), indices[1].ravel())
 ##      return numerix.reshape(numMatrix, shape)
+
+
+class _SparsityPattern(object):
+    """Symbolic structure of a set of (`id1`, `id2`) matrix entries.
+
+    The compressed sparse row (CSR) structure and the map from each
+    (`id1`, `id2`) pair to its slot in the CSR `data` array are computed
+    once, on first use. Subsequent assemblies with the same connectivity
+    then only need to scatter new coefficient values.
+
+    >>> pattern = _SparsityPattern(id1=[0, 0, 1, 2, 0], id2=[2, 1, 1, 0, 2], shape=(3, 3))
+    >>> print(pattern.indptr)
+    [0 2 3 4]
+    >>> print(pattern.indices)
+    [1 2 1 0]
+    >>> print(pattern.slots)
+    [1 0 2 3 1]
+    >>> print(pattern.nnz)
+    4
+    >>> print(pattern.scatter([1., 2., 3., 4., 5.]))
+    [ 2.  6.  3.  4.]
+    """
+
+    def __init__(self, id1, id2, shape):
+        """
+        Parameters
+        ----------
+        id1 : array_like of int
+            Row indices
+        id2 : array_like of int
+            Column indices
+        shape : :obj:`tuple` of :obj:`int`
+            Shape of the matrix the pattern applies to
+        """
+        self.id1 = numerix.asarray(id1)
+        self.id2 = numerix.asarray(id2)
+        self.shape = tuple(shape)
+        self._structure = None
+
+    def _calcStructure(self):
+        rows, cols = self.shape
+        keys = self.id1.astype(numerix.INT_DTYPE) * cols + self.id2
+        unique, slots = numerix.unique(keys, return_inverse=True)
+        indptr = numerix.zeros((rows + 1,), dtype=numerix.INT_DTYPE)
+        indptr[1:] = numerix.cumsum(numerix.bincount(unique // cols, minlength=rows))
+
+        return (indptr, (unique % cols).astype(numerix.INT_DTYPE), slots.ravel())
+
+    @property
+    def _csr(self):
+        if self._structure is None:
+            self._structure = self._calcStructure()
+        return self._structure
+
+    @property
+    def indptr(self):
+        return self._csr[0]
+
+    @property
+    def indices(self):
+        return self._csr[1]
+
+    @property
+    def slots(self):
+        return self._csr[2]
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def scatter(self, vector):
+        """Sum `vector` into an array ordered like the CSR `data`.
+        """
+        return numerix.bincount(self.slots,
+                                weights=numerix.asarray(vector, dtype=float).ravel(),
+                                minlength=self.nnz)
+
+class _StencilPattern(_SparsityPattern):
+    """Structure of the entries coupling the cells of a structured grid
+    across its interior faces.
+
+    The faces normal to each axis of the grid form a block with one more
+    layer than the cells along that axis, so the neighbor across each
+    interior face is at a fixed offset and the coefficients of the faces
+    can be arranged in compressed sparse row (CSR) order with slices,
+    without gathering them from the list of interior faces or scattering
+    them into the pattern.
+
+    >>> from fipy import Grid2D
+    >>> mesh = Grid2D(nx=3, ny=2)
+    >>> stencil = _StencilPattern(*mesh._stencilFaces)
+    >>> print(stencil.offsets)
+    [-3 -1  0  1  3]
+    >>> print(stencil.indptr)
+    [ 0  3  7 10 13 17 20]
+    >>> print(stencil.indices)
+    [0 1 3 0 1 2 4 1 2 5 0 3 4 1 3 4 5 2 4 5]
+
+    Entries are in the same positions as those of the generic pattern of
+    the interior faces, with the same values
+
+    >>> from fipy.tools import numerix
+    >>> from fipy.terms.diffusionTerm import DiffusionTerm
+    >>> from fipy.variables.cellVariable import CellVariable
+    >>> interiorFaces, pattern = DiffusionTerm()._getInteriorFacePattern(CellVariable(mesh=mesh))
+    >>> print(numerix.allclose(stencil.indptr, pattern.indptr)
+    ...       and numerix.allclose(stencil.indices, pattern.indices))
+    True
+    >>> coeff = numerix.arange(mesh.numberOfFaces) + 1.
+    >>> values = [numerix.take(c, interiorFaces) for c in (-coeff, coeff, 2 * coeff, -2 * coeff)]
+    >>> print(numerix.allclose(stencil.gather(-coeff, coeff, 2 * coeff, -2 * coeff),
+    ...                        pattern.scatter(numerix.concatenate(values))))
+    True
+    """
+
+    def __init__(self, cellShape, faceBlocks):
+        """
+        Parameters
+        ----------
+        cellShape : :obj:`tuple` of :obj:`int`
+            Number of cells along each axis, slowest varying first.
+        faceBlocks : :obj:`list` of :obj:`tuple`
+            For each axis, the axis, the ID of the first face normal to it,
+            and the shape of the block of those faces.
+        """
+        self.cellShape = tuple(cellShape)
+        # an axis with a single layer of cells has no interior faces
+        self.faceBlocks = [(axis, start, faceShape) for axis, start, faceShape in faceBlocks
+                           if self.cellShape[axis] > 1]
+        size = int(numerix.prod(self.cellShape))
+        self.shape = (size, size)
+        self._structure = None
+
+        strides = [int(numerix.prod(self.cellShape[axis + 1:])) for axis in range(len(self.cellShape))]
+        self._axisOffsets = [strides[axis] for axis, start, faceShape in self.faceBlocks]
+        self.offsets = numerix.array(sorted([-offset for offset in self._axisOffsets]
+                                            + [0] + self._axisOffsets))
+
+    def _slices(self, axis):
+        """Slices of the cells on the low and high side of the interior
+        faces normal to `axis`, and of those faces in their block"""
+        low = [slice(None)] * len(self.cellShape)
+        high = list(low)
+        faces = list(low)
+        low[axis] = slice(None, -1)
+        high[axis] = slice(1, None)
+        faces[axis] = slice(1, -1)
+        return tuple(low), tuple(high), tuple(faces)
+
+    def _column(self, offset):
+        return int(numerix.searchsorted(self.offsets, offset))
+
+    def _calcStructure(self):
+        present = numerix.zeros(self.cellShape + (len(self.offsets),), dtype=bool)
+        for offset, (axis, start, faceShape) in zip(self._axisOffsets, self.faceBlocks):
+            low, high, faces = self._slices(axis)
+            present[low + (self._column(offset),)] = True
+            present[high + (self._column(-offset),)] = True
+        present = present.reshape((self.shape[0], len(self.offsets)))
+        # cells with no neighbors have no entries at all
+        present[..., self._column(0)] = present.any(axis=-1)
+
+        indptr = numerix.zeros((self.shape[0] + 1,), dtype=numerix.INT_DTYPE)
+        indptr[1:] = numerix.cumsum(present.sum(axis=-1))
+        cells = numerix.arange(self.shape[0])[..., numerix.newaxis]
+        indices = (cells + self.offsets[numerix.newaxis, ...])[present]
+        # :meth:`gather` keeps each offset contiguous, so the CSR entries
+        # are taken from it column by column
+        order = (cells + self.shape[0] * numerix.arange(len(self.offsets))[numerix.newaxis, ...])[present]
+
+        return (indptr, indices.astype(numerix.INT_DTYPE), order)
+
+    @property
+    def slots(self):
+        return numerix.arange(self.nnz)
+
+    @property
+    def id1(self):
+        return numerix.repeat(numerix.arange(self.shape[0]), numerix.diff(self.indptr))
+
+    @property
+    def id2(self):
+        return self.indices
+
+    def scatter(self, vector):
+        """Values from :meth:`gather` are already in CSR order."""
+        return numerix.asarray(vector, dtype=float).ravel()
+
+    def _blocks(self, *coeffs):
+        """For each axis with interior faces, its offset, the slices of
+        :meth:`_slices` and the values of each of `coeffs` on its interior
+        faces, arranged like the cells on either side"""
+        coeffs = [numerix.asarray(coeff).ravel() for coeff in coeffs]
+        for offset, (axis, start, faceShape) in zip(self._axisOffsets, self.faceBlocks):
+            low, high, faces = self._slices(axis)
+            stop = start + int(numerix.prod(faceShape))
+            yield (offset, low, high,
+                   [coeff[start:stop].reshape(faceShape)[faces] for coeff in coeffs])
+
+    def gather(self, cell1diag, cell1offdiag, cell2offdiag, cell2diag):
+        """Arrange the contributions of the interior faces in CSR order.
+
+        Parameters
+        ----------
+        cell1diag, cell1offdiag, cell2offdiag, cell2diag : array_like
+            Values on every face of the contributions to the diagonal of
+            the cell on the low side of the face, to that cell's coupling
+            to the cell on the high side, to the high cell's coupling to
+            the low cell, and to the diagonal of the high cell.
+        """
+        values = numerix.zeros((len(self.offsets),) + self.cellShape, dtype=float)
+        diagonal = values[self._column(0)]
+        for offset, low, high, (c1diag, c1offdiag, c2offdiag, c2diag) in self._blocks(cell1diag, cell1offdiag,
+                                                                                          cell2offdiag, cell2diag):
+            diagonal[low] += c1diag
+            diagonal[high] += c2diag
+            values[self._column(offset)][low] = c1offdiag
+            values[self._column(-offset)][high] = c2offdiag
+
+        return numerix.take(values.ravel(), self._csr[2])
+
+    def multiply(self, x, cell1diag, cell1offdiag, cell2offdiag, cell2diag):
+        """Product of the matrix of the contributions of the interior
+        faces with `x`, without arranging them, in one pass over the faces
+        normal to each axis
+
+        >>> from fipy import Grid2D
+        >>> from fipy.tools import numerix
+        >>> mesh = Grid2D(nx=3, ny=2)
+        >>> stencil = _StencilPattern(*mesh._stencilFaces)
+        >>> coeff = numerix.arange(mesh.numberOfFaces) + 1.
+        >>> x = numerix.arange(mesh.numberOfCells) ** 2.
+        >>> import scipy.sparse as sp
+        >>> A = sp.csr_matrix((stencil.gather(-coeff, coeff, 2 * coeff, -2 * coeff),
+        ...                    stencil.indices, stencil.indptr), shape=stencil.shape)
+        >>> print(numerix.allclose(stencil.multiply(x, -coeff, coeff, 2 * coeff, -2 * coeff),
+        ...                        A * x))
+        True
+        >>> print(numerix.allclose(stencil.diagonal(-coeff, -2 * coeff), A.diagonal()))
+        True
+
+        Parameters
+        ----------
+        x : array_like
+            Value in every cell.
+        cell1diag, cell1offdiag, cell2offdiag, cell2diag : array_like
+            Values on every face, as for :meth:`gather`.
+        """
+        x = numerix.asarray(x).reshape(self.cellShape)
+        y = numerix.zeros(self.cellShape, dtype=float)
+        for offset, low, high, (c1diag, c1offdiag, c2offdiag, c2diag) in self._blocks(cell1diag, cell1offdiag,
+                                                                                          cell2offdiag, cell2diag):
+            y[low] += c1diag * x[low] + c1offdiag * x[high]
+            y[high] += c2offdiag * x[low] + c2diag * x[high]
+
+        return y.ravel()
+
+    def diagonal(self, cell1diag, cell2diag):
+        """Diagonal of the matrix of the contributions of the interior
+        faces, given the contributions to the diagonals of the cells on
+        either side"""
+        y = numerix.zeros(self.cellShape, dtype=float)
+        for offset, low, high, (c1diag, c2diag) in self._blocks(cell1diag, cell2diag):
+            y[low] += c1diag
+            y[high] += c2diag
+
+        return y.ravel()
+
+class _MeshGraph(object):
+    """Structure of the matrices of a mesh that couple every variable of
+    each cell this processor owns to every variable of the cell and of
+    its neighbours, with one row for each equation of each cell.
+
+    Rows and columns are numbered globally, the equations, and the
+    variables, of all the cells one after the other. The rows are in the
+    order of the cells this processor owns, equation by equation, and
+    the columns of each row are contiguous in `id2`
+
+    >>> from fipy import Grid1D
+    >>> graph = _MeshGraph(Grid1D(nx=3), numberOfVariables=2, numberOfEquations=2)
+    >>> print(graph.rows)
+    [0 1 2 3 4 5]
+    >>> print(graph.counts)
+    [4 6 4 4 6 4]
+    >>> print(graph.id2[:graph.counts[0] + graph.counts[1]])
+    [0 1 3 4 1 0 2 4 3 5]
+    >>> print(numerix.all(graph.id1 == numerix.repeat(graph.rows, graph.counts)))
+    True
+
+    Entries are looked up without the matrix
+
+    >>> print(graph.contains([0, 1, 4], [4, 2, 3]))
+    True
+    >>> print(graph.contains([0, 3], [1, 5]))
+    False
+    """
+
+    def __init__(self, mesh, numberOfVariables=1, numberOfEquations=1):
+        """
+        Parameters
+        ----------
+        mesh : ~fipy.meshes.mesh.Mesh
+            The mesh whose cells are coupled.
+        numberOfVariables : int
+            The number of variables in each cell.
+        numberOfEquations : int
+            The number of equations in each cell.
+        """
+        from fipy.tools.numerix import MA
+
+        N = mesh.globalNumberOfCells
+        cells = numerix.asarray(mesh._localNonOverlappingCellIDs)
+        globalIDs = numerix.asarray(mesh._globalOverlappingCellIDs)
+
+        # each cell, followed by its neighbours
+        neighbours = MA.concatenate((MA.array(cells[numerix.newaxis, ...]),
+                                     mesh._cellToCellIDs[..., cells]))
+        exists = ~MA.getmaskarray(neighbours)
+        cellColumns = globalIDs[MA.filled(neighbours, 0).T[exists.T]]
+        cellCounts = exists.sum(axis=0)
+
+        # the columns of every variable of those cells, cell by cell
+        variables = numerix.arange(numberOfVariables)[..., numerix.newaxis] * N
+        columns = (cellColumns[numerix.newaxis, ...] + variables).ravel()
+        owners = numerix.tile(numerix.repeat(numerix.arange(len(cells)), cellCounts),
+                              numberOfVariables)
+        columns = columns[numerix.argsort(owners, kind='stable')]
+
+        equations = numerix.arange(numberOfEquations)[..., numerix.newaxis] * N
+        self.rows = (globalIDs[cells][numerix.newaxis, ...] + equations).ravel()
+        self.counts = numerix.tile(cellCounts * numberOfVariables, numberOfEquations)
+        self.id1 = numerix.repeat(self.rows, self.counts)
+        self.id2 = numerix.tile(columns, numberOfEquations)
+
+        self._columns = numberOfVariables * N
+        self._keys = numerix.sort(self.id1.astype(numerix.int64) * self._columns + self.id2)
+
+    def contains(self, id1, id2):
+        """Whether every (`id1`, `id2`) entry is in the graph"""
+        keys = (numerix.asarray(id1, dtype=numerix.int64) * self._columns
+                + numerix.asarray(id2, dtype=numerix.int64)).ravel()
+        where = numerix.searchsorted(self._keys, keys)
+        if numerix.any(where == len(self._keys)):
+            return False
+        return bool(numerix.all(self._keys[where] == keys))
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -10,7 +10,7 @@ if solver == 'trilinos':
 elif solver == 'no-pysparse':
     docTestModuleNames = ('trilinosMatrix',)
 elif solver == 'scipy' or solver == 'pyamg':
-    docTestModuleNames = ('scipyMatrix',)
+    docTestModuleNames = ('scipyMatrix', 'matrixFreeMatrix')
 elif solver == 'pysparse':
     docTestModuleNames = ('pysparseMatrix',)
 elif solver == 'pyamgx':
@@ -20,6 +20,8 @@ elif solver == 'petsc':
 else:
     raise ImportError('Unknown solver package %s' % solver)
 
+docTestModuleNames = ('sparseMatrix',) + docTestModuleNames
+
 def _suite():
     return _LateImportDocTestSuite(docTestModuleNames=docTestModuleNames, base=__name__)
 
@@ -7,12 +7,18 @@ __docformat__ = 'restructuredtext'
 
 __all__ = []
 
+import weakref
+
 from PyTrilinos import Epetra
 from PyTrilinos import EpetraExt
 
-from fipy.matrices.sparseMatrix import _SparseMatrix
+from fipy.matrices.sparseMatrix import _SparseMatrix, _MeshGraph
 from fipy.tools import numerix
 
+# maps and graph of the matrices of each mesh, by numbers of variables and
+# equations
+_structures = weakref.WeakKeyDictionary()
+
 # Current inadequacies of the matrix class:
 
 # 1) Adding matrices - the matrix with fewer non-zeros gets added into the one
@@ -22,7 +28,8 @@ from fipy.tools import numerix
 # matrix class is.
 #
 # 2) addAt currently not guaranteed to work for fill-completed matrices, if
-# elements are being added in new spots.
+# elements are being added in new spots. A mesh matrix that is built on the
+# graph of its mesh checks, and moves to a structure that can grow.
 #
 # 3) put currently not guaranteed to work for non-empty matrices that do not
 # have all the target spots occupied.
@@ -444,6 +451,17 @@ class _TrilinosMatrix(_SparseMatrix):
             ids = numerix.arange(len(vector))
             self.addAt(vector, ids, ids)
 
+    def _loosenStructure(self):
+        """Move the values of the matrix into one whose structure can grow"""
+        self.fillComplete()
+        matrix = Epetra.CrsMatrix(Epetra.Copy, self.rowMap, (self.bandwidth * 3) // 2)
+        err = EpetraExt.Add(self.matrix, False, 1, matrix, 0)
+        if err != 0:
+            # the values would be lost, so the matrix is left as it was
+            raise RuntimeError("Processor %d, EpetraExt.Add returned error code %d in _loosenStructure" \
+              % (self.comm.MyPID(), err))
+        self.matrix = matrix
+
     def exportMmf(self, filename):
         """
         Exports the matrix to a Matrix Market file of the given `filename`.
@@ -578,19 +596,117 @@ class _TrilinosMeshMatrix(_TrilinosMatrixFromShape):
         self.numberOfVariables = numberOfVariables
         self.numberOfEquations = numberOfEquations
 
-        comm = mesh.communicator.epetra_comm
-        rowMap = Epetra.Map(-1, list(self._globalNonOverlappingRowIDs), 0, comm)
-        colMap = Epetra.Map(-1, list(self._globalOverlappingColIDs), 0, comm)
+        rowMap, colMap = self._maps
         domainMap = rowMap
 
-        _TrilinosMatrixFromShape.__init__(self,
-                                 rows=self.numberOfEquations * self.mesh.globalNumberOfCells,
-                                 cols=self.numberOfVariables * self.mesh.globalNumberOfCells,
-                                 bandwidth=bandwidth,
-                                 sizeHint=sizeHint,
-                                 rowMap=rowMap,
-                                 colMap=colMap,
-                                 domainMap=domainMap)
+        if bandwidth == 1:
+            # a diagonal matrix is better off without the graph
+            _TrilinosMatrixFromShape.__init__(self,
+                                     rows=self.numberOfEquations * self.mesh.globalNumberOfCells,
+                                     cols=self.numberOfVariables * self.mesh.globalNumberOfCells,
+                                     bandwidth=bandwidth,
+                                     sizeHint=sizeHint,
+                                     rowMap=rowMap,
+                                     colMap=colMap,
+                                     domainMap=domainMap)
+        else:
+            # values are summed into, and replaced in, the structure of the
+            # graph, with no further communication of structure
+            matrix = Epetra.CrsMatrix(Epetra.Copy, self._graph)
+            matrix.FillComplete(domainMap, rowMap)
+
+            _TrilinosMatrix.__init__(self,
+                                     matrix=matrix,
+                                     rowMap=rowMap,
+                                     colMap=colMap,
+                                     domainMap=domainMap,
+                                     bandwidth=bandwidth)
+
+    @property
+    def _structure(self):
+        """Maps and graph shared by the matrices of this mesh, with these
+        numbers of variables and equations"""
+        structures = _structures.setdefault(self.mesh, {})
+        key = (self.numberOfVariables, self.numberOfEquations)
+        if key not in structures:
+            comm = self.mesh.communicator.epetra_comm
+            rowMap = Epetra.Map(-1, list(self._globalNonOverlappingRowIDs), 0, comm)
+            colMap = Epetra.Map(-1, list(self._globalOverlappingColIDs), 0, comm)
+            structures[key] = dict(maps=(rowMap, colMap), meshGraph=None, graph=None)
+        return structures[key]
+
+    @property
+    def _meshGraph(self):
+        structure = self._structure
+        if structure['meshGraph'] is None:
+            structure['meshGraph'] = _MeshGraph(self.mesh,
+                                                numberOfVariables=self.numberOfVariables,
+                                                numberOfEquations=self.numberOfEquations)
+        return structure['meshGraph']
+
+    @property
+    def _maps(self):
+        return self._structure['maps']
+
+    @property
+    def _graph(self):
+        """`Epetra.CrsGraph` that couples every variable of each cell to
+        every variable of the cell and of its neighbours, built and
+        filled once for all the matrices of the mesh
+
+            >>> from fipy import Grid2D
+            >>> mesh = Grid2D(nx=3, ny=2)
+            >>> L = _TrilinosMeshMatrix(mesh=mesh, bandwidth=5)
+            >>> print(L.matrix.Filled(), L.matrix.NumGlobalNonzeros())
+            True 20
+            >>> L.addAt((1., 2., -3.), (0, 1, 4), (1, 1, 5))
+            >>> print(L)
+                ---     1.000000      ---        ---        ---        ---    
+                ---     2.000000      ---        ---        ---        ---    
+                ---        ---        ---        ---        ---        ---    
+                ---        ---        ---        ---        ---        ---    
+                ---        ---        ---        ---        ---    -3.000000  
+                ---        ---        ---        ---        ---        ---    
+            >>> print(_TrilinosMeshMatrix(mesh=mesh)._graph is L._graph)
+            True
+
+        Entries outside the graph are not dropped; the matrix moves to a
+        structure of its own that can hold them
+
+            >>> L.addAt((4.,), (0,), (5,))
+            >>> print(L.matrix.StaticGraph())
+            False
+            >>> print(L)
+                ---     1.000000      ---        ---        ---     4.000000  
+                ---     2.000000      ---        ---        ---        ---    
+                ---        ---        ---        ---        ---        ---    
+                ---        ---        ---        ---        ---        ---    
+                ---        ---        ---        ---        ---    -3.000000  
+                ---        ---        ---        ---        ---        ---    
+        """
+        structure = self._structure
+        if structure['graph'] is None:
+            rowMap, colMap = structure['maps']
+            meshGraph = self._meshGraph
+
+            # the entries are inserted all at once, from the rows of the
+            # mesh graph, and the filled structure is kept
+            matrix = Epetra.CrsMatrix(Epetra.Copy, rowMap, colMap,
+                                      int(meshGraph.counts.max(initial=0)))
+            matrix.InsertGlobalValues(meshGraph.id1.astype('int32'),
+                                      meshGraph.id2.astype('int32'),
+                                      numerix.zeros(len(meshGraph.id1), 'd'))
+            matrix.FillComplete(rowMap, rowMap)
+            matrix.OptimizeStorage()
+            structure['graph'] = Epetra.CrsGraph(matrix.Graph())
+
+        return structure['graph']
+
+    def _makeRoomFor(self, id1, id2):
+        """Loosen the structure of a matrix built on the graph of the mesh
+        if the (`id1`, `id2`) entries are not all in it"""
+        if self.matrix.StaticGraph() and not self._meshGraph.contains(id1, id2):
+            self._loosenStructure()
 
     def _cellIDsToGlobalRowIDs(self, IDs):
          N = len(IDs)
@@ -697,10 +813,12 @@ class _TrilinosMeshMatrix(_TrilinosMatrixFromShape):
 
     def put(self, vector, id1, id2):
         vector, id1, id2 = self._globalNonOverlapping(vector, id1, id2)
+        self._makeRoomFor(id1, id2)
         _TrilinosMatrixFromShape.put(self, vector=vector, id1=id1, id2=id2)
 
     def addAt(self, vector, id1, id2):
         vector, id1, id2 = self._globalNonOverlapping(vector, id1, id2)
+        self._makeRoomFor(id1, id2)
         _TrilinosMatrixFromShape.addAt(self, vector=vector, id1=id1, id2=id2)
 
     def takeDiagonal(self):
@@ -247,7 +247,8 @@ class AbstractMesh(object):
         ## get the cells adjacent to faces1
         faceCellIDs = MA.take(self.faceCellIDs[0], faces1)
         ## get all the adjacent faces for those particular cells
-        cellFaceIDs = numerix.take(self.cellFaceIDs, faceCellIDs, axis=1)
+        allCellFaceIDs = self.cellFaceIDs
+        cellFaceIDs = numerix.take(allCellFaceIDs, faceCellIDs, axis=1)
         for i in range(cellFaceIDs.shape[0]):
             ## if the faces is a member of faces1 then change the face to point at
             ## faces0
@@ -255,7 +256,8 @@ class AbstractMesh(object):
                                       faces0,
                                       cellFaceIDs[i])
             ## add those faces back to the main self.cellFaceIDs
-            numerix.put(self.cellFaceIDs[i], faceCellIDs, cellFaceIDs[i])
+            numerix.put(allCellFaceIDs[i], faceCellIDs, cellFaceIDs[i])
+        self.cellFaceIDs = allCellFaceIDs
 
         ## calculate new topology
         self._setTopology()
@@ -2,7 +2,6 @@ from __future__ import print_function
 from __future__ import division
 from __future__ import unicode_literals
 from builtins import object
-from builtins import zip
 from builtins import range
 from builtins import str
 __docformat__ = 'restructuredtext'
@@ -13,7 +12,6 @@ import sys
 import tempfile
 from textwrap import dedent
 import warnings
-from distutils.version import StrictVersion
 
 from fipy.tools import numerix as nx
 from fipy.tools import parallelComm
@@ -23,6 +21,7 @@ from fipy.tests.doctestPlus import register_skipper
 from fipy.meshes.mesh import Mesh
 from fipy.meshes.mesh2D import Mesh2D
 from fipy.meshes.topologies.meshTopology import _MeshTopology
+from fipy.meshes.mshReader import _MSHReader, _nodesPerElement
 
 from fipy.tools.debug import PRINT
 
@@ -34,11 +33,16 @@ __all__ = [text_to_native_str(n) for n in __all__]
 
 DEBUG = False
 
+def _strictVersion(version):
+    # `distutils` pulls in `setuptools`, so only import it once Gmsh is needed
+    from distutils.version import StrictVersion
+    return StrictVersion(version)
+
 def _checkForGmsh():
     hasGmsh = True
     try:
         version = _gmshVersion(communicator=parallelComm)
-        hasGmsh = version >= StrictVersion("2.0")
+        hasGmsh = version >= _strictVersion("2.0")
     except Exception:
         hasGmsh = False
     return hasGmsh
@@ -93,18 +97,21 @@ def gmshVersion(communicator=parallelComm):
 def _gmshVersion(communicator=parallelComm):
     version = gmshVersion(communicator) or "0.0"
     try:
-        version = StrictVersion(version)
+        version = _strictVersion(version)
     except ValueError:
         # gmsh returns the version string in stderr,
         # which means it's often unparsable due to irrelevant warnings
         # assume it's OK and move on
-        version = StrictVersion("3.0")
+        version = _strictVersion("3.0")
 
     return version
 
-def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parallelComm, overlap=1, mode='r', background=None):
+def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parallelComm, overlap=1, mode='r', background=None, reorder=None):
     """Open a Gmsh `MSH` file
 
+    An existing `MSH` file is read without running Gmsh, which is only
+    invoked to mesh a `.geo` file or script.
+
     Parameters
     ----------
     filename : str
@@ -126,16 +133,14 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
         Add a `b` to the mode for binary files.
     background : ~fipy.variables.cellVariable.CellVariable
         Specifies the desired characteristic lengths of the mesh cells
+    reorder : {None, 'rcm', 'morton'}
+        Renumber the cells read, by reverse Cuthill-McKee on the vertices
+        they share, or along a Morton curve through their centers.
     """
 
     if overlap > 1:
         communicator = serialComm
 
-    # Enforce gmsh version to be either >= 2 or 2.5, based on Nproc.
-    version = _gmshVersion(communicator=communicator)
-    if version < StrictVersion("2.0"):
-        raise EnvironmentError("Gmsh version must be >= 2.0.")
-
     # If we're being passed a .msh file, leave it be. Otherwise,
     # we've gotta compile a .msh file from either (i) a .geo file,
     # or (ii) a gmsh script passed as a string.
@@ -173,10 +178,16 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
                 geoFile = name
 
         if geoFile is not None:
+            # Enforce gmsh version to be either >= 2 or 2.5, based on Nproc.
+            # An existing .msh file is read without gmsh.
+            version = _gmshVersion(communicator=communicator)
+            if version < _strictVersion("2.0"):
+                raise EnvironmentError("Gmsh version must be >= 2.0.")
+
             gmshFlags = ["-%d" % dimensions, "-nopopup"]
 
             if communicator.Nproc > 1:
-                if not (StrictVersion("2.5") < version <= StrictVersion("4.0")):
+                if not (_strictVersion("2.5") < version <= _strictVersion("4.0")):
                     warnstr = "Cannot partition with Gmsh version < 2.5 or >= 4.0. " \
                                + "Reverting to serial."
                     warnings.warn(warnstr, RuntimeWarning, stacklevel=2)
@@ -188,7 +199,7 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
                         raise ValueError("'dimensions' must be specified to generate a mesh from a geometry script")
                 else: # gmsh version is adequate for partitioning
                     gmshFlags += ["-part", "%d" % communicator.Nproc]
-                    if version >= StrictVersion("4.0"):
+                    if version >= _strictVersion("4.0"):
                         # Gmsh 4.x needs to be told to generate ghost cells
                         # Unfortunately, the ghosts are broken
                         # https://gitlab.onelab.info/gmsh/gmsh/issues/733
@@ -254,7 +265,8 @@ def openMSHFile(name, dimensions=None, coordDimensions=None, communicator=parall
                    communicator=communicator,
                    gmshOutput=gmshOutput,
                    mode=mode,
-                   fileIsTemporary=fileIsTemporary)
+                   fileIsTemporary=fileIsTemporary,
+                   reorder=reorder)
 
 def openPOSFile(name, communicator=parallelComm, mode='w'):
     """Open a Gmsh `POS` post-processing file
@@ -492,10 +504,10 @@ class MSHFile(GmshFile):
     partitions matching `Nproc`, or the mesh must be specified with a `.geo` file
     or multiline string.
 
-    Does not support gmsh versions < 2. If partitioning, gmsh
-    version must be >= 2.5.
-
-    TODO: Refactor face extraction functions.
+    Reads the ASCII and binary forms of versions 2 and 4.1 of the `MSH`
+    format with :class:`~fipy.meshes.mshReader._MSHReader`, so Gmsh itself
+    is only needed to mesh a geometry. Partitioned `MSH` 4 files are not
+    supported. If partitioning, gmsh version must be >= 2.5.
     """
     def __init__(self, filename,
                        dimensions,
@@ -503,7 +515,8 @@ class MSHFile(GmshFile):
                        communicator=parallelComm,
                        gmshOutput="",
                        mode='r',
-                       fileIsTemporary=False):
+                       fileIsTemporary=False,
+                       reorder=None):
         """
         Parameters
         ----------
@@ -526,347 +539,351 @@ class MSHFile(GmshFile):
             Add a `b` to the mode for binary files.
         fileIsTemporary : bool
             If `True`, `filename` should be cleaned up on deletion
+        reorder : {None, 'rcm', 'morton'}
+            Renumber the cells read, by reverse Cuthill-McKee on the
+            vertices they share, or along a Morton curve through their
+            centers.
         """
         self.dimensions = dimensions
         self.coordDimensions = coordDimensions
         self.gmshOutput = gmshOutput
+        self.reorder = reorder
 
         self.mesh = None
         self.meshWritten = False
 
         GmshFile.__init__(self, filename=filename, communicator=communicator, mode=mode, fileIsTemporary=fileIsTemporary)
 
-    def _getMetaData(self):
-        """
-        Extracts `gmshVersion`, file-type, and data-size in that
-        order.
+    # the faces of cells that are not regular poly(gon|hedra),
+    # as the positions of their vertices within the cell
+    _hexahedronFaces = [[0, 1, 2, 3], # ordering of vertices gleaned from
+                        [4, 5, 6, 7], # a one-cube Grid3D example
+                        [0, 1, 5, 4],
+                        [3, 2, 6, 7],
+                        [0, 3, 7, 4],
+                        [1, 2, 6, 5]]
+    _prismFaces = [[0, 1, 2],
+                   [5, 4, 3],
+                   [3, 4, 1, 0],
+                   [4, 5, 2, 1],
+                   [5, 3, 0, 2]]
+    _pyramidFaces = [[0, 1, 2, 3],
+                     [0, 1, 4],
+                     [1, 2, 4],
+                     [2, 3, 4],
+                     [3, 0, 4]]
+
+    def _faceOrderings(self, shapeType):
+        """Return the faces of a cell of `shapeType`, as the positions of
+        their vertices within the cell
         """
-        self._seekForHeader("MeshFormat")
-        metaData = self.fileobj.readline().split()
-        self.fileobj.seek(0)
-        return [float(x) for x in metaData]
-
-    def _isolateData(self, title):
+        if shapeType in [5, 12, 17]: # hexahedron
+            return self._hexahedronFaces
+        elif shapeType in [6, 13, 18]: # prism
+            return self._prismFaces
+        elif shapeType in [7, 14, 19]: # pyramid
+            return self._pyramidFaces
+        else:
+            if shapeType in [2, 9, 20, 21, 22, 23, 24, 25]:
+                faceLength = 2 # triangle
+            elif shapeType in [3, 10, 16]:
+                faceLength = 2 # quadrangle
+            elif shapeType in [4, 11, 29, 30, 31]:
+                faceLength = 3 # tetrahedron
+
+            # a regular poly(gon|hedron); we may wrap
+            numNodes = _nodesPerElement[shapeType]
+            return [[(i + j) % numNodes for j in range(faceLength)]
+                    for i in range(self.numFacesPerCell[shapeType])]
+
+    @staticmethod
+    def _faceKeys(faces, width):
+        """Return keys that are equal for faces with the same vertices
+
+        `faces` holds the vertices of each face, padded with `-1`.
         """
-        Gets all data between $[title] and $End[title], writes
-        it out to its own file.
+        lengths = (faces != -1).sum(axis=1)
+        padded = nx.empty((len(faces), width), dtype=faces.dtype)
+        padded.fill(-1)
+        padded[:, :faces.shape[1]] = faces
+        return nx.concatenate((lengths[..., nx.newaxis],
+                               nx.sort(padded, axis=1)), axis=1)
+
+    def _deriveCellsAndFaces(self, cellsToVertIDs, shapeTypes):
         """
-        newF, newPath = tempfile.mkstemp(title, text=True)
-        newF = os.fdopen(newF, 'w')
-        try:
-            self._seekForHeader(title)
-        except Exception as e:
-            newF.close()
-            os.unlink(newPath)
-            raise
-
-        # extract the actual data within section
-        while True:
-            line = self.fileobj.readline()
-            if ("$End%s" % title) not in line:
-                newF.write(line)
-            else: break
-
-        self.fileobj.seek(0)
-        newF.close()
-        return newPath
+        Uses the vertices of each cell to deliver `facesToVertices` and
+        `cellsToFaces`.
 
-    def _seekForHeader(self, title):
+        Faces are numbered in the order they are first encountered,
+        cell by cell.
         """
-        Iterate through a file until we end up at the section header
-        for `title`. Function has obvious side-effects on `self.fileobj`.
-        """
-        while True:
-            line = self.fileobj.readline()
-            if len(line) == 0:
-                raise EOFError("No `%s' header found!" % title)
-                break
-            elif (("$%s" % title) not in line):
-                continue
-            else:
-                break # found header
-
-    def _deriveCellsAndFaces(self, cellsToVertIDs, shapeTypes, numCells):
-        """
-        Uses element information obtained from `_parseElementFile` to deliver
-        `facesToVertices` and `cellsToFaces`.
-        """
-
-        allShapes  = nx.unique(shapeTypes).tolist()
-        maxFaces   = max([self.numFacesPerCell[x] for x in allShapes])
+        numCells = len(shapeTypes)
+        orderings = dict((shapeType, self._faceOrderings(shapeType))
+                         for shapeType in nx.unique(shapeTypes))
+        maxFaces = max([len(ordering) for ordering in orderings.values()])
+        maxFaceLen = max([len(face) for ordering in orderings.values() for face in ordering])
+
+        # the vertices of every face of every cell, padded with -1
+        cellFaceVertices = nx.empty((numCells, maxFaces, maxFaceLen), dtype=cellsToVertIDs.dtype)
+        cellFaceVertices.fill(-1)
+        for shapeType, ordering in orderings.items():
+            cells = nx.flatnonzero(shapeTypes == shapeType)
+            for faceIdx, face in enumerate(ordering):
+                cellFaceVertices[cells, faceIdx, :len(face)] = cellsToVertIDs[cells][..., face]
+
+        # faces with the same vertices are the same face,
+        # numbered in the order they are first encountered
+        exists = (cellFaceVertices != -1).any(axis=-1)
+        faces = cellFaceVertices[exists]
+        keys = self._faceKeys(faces, width=maxFaceLen)
+        unique, first, inverse = nx.unique(keys, axis=0,
+                                           return_index=True, return_inverse=True)
+        order = nx.argsort(first)
+        faceIDs = nx.empty((len(order),), dtype='l')
+        faceIDs[order] = nx.arange(len(order))
 
         # `cellsToFaces` must be padded with -1; see mesh.py
-        currNumFaces = 0
-        cellsToFaces = nx.ones((numCells, maxFaces), 'l') * -1
-        facesDict    = {}
-        uniqueFaces  = []
-
-        # we now build `cellsToFaces` and `uniqueFaces`,
-        # the latter will result in `facesToVertices`.
-        for cellIdx in range(numCells):
-            shapeType = shapeTypes[cellIdx]
-            cell = cellsToVertIDs[cellIdx]
-
-            if shapeType in [5, 12, 17]: # hexahedron
-                faces = self._extractOrderedFaces(cell=cell,
-                                                  faceOrderings=[[0, 1, 2, 3], # ordering of vertices gleaned from
-                                                                 [4, 5, 6, 7], # a one-cube Grid3D example
-                                                                 [0, 1, 5, 4],
-                                                                 [3, 2, 6, 7],
-                                                                 [0, 3, 7, 4],
-                                                                 [1, 2, 6, 5]])
-            elif shapeType in [6, 13, 18]: # prism
-                faces = self._extractOrderedFaces(cell=cell,
-                                                  faceOrderings=[[0, 1, 2],
-                                                                 [5, 4, 3],
-                                                                 [3, 4, 1, 0],
-                                                                 [4, 5, 2, 1],
-                                                                 [5, 3, 0, 2]])
-            elif shapeType in [7, 14, 19]: # pyramid
-                faces = self._extractOrderedFaces(cell=cell,
-                                                  faceOrderings=[[0, 1, 2, 3],
-                                                                 [0, 1, 4],
-                                                                 [1, 2, 4],
-                                                                 [2, 3, 4],
-                                                                 [3, 0, 4]])
-            else:
-                if shapeType in [2, 9, 20, 21, 22, 23, 24, 25]:
-                    faceLength = 2 # triangle
-                elif shapeType in [3, 10, 16]:
-                    faceLength = 2 # quadrangle
-                elif shapeType in [4, 11, 29, 30, 31]:
-                    faceLength = 3 # tetrahedron
-
-                faces = self._extractRegularFaces(cell=cell,
-                                                  faceLength=faceLength,
-                                                  facesPerCell=self.numFacesPerCell[shapeType])
-
-            for faceIdx in range(len(faces)):
-                # NB: currFace is sorted for the key to spot duplicates
-                currFace = faces[faceIdx]
-                keyStr   = ' '.join([str(x) for x in sorted(currFace)])
-
-                if keyStr in facesDict:
-                    cellsToFaces[cellIdx][faceIdx] = facesDict[keyStr]
-                else: # new face
-                    facesDict[keyStr] = currNumFaces
-                    cellsToFaces[cellIdx][faceIdx] = currNumFaces
-                    uniqueFaces.append(currFace)
-                    currNumFaces += 1
-
-        # pad short faces with -1
-        maxFaceLen = max([len(f) for f in uniqueFaces])
-        uniqueFaces = [[-1] * (maxFaceLen - len(f)) + f for f in uniqueFaces]
-
-        facesToVertices = nx.array(uniqueFaces, dtype=nx.INT_DTYPE)
-
-        return facesToVertices.swapaxes(0, 1)[::-1], cellsToFaces.swapaxes(0, 1).copy('C'), facesDict
-
-    def _translateNodesToVertices(self, entitiesNodes, vertexMap):
-        """Translates e`ntitiesNodes` from Gmsh node IDs to `vertexCoords` indices.
+        cellsToFaces = nx.empty((numCells, maxFaces), 'l')
+        cellsToFaces.fill(-1)
+        cellsToFaces[exists] = faceIDs[inverse.flat]
+
+        # vertices of each face as first encountered, last vertex first
+        uniqueFaces = faces[first[order]]
+        lengths = (uniqueFaces != -1).sum(axis=1)
+        positions = lengths[..., nx.newaxis] - 1 - nx.arange(maxFaceLen)
+        facesToVertices = nx.where(positions >= 0,
+                                   nx.take_along_axis(uniqueFaces, nx.maximum(positions, 0), axis=1),
+                                   -1)
+
+        return (facesToVertices.astype(nx.INT_DTYPE).swapaxes(0, 1),
+                cellsToFaces.swapaxes(0, 1).copy('C'))
+
+    def _translateNodesToVertices(self, elementNodes, vertexMap):
+        """Translates `elementNodes` from Gmsh node IDs to `vertexCoords` indices.
+
+        Elements with nodes beyond `vertexMap` are marked with `-1`,
+        as are missing nodes.
         """
-        entitiesVertices = []
+        present = (elementNodes != -1)
+        beyond = (elementNodes >= len(vertexMap)).any(axis=1)
+        vertices = vertexMap[nx.clip(elementNodes, 0, len(vertexMap) - 1)]
+        vertices[beyond] = -1
+        # padding after the last node is restored, so that the
+        # number of nodes of each element is preserved
+        return nx.where(present, vertices, -1), present
+
+    def _cellOrder(self, cellNodes, reader):
+        """New order of the cells with Gmsh `cellNodes`, by `self.reorder`
+        """
+        from fipy.meshes.cellOrdering import _cellOrder
 
-        for entity in entitiesNodes:
-            try:
-                vertIndices = vertexMap[nx.array(entity)]
-            except IndexError:
-                vertIndices = nx.ones((len(entity),), 'l') * -1
-            entitiesVertices.append(vertIndices)
+        present = cellNodes != -1
+        nodeOrder = nx.argsort(reader.nodeTags, kind='stable')
+        nodeIndices = nodeOrder[nx.searchsorted(reader.nodeTags[nodeOrder],
+                                                nx.where(present, cellNodes, reader.nodeTags[0]))]
+        coords = reader.nodeCoords[:self.dimensions, nodeIndices]
+        centers = (coords * present).sum(axis=-1) / present.sum(axis=-1)
 
-        return entitiesVertices
+        return _cellOrder(self.reorder, cellNodes=cellNodes, centers=centers)
 
-    def _extractRegularFaces(self, cell, faceLength, facesPerCell):
-        """Return faces for a regular poly(gon|hedron)
+    def _partitionCells(self, cells):
+        """Select the cells of this processor's partition and its ghost cells
 
-        Given `cell`, defined by node IDs, returns an array of
-        `facesPerCell` faces of length `faceLength` in terms of nodes.
-        """
-        faces = []
-        for i in range(facesPerCell):
-            aFace = []
-            for j in range(faceLength):
-                aVertex = (i + j) % len(cell) # we may wrap
-                aFace.append(int(cell[aVertex]))
-            faces.append(aFace)
-        return faces
-
-    def _extractOrderedFaces(self, cell, faceOrderings):
-        """Return faces for a 8-node hexahedron cell.
+        Returns the indices of non-ghost cells and of ghost cells in `cells`.
         """
-        def orderingToFace(vertList):
-            aFace = []
-            for i in vertList:
-                aFace.append(int(cell[i]))
-            return aFace
+        numTags = cells.numPartitionTags
+        if cells.partitions.shape[-1] > 0:
+            # next item is a count
+            mismatched = (numTags > 0) & (cells.partitions[..., 0] != numTags - 1)
+        else:
+            mismatched = numTags > 0
+        if mismatched.any():
+            i = nx.flatnonzero(mismatched)[0]
+            warnings.warn("Partition count %d does not agree with number of remaining tags %d."
+                          % (cells.partitions[i, 0], numTags[i] - 1),
+                          SyntaxWarning, stacklevel=3)
 
-        return [orderingToFace(o) for o in faceOrderings]
+        if self.communicator.Nproc > 1:
+            pid = self.communicator.procID + 1
+            partitions = cells.partitions[..., 1:]
+            valid = nx.arange(partitions.shape[-1]) < (numTags - 1)[..., nx.newaxis]
+            # el is in this processor's partition
+            mine = ((partitions == pid) & valid).any(axis=1)
+            # this is our ghost cell
+            ghost = ((partitions == -pid) & valid).any(axis=1)
+            return nx.flatnonzero(mine), nx.flatnonzero(ghost)
+        else:
+            # we collect all cells
+            return nx.arange(len(cells)), nx.arange(0)
 
     def read(self):
         """
-        0. Build `cellsToVertices`
-        1. Recover needed `vertexCoords` and mapping from file using
+        0. Read nodes and elements from the file
+        1. Build `cellsToVertices`
+        2. Recover needed `vertexCoords` and mapping from file using
            `cellsToVertices`
-        2. Build `cellsToVertIDs` proper from `vertexCoords` and vertex map
-        3. Build faces
-        4. Build `cellsToFaces`
+        3. Build `cellsToVertIDs` proper from `vertexCoords` and vertex map
+        4. Build faces
+        5. Build `cellsToFaces`
 
-        Isolate relevant data into three files, store in
-        `self.nodesPath` for `$Nodes`,
-        `self.elemsPath` for `$Elements`.
-        `self.namesFile` for `$PhysicalNames`.
+        The file, ASCII or binary, is read with a vectorized
+        `_MSHReader`, so Gmsh is not needed to load an existing `.msh`
+        file.
 
         Returns `vertexCoords`, `facesToVertexID`, `cellsToFaceID`,
                 `cellGlobalIDMap`, `ghostCellGlobalIDMap`.
         """
-        self.version, self.fileType, self.dataSize = self._getMetaData()
-        self.nodesPath = self._isolateData("Nodes")
-        self.elemsPath = self._isolateData("Elements")
-        try:
-            self.namesPath = self._isolateData("PhysicalNames")
-        except EOFError as e:
-            self.namesPath = None
-
-        try:
-            if self.dimensions is None:
-                nodesFile = open(self.nodesPath, 'r')
-                nodesFile.readline() # skip number of nodes
-
-                # We assume we have a 2D file unless we find a node
-                # with a non-zero Z coordinate
+        reader = _MSHReader(self.filename)
+        reader.read()
+        self.version, self.fileType, self.dataSize = reader.version, reader.fileType, reader.dataSize
+        self.physicalNames = reader.physicalNames
+
+        if self.dimensions is None:
+            # We assume we have a 2D file unless we find a node
+            # with a non-zero Z coordinate
+            if nx.any(reader.nodeCoords[2] != 0.0):
+                self.dimensions = 3
+            else:
                 self.dimensions = 2
-                for node in nodesFile:
-                    line   = node.split()
-
-                    newVert = [float(x) for x in line]
 
-                    if newVert[2] != 0.0:
-                        self.dimensions = 3
-                        break
+        self.coordDimensions = self.coordDimensions or self.dimensions
+
+        # we need a conditional here so we don't pick up 2D shapes in 3D
+        if self.dimensions == 2:
+            self.numVertsPerFace = {1: 2, # 2-node line
+                                    8: 2} # 3-node line
+            self.numFacesPerCell = { 2: 3, # 3-node triangle (3 faces)
+                                     9: 3, # 6-node triangle (we only read 1st 3)
+                                    20: 3, # 9-node triangle (we only read 1st 3)
+                                    21: 3, # 10-node triangle (we only read 1st 3)
+                                    22: 3, # 12-node triangle (we only read 1st 3)
+                                    23: 3, # 15-node triangle (we only read 1st 3)
+                                    24: 3, # 15-node triangle (we only read 1st 3)
+                                    25: 3, # 21-node triangle (we only read 1st 3)
+                                     3: 4, # 4-node quadrangle (4 faces)
+                                    10: 4, # 9-node quadrangle (we only read 1st 4)
+                                    16: 4} # 8-node quadrangle (we only read 1st 4)
+        elif self.dimensions == 3:
+            self.numVertsPerFace = { 2: 3, # 3-node triangle (3 vertices)
+                                     9: 3, # 6-node triangle (we only read 1st 3)
+                                    20: 3, # 9-node triangle (we only read 1st 3)
+                                    21: 3, # 10-node triangle (we only read 1st 3)
+                                    22: 3, # 12-node triangle (we only read 1st 3)
+                                    23: 3, # 15-node triangle (we only read 1st 3)
+                                    24: 3, # 15-node triangle (we only read 1st 3)
+                                    25: 3, # 21-node triangle (we only read 1st 3)
+                                     3: 4, # 4-node quadrangle (4 vertices)
+                                    10: 4, # 9-node quadrangle (we only read 1st 4)
+                                    16: 4} # 8-node quadrangle (we only read 1st 4)
+            self.numFacesPerCell = { 4: 4, # 4-node tetrahedron (4 faces)
+                                    11: 4, # 10-node tetrahedron (we only read 1st 4)
+                                    29: 4, # 20-node tetrahedron (we only read 1st 4)
+                                    30: 4, # 35-node tetrahedron (we only read 1st 4)
+                                    31: 4, # 56-node tetrahedron (we only read 1st 4)
+                                     5: 6, # 8-node hexahedron (6 faces)
+                                    12: 6, # 27-node tetrahedron (we only read 1st 6)
+                                    17: 6, # 20-node tetrahedron (we only read 1st 6)
+                                     6: 5, # 6-node prism (5 faces)
+                                    13: 5, # 18-node prism (we only read 1st 6)
+                                    18: 5, # 15-node prism (we only read 1st 6)
+                                     7: 5, # 5-node pyramid (5 faces)
+                                    14: 5, # 14-node pyramid (we only read 1st 5)
+                                    19: 5} # 13-node pyramid (we only read 1st 5)
+        else:
+            raise GmshException("Mesh has fewer than 2 or more than 3 dimensions")
+
+        parprint("Parsing elements.")
+        cells = reader.elements(types=list(self.numFacesPerCell.keys()))
+        faces = reader.elements(types=list(self.numVertsPerFace.keys()))
+
+        cellIDs, ghostIDs = self._partitionCells(cells)
+        if self.reorder is not None:
+            # the ghosts stay after the cells
+            cellIDs = cellIDs[self._cellOrder(cells.nodes[cellIDs], reader)]
+        cellsAndGhosts = nx.concatenate((cellIDs, ghostIDs))
+        numCellsTotal = len(cellsAndGhosts)
+
+        if numCellsTotal < 1:
+            errStr = "Gmsh hasn't produced any cells! Check your Gmsh code."
+            errStr += "\n\nGmsh output:\n%s" % "".join(self.gmshOutput).rstrip()
+            raise GmshException(errStr)
+
+        # subtract the Gmsh ID of the first cell to obtain global IDs
+        globalIDs = cells.tags - cells.tags[0]
+        cellGlobalIDs = globalIDs[cellIDs].tolist()
+        ghostCellGlobalIDs = globalIDs[ghostIDs].tolist()
+        self.originalCellIDs = globalIDs[cellIDs]
+        if self.reorder is not None and self.communicator.Nproc == 1:
+            # a serial mesh is numbered as it is stored, or its global
+            # values would not be in the order of its local values
+            cellGlobalIDs = list(range(len(cellIDs)))
+
+        cellsToGmshVerts = cells.nodes[cellsAndGhosts]
+        maxVerts = (cellsToGmshVerts != -1).sum(axis=1).max()
+        cellsToGmshVerts = cellsToGmshVerts[..., :maxVerts]
+        allShapeTypes = cells.types[cellsAndGhosts]
+        self.physicalCellMap = cells.physical[cellsAndGhosts]
+        self.geometricalCellMap = cells.geometrical[cellsAndGhosts]
+
+        parprint("Recovering coords.")
+        parprint("numcells %d" % numCellsTotal)
+        allVerts     = cellsToGmshVerts[cellsToGmshVerts != -1]
+        if self.reorder is None:
+            allVerts = nx.unique(allVerts)
+        else:
+            # number the vertices, and so the faces, as the cells meet them
+            allVerts = allVerts[nx.sort(nx.unique(allVerts, return_index=True)[1])]
+        maxVertIdx   = allVerts.max() + 1 # add one to offset zero
+        vertGIDtoIdx = nx.ones(maxVertIdx, 'l') * -1 # gmsh ID -> vertexCoords idx
+        vertGIDtoIdx[allVerts] = nx.arange(len(allVerts))
 
-                nodesFile.close()
-
-            self.coordDimensions = self.coordDimensions or self.dimensions
-
-            # we need a conditional here so we don't pick up 2D shapes in 3D
-            if self.dimensions == 2:
-                self.numVertsPerFace = {1: 2, # 2-node line
-                                        8: 2} # 3-node line
-                self.numFacesPerCell = { 2: 3, # 3-node triangle (3 faces)
-                                         9: 3, # 6-node triangle (we only read 1st 3)
-                                        20: 3, # 9-node triangle (we only read 1st 3)
-                                        21: 3, # 10-node triangle (we only read 1st 3)
-                                        22: 3, # 12-node triangle (we only read 1st 3)
-                                        23: 3, # 15-node triangle (we only read 1st 3)
-                                        24: 3, # 15-node triangle (we only read 1st 3)
-                                        25: 3, # 21-node triangle (we only read 1st 3)
-                                         3: 4, # 4-node quadrangle (4 faces)
-                                        10: 4, # 9-node quadrangle (we only read 1st 4)
-                                        16: 4} # 8-node quadrangle (we only read 1st 4)
-            elif self.dimensions == 3:
-                self.numVertsPerFace = { 2: 3, # 3-node triangle (3 vertices)
-                                         9: 3, # 6-node triangle (we only read 1st 3)
-                                        20: 3, # 9-node triangle (we only read 1st 3)
-                                        21: 3, # 10-node triangle (we only read 1st 3)
-                                        22: 3, # 12-node triangle (we only read 1st 3)
-                                        23: 3, # 15-node triangle (we only read 1st 3)
-                                        24: 3, # 15-node triangle (we only read 1st 3)
-                                        25: 3, # 21-node triangle (we only read 1st 3)
-                                         3: 4, # 4-node quadrangle (4 vertices)
-                                        10: 4, # 9-node quadrangle (we only read 1st 4)
-                                        16: 4} # 8-node quadrangle (we only read 1st 4)
-                self.numFacesPerCell = { 4: 4, # 4-node tetrahedron (4 faces)
-                                        11: 4, # 10-node tetrahedron (we only read 1st 4)
-                                        29: 4, # 20-node tetrahedron (we only read 1st 4)
-                                        30: 4, # 35-node tetrahedron (we only read 1st 4)
-                                        31: 4, # 56-node tetrahedron (we only read 1st 4)
-                                         5: 6, # 8-node hexahedron (6 faces)
-                                        12: 6, # 27-node tetrahedron (we only read 1st 6)
-                                        17: 6, # 20-node tetrahedron (we only read 1st 6)
-                                         6: 5, # 6-node prism (5 faces)
-                                        13: 5, # 18-node prism (we only read 1st 6)
-                                        18: 5, # 15-node prism (we only read 1st 6)
-                                         7: 5, # 5-node pyramid (5 faces)
-                                        14: 5, # 14-node pyramid (we only read 1st 5)
-                                        19: 5} # 13-node pyramid (we only read 1st 5)
-            else:
-                raise GmshException("Mesh has fewer than 2 or more than 3 dimensions")
-
-            parprint("Parsing elements.")
-            (cellsData,
-             ghostsData,
-             facesData) = self._parseElementFile()
-
-            cellsToGmshVerts = cellsData.nodes + ghostsData.nodes
-            numCellsTotal    = len(cellsData.nodes) + len(ghostsData.nodes)
-            allShapeTypes    = cellsData.shapes + ghostsData.shapes
-            allShapeTypes    = nx.array(allShapeTypes)
-            allShapeTypes    = nx.delete(allShapeTypes, nx.s_[numCellsTotal:])
-            self.physicalCellMap = nx.array(cellsData.physicalEntities
-                                            + ghostsData.physicalEntities)
-            self.geometricalCellMap = nx.array(cellsData.geometricalEntities
-                                               + ghostsData.geometricalEntities)
-
-            if numCellsTotal < 1:
-                errStr = "Gmsh hasn't produced any cells! Check your Gmsh code."
-                errStr += "\n\nGmsh output:\n%s" % "".join(self.gmshOutput).rstrip()
-                raise GmshException(errStr)
-
-            parprint("Recovering coords.")
-            parprint("numcells %d" % numCellsTotal)
-            vertexCoords, vertIDtoIdx = self._vertexCoordsAndMap(cellsToGmshVerts)
-
-            # translate Gmsh IDs to `vertexCoord` indices
-            cellsToVertIDs = self._translateNodesToVertices(cellsToGmshVerts,
-                                                            vertIDtoIdx)
-
-            parprint("Building cells and faces.")
-            (facesToV,
-             cellsToF,
-             facesDict) = self._deriveCellsAndFaces(cellsToVertIDs,
-                                                    allShapeTypes,
-                                                    numCellsTotal)
-
-            # cell entities were easy to record on parsing
-            # but we don't use Gmsh faces, so we need to correlate the nodes
-            # that make up the Gmsh faces with the vertex IDs of the FiPy faces
-            # so that we can check if any are named
-            faceEntitiesDict = dict()
-
-            # translate Gmsh IDs to `vertexCoord` indices
-            facesToVertIDs = self._translateNodesToVertices(facesData.nodes,
-                                                            vertIDtoIdx)
-
-            for face, physicalEntity, geometricalEntity in zip(facesToVertIDs,
-                                                               facesData.physicalEntities,
-                                                               facesData.geometricalEntities):
-                faceEntitiesDict[' '.join([str(x) for x in sorted(face)])] = (physicalEntity, geometricalEntity)
-
-            self.physicalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
-            self.geometricalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
-            for face in list(facesDict.keys()):
-                # not all faces are necessarily tagged
-                if face in faceEntitiesDict:
-                    self.physicalFaceMap[facesDict[face]] = faceEntitiesDict[face][0]
-                    self.geometricalFaceMap[facesDict[face]] = faceEntitiesDict[face][1]
-
-            self.physicalNames = self._parseNamesFile()
-
-        finally:
-            os.unlink(self.nodesPath)
-            os.unlink(self.elemsPath)
-            if self.namesPath is not None:
-                os.unlink(self.namesPath)
-
-        # convert lists of cell vertices to a properly oriented masked array
-        maxVerts = max([len(v) for v in cellsToVertIDs])
-        # ticket:539 - NumPy 1.7 casts to array before concatenation and empty array defaults to float
-        cellsToVertIDs = [nx.concatenate((v, nx.array([-1] * (maxVerts-len(v)), dtype=nx.INT_DTYPE))) for v in cellsToVertIDs]
+        nodeOrder = nx.argsort(reader.nodeTags, kind='stable')
+        nodeIndices = nodeOrder[nx.searchsorted(reader.nodeTags[nodeOrder], allVerts)]
+        vertexCoords = reader.nodeCoords[:self.coordDimensions, nodeIndices]
+
+        # translate Gmsh IDs to `vertexCoord` indices
+        cellsToVertIDs, present = self._translateNodesToVertices(cellsToGmshVerts,
+                                                                 vertGIDtoIdx)
+
+        parprint("Building cells and faces.")
+        facesToV, cellsToF = self._deriveCellsAndFaces(cellsToVertIDs,
+                                                        allShapeTypes)
+
+        # cell entities were easy to record on parsing
+        # but we don't use Gmsh faces, so we need to correlate the nodes
+        # that make up the Gmsh faces with the vertex IDs of the FiPy faces
+        # so that we can check if any are named
+        self.physicalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
+        self.geometricalFaceMap = nx.zeros(facesToV.shape[-1:], 'l')
+        if len(faces) > 0:
+            facesToVertIDs, _ = self._translateNodesToVertices(faces.nodes,
+                                                               vertGIDtoIdx)
+            fipyFaces = facesToV.swapaxes(0, 1)
+            width = max(fipyFaces.shape[-1], facesToVertIDs.shape[-1])
+            keys = nx.concatenate((self._faceKeys(fipyFaces, width=width),
+                                   self._faceKeys(facesToVertIDs, width=width)))
+            unique, inverse = nx.unique(keys, axis=0, return_inverse=True)
+            inverse = inverse.flat[:]
+            fipyKeys, gmshKeys = inverse[:len(fipyFaces)], inverse[len(fipyFaces):]
+
+            # where Gmsh faces repeat, the last one counts
+            lastKeys, lastIndices = nx.unique(gmshKeys[::-1], return_index=True)
+            gmshFaceOfKey = nx.empty((len(unique),), dtype='l')
+            gmshFaceOfKey.fill(-1)
+            gmshFaceOfKey[lastKeys] = len(gmshKeys) - 1 - lastIndices
+
+            # not all faces are necessarily tagged
+            gmshFace = gmshFaceOfKey[fipyKeys]
+            tagged = gmshFace >= 0
+            self.physicalFaceMap[tagged] = faces.physical[gmshFace[tagged]]
+            self.geometricalFaceMap[tagged] = faces.geometrical[gmshFace[tagged]]
+
+        # convert cell vertices to a properly oriented masked array
         cellsToVertIDs = nx.MA.masked_equal(cellsToVertIDs, value=-1).swapaxes(0, 1)
 
         parprint("Done with cells and faces.")
         return (vertexCoords, facesToV, cellsToF,
-                cellsData.idmap, ghostsData.idmap,
+                cellGlobalIDs, ghostCellGlobalIDs,
                 cellsToVertIDs)
 
     def write(self, obj, time=0.0, timeindex=0):
@@ -996,176 +1013,6 @@ class MSHFile(GmshFile):
 
         self.fileobj.write("$EndElementData\n")
 
-    def _vertexCoordsAndMap(self, cellsToGmshVerts):
-        """
-        Returns `vertexCoords` and mapping from Gmsh ID to `vertexCoords`
-        indices (same as in `MSHFile`).
-
-        Unlike parent, doesn't use `genfromtxt`
-        because we want to avoid loading the entire `.msh` file into memory.
-        """
-        allVerts     = [v for c in cellsToGmshVerts for v in c] # flatten
-        allVerts     = nx.unique(nx.array(allVerts, dtype=nx.INT_DTYPE)) # remove dups
-        allVerts     = nx.sort(allVerts)
-        maxVertIdx   = allVerts[-1] + 1 # add one to offset zero
-        vertGIDtoIdx = nx.ones(maxVertIdx, 'l') * -1 # gmsh ID -> vertexCoords idx
-        vertexCoords = nx.empty((len(allVerts), self.coordDimensions))
-        nodeCount    = 0
-
-        # establish map. This works because allVerts is a sorted set.
-        vertGIDtoIdx[allVerts] = nx.arange(len(allVerts))
-
-        nodesFile = open(self.nodesPath, 'r')
-        nodesFile.readline() # skip number of nodes
-
-        # now we walk through node file with a sorted unique list of vertices
-        # in hand. When we encounter 0th element in `allVerts`, save it
-        # to `vertexCoords` then pop its ID off `allVerts`.
-        for node in nodesFile:
-            line   = node.split()
-            nodeID = int(line[0])
-
-            if nodeID == allVerts[nodeCount]:
-                newVert = [float(x) for x in line[1:self.coordDimensions+1]]
-                vertexCoords[nodeCount,:] = nx.array(newVert)
-                nodeCount += 1
-
-            if len(allVerts) == nodeCount:
-                break
-
-        nodesFile.close()
-
-        # transpose for FiPy
-        transCoords = vertexCoords.swapaxes(0, 1)
-        return transCoords, vertGIDtoIdx
-
-    def _parseElementFile(self):
-        """
-        Return three objects, the first for non-ghost cells, the second for
-        ghost cells, and the third for faces.
-
-        All nastiness concerning ghost cell
-        calculation is consolidated here: if we were ever to need to CALCULATE
-        GHOST CELLS OURSELVES, the only code we'd have to change is in here.
-        """
-
-        def _parseTags(offset, currLineInts):
-            if offset == -1:
-                # if first valid shape
-                offset = currLineInts[0]
-
-            numTags = currLineInts[2]
-            tags    = currLineInts[3:(3+numTags)]
-
-            # the partition tags for don't seem to always be present
-            # and don't always make much sense when they are
-
-            if len(tags) >= 2:
-                physicalEntity = tags.pop(0)
-                geometricalEntity = tags.pop(0)
-            else:
-                physicalEntity = geometricalEntity = -1
-
-            return offset, tags, physicalEntity, geometricalEntity
-
-
-        cellsData = _ElementData()
-        ghostsData = _ElementData()
-        facesData = _ElementData()
-
-        cellOffset = -1 # this will be subtracted from gmsh ID to obtain global ID
-        faceOffset = -1 # this will be subtracted from gmsh ID to obtain global ID
-        pid = self.communicator.procID + 1
-
-        elemsFile = open(self.elemsPath, 'r')
-
-        elemsFile.readline() # skip number of elements
-        for el in elemsFile:
-            currLineInts = [int(x) for x in el.split()]
-            elemType     = currLineInts[1]
-
-            if elemType in list(self.numFacesPerCell.keys()):
-                # element is a cell
-
-                (cellOffset,
-                 tags,
-                 physicalEntity,
-                 geometricalEntity) = _parseTags(offset=cellOffset,
-                                                 currLineInts=currLineInts)
-                currLineInts[0] -= cellOffset
-
-                if len(tags) > 0:
-                    # next item is a count
-                    if tags[0] != len(tags) - 1:
-                        warnings.warn("Partition count %d does not agree with number of remaining tags %d." % (tags[0], len(tags) - 1),
-                                      SyntaxWarning, stacklevel=2)
-                    tags = tags[1:]
-
-                if self.communicator.Nproc > 1:
-                    for tag in tags:
-                        if -tag == pid:
-                            # if we're collecting ghost cells and this is our ghost cell
-                            ghostsData.add(currLine=currLineInts, elType=elemType,
-                                           physicalEntity=physicalEntity,
-                                           geometricalEntity=geometricalEntity)
-                        elif tag == pid:
-                            # el is in this processor's partition or we collect all cells
-                            cellsData.add(currLine=currLineInts, elType=elemType,
-                                          physicalEntity=physicalEntity,
-                                          geometricalEntity=geometricalEntity)
-                else:
-                    # we collect all cells
-                    cellsData.add(currLine=currLineInts, elType=elemType,
-                                  physicalEntity=physicalEntity,
-                                  geometricalEntity=geometricalEntity)
-            elif elemType in list(self.numVertsPerFace.keys()):
-                # element is a face
-
-                (faceOffset,
-                 tags,
-                 physicalEntity,
-                 geometricalEntity) = _parseTags(offset=faceOffset,
-                                                 currLineInts=currLineInts)
-                currLineInts[0] -= faceOffset
-
-                facesData.add(currLine=currLineInts, elType=elemType,
-                              physicalEntity=physicalEntity,
-                              geometricalEntity=geometricalEntity)
-
-        elemsFile.close()
-
-        return cellsData, ghostsData, facesData
-
-
-    def _parseNamesFile(self):
-        physicalNames = {
-            0: dict(),
-            1: dict(),
-            2: dict(),
-            3: dict()
-        }
-        if self.namesPath is not None:
-            namesFile = open(self.namesPath, 'r')
-
-            namesFile.readline() # skip number of elements
-            for nm in namesFile:
-                nm = nm.split()
-                if self.version > 2.0:
-                    dim = [int(nm.pop(0))]
-                else:
-                    # Gmsh format prior to 2.1 did not unambiguously tie
-                    # physical names to physical entities of different dimensions
-                    # http://article.gmane.org/gmane.comp.cad.gmsh.general/1601
-                    dim = [0, 1, 2, 3]
-                num = int(nm.pop(0))
-                name = " ".join(nm)[1:-1]
-                for d in dim:
-                    physicalNames[d][name] = int(num)
-
-            namesFile.close()
-
-        return physicalNames
-
     def makeMapVariables(self, mesh):
         """Utility function to make `MeshVariables` that define different domains in the mesh
         """
@@ -1268,32 +1115,6 @@ class MSHFile(GmshFile):
         """
         pass
 
-class _ElementData(object):
-    """
-    Bookkeeping for cells. Declared as own class for generality.
-
-    :Properties:
-    - `nodes`: A Python list of the vertices that make up this element
-    - `shapes`: A `shapeTypes` Python list
-    - `idmap`: A Python list which maps `vertexCoords` index to global ID
-    - `physicalEntities`: A Python list of the Gmsh physical entities each element is in
-    - `geometricalEntities`: A Python list of the Gmsh geometrical entities each element is in
-    """
-    def __init__(self):
-        self.nodes = []
-        self.shapes = []
-        self.idmap = [] # vertexCoords idx -> gmsh ID (global ID)
-        self.physicalEntities = []
-        self.geometricalEntities = []
-
-    def add(self, currLine, elType, physicalEntity, geometricalEntity):
-        numTags = currLine[2]
-        self.nodes.append(currLine[(numTags+3):])
-        self.shapes.append(elType)
-        self.idmap.append(currLine[0])
-        self.physicalEntities.append(physicalEntity)
-        self.geometricalEntities.append(geometricalEntity)
-
 class _GmshTopology(_MeshTopology):
 
     @property
@@ -1583,6 +1404,13 @@ class Gmsh2D(Mesh2D):
         of ghost cells.
     background : ~fipy.variables.cellVariable.CellVariable
         Specifies the desired characteristic lengths of the mesh cells
+    reorder : {None, 'rcm', 'morton'}
+        Renumber the cells, and with them the faces and vertices, to keep
+        neighbours together: 'rcm' by reverse Cuthill-McKee on the
+        vertices the cells share, which narrows the band of the matrices,
+        and 'morton' along a Morton (Z-order) curve through their
+        centers. Cell `i` of the mesh is cell `originalCellIDs[i]` of the
+        file.
     """
 
     def __init__(self,
@@ -1590,7 +1418,8 @@ class Gmsh2D(Mesh2D):
                  coordDimensions=2,
                  communicator=parallelComm,
                  overlap=1,
-                 background=None):
+                 background=None,
+                 reorder=None):
 
         self.mshFile = openMSHFile(arg,
                                    dimensions=2,
@@ -1598,7 +1427,8 @@ class Gmsh2D(Mesh2D):
                                    communicator=communicator,
                                    overlap=overlap,
                                    mode='r',
-                                   background=background)
+                                   background=background,
+                                   reorder=reorder)
 
         # openMSHFile may have "downgraded" the communicator
         # if, e.g., too many overlaps were requested
@@ -1610,6 +1440,7 @@ class Gmsh2D(Mesh2D):
          self.cellGlobalIDs,
          self.gCellGlobalIDs,
          self._orderedCellVertexIDs_data) = self.mshFile.read()
+        self.originalCellIDs = self.mshFile.originalCellIDs
 
         self.mshFile.close()
 
@@ -1635,9 +1466,19 @@ class Gmsh2D(Mesh2D):
 
         parprint("Exiting Gmsh2D")
 
+    def __getstate__(self):
+        state = super(Gmsh2D, self).__getstate__()
+        state["originalCellIDs"] = self.originalCellIDs
+        return state
+
     def __setstate__(self, state):
+        state = dict(state)
+        originalCellIDs = state.pop("originalCellIDs", None)
         super(Gmsh2D, self).__setstate__(state)
         self.cellGlobalIDs = list(nx.arange(self.cellFaceIDs.shape[-1]))
+        if originalCellIDs is None:
+            originalCellIDs = nx.arange(self.cellFaceIDs.shape[-1])
+        self.originalCellIDs = originalCellIDs
         self.gCellGlobalIDs = []
         self.communicator = serialComm
         self.mshFile = None
@@ -1778,18 +1619,18 @@ class Gmsh2D(Mesh2D):
         ... ''' % locals())
         >>> f.close()
 
-        >>> sqrTri = Gmsh2D(mshFile) # doctest: +GMSH
+        >>> sqrTri = Gmsh2D(mshFile)
 
         >>> os.remove(mshFile)
 
-        >>> print(nx.allclose(sqrTri.cellVolumes, [1., 0.5])) # doctest: +GMSH
+        >>> print(nx.allclose(sqrTri.cellVolumes, [1., 0.5]))
         True
 
 
         Write square and triangle volumes out as a `POS` file
 
         >>> from fipy import CellVariable
-        >>> vol = CellVariable(mesh=sqrTri, value=sqrTri.cellVolumes) # doctest: +GMSH
+        >>> vol = CellVariable(mesh=sqrTri, value=sqrTri.cellVolumes)
 
         >>> if parallelComm.procID == 0:
         ...     (ftmp, posFile) = tempfile.mkstemp('.pos')
@@ -1797,12 +1638,12 @@ class Gmsh2D(Mesh2D):
         ... else:
         ...     posFile = None
         >>> posFile = parallelComm.bcast(posFile)
-        >>> f = openPOSFile(posFile, mode='w') # doctest: +GMSH
-        >>> f.write(vol) # doctest: +GMSH
-        >>> f.close() # doctest: +GMSH
+        >>> f = openPOSFile(posFile, mode='w')
+        >>> f.write(vol)
+        >>> f.close()
 
         >>> f = open(posFile, mode='r')
-        >>> print("".join(f.readlines())) # doctest: +GMSH
+        >>> print("".join(f.readlines()))
         $PostFormat
         1.4 0 8
         $EndPostFormat
@@ -1866,7 +1707,88 @@ class Gmsh2D(Mesh2D):
         ... ''' % locals())
         >>> f.close()
 
-        >>> noTag = Gmsh2D(mshFile) # doctest: +GMSH, +SERIAL
+        >>> noTag = Gmsh2D(mshFile) # doctest: +SERIAL
+
+        >>> os.remove(mshFile)
+
+        Cells can be renumbered as they are read, to keep neighbours
+        together. The cells of a strip, numbered from both ends toward the
+        middle,
+
+        >>> (fmsh, mshFile) = tempfile.mkstemp('.msh')
+        >>> f = os.fdopen(fmsh, 'w')
+
+        >>> output = f.write('''$MeshFormat
+        ... 2.2 0 8
+        ... $EndMeshFormat
+        ... $Nodes
+        ... 14
+        ... 1 0 0 0
+        ... 2 1 0 0
+        ... 3 2 0 0
+        ... 4 3 0 0
+        ... 5 4 0 0
+        ... 6 5 0 0
+        ... 7 6 0 0
+        ... 8 0 1 0
+        ... 9 1 1 0
+        ... 10 2 1 0
+        ... 11 3 1 0
+        ... 12 4 1 0
+        ... 13 5 1 0
+        ... 14 6 1 0
+        ... $EndNodes
+        ... $Elements
+        ... 6
+        ... 1 3 2 1 1 1 2 9 8
+        ... 2 3 2 2 1 6 7 14 13
+        ... 3 3 2 3 1 2 3 10 9
+        ... 4 3 2 4 1 5 6 13 12
+        ... 5 3 2 5 1 3 4 11 10
+        ... 6 3 2 6 1 4 5 12 11
+        ... $EndElements
+        ... ''')
+        >>> f.close()
+
+        >>> strip = Gmsh2D(mshFile, communicator=serialComm)
+        >>> print(strip.x)
+        [ 0.5  5.5  1.5  4.5  2.5  3.5]
+
+        are numbered from one end to the other by reverse Cuthill-McKee
+
+        >>> rcm = Gmsh2D(mshFile, communicator=serialComm, reorder='rcm')
+        >>> print(nx.allclose(abs(rcm.x[1:] - rcm.x[:-1]), 1.))
+        True
+
+        and along a Morton curve
+
+        >>> morton = Gmsh2D(mshFile, communicator=serialComm, reorder='morton')
+        >>> print(morton.x)
+        [ 0.5  1.5  2.5  3.5  4.5  5.5]
+
+        The faces and vertices follow the cells, and `originalCellIDs` maps
+        the new order to that of the file, to read values given in that
+        order or to write values out in it
+
+        >>> print(nx.allequal(morton.x, strip.x[morton.originalCellIDs]))
+        True
+        >>> print(nx.allequal(morton.physicalCellMap,
+        ...                   strip.physicalCellMap[morton.originalCellIDs]))
+        True
+        >>> print(morton.vertexCoords[0])
+        [ 0.  1.  1.  0.  2.  2.  3.  3.  4.  4.  5.  5.  6.  6.]
+        >>> original = nx.empty(morton.numberOfCells)
+        >>> original[morton.originalCellIDs] = morton.x
+        >>> print(original)
+        [ 0.5  5.5  1.5  4.5  2.5  3.5]
+
+        The mapping is kept when the mesh is pickled
+
+        >>> from fipy.tools import dump
+        >>> f, tmpfile = dump.write(morton)
+        >>> print(nx.allequal(dump.read(tmpfile, f).originalCellIDs,
+        ...                   morton.originalCellIDs))
+        True
 
         >>> os.remove(mshFile)
 
@@ -1890,14 +1812,22 @@ class Gmsh2DIn3DSpace(Gmsh2D):
         of ghost cells.
     background : ~fipy.variables.cellVariable.CellVariable
         Specifies the desired characteristic lengths of the mesh cells
+    reorder : {None, 'rcm', 'morton'}
+        Renumber the cells, and with them the faces and vertices, to keep
+        neighbours together: 'rcm' by reverse Cuthill-McKee on the
+        vertices the cells share, which narrows the band of the matrices,
+        and 'morton' along a Morton (Z-order) curve through their
+        centers. Cell `i` of the mesh is cell `originalCellIDs[i]` of the
+        file.
     """
-    def __init__(self, arg, communicator=parallelComm, overlap=1, background=None):
+    def __init__(self, arg, communicator=parallelComm, overlap=1, background=None, reorder=None):
         Gmsh2D.__init__(self,
                         arg,
                         coordDimensions=3,
                         communicator=communicator,
                         overlap=overlap,
-                        background=background)
+                        background=background,
+                        reorder=reorder)
 
     def _test(self):
         """
@@ -1972,14 +1902,22 @@ class Gmsh3D(Mesh):
         of ghost cells.
     background : ~fipy.variables.cellVariable.CellVariable
         Specifies the desired characteristic lengths of the mesh cells
+    reorder : {None, 'rcm', 'morton'}
+        Renumber the cells, and with them the faces and vertices, to keep
+        neighbours together: 'rcm' by reverse Cuthill-McKee on the
+        vertices the cells share, which narrows the band of the matrices,
+        and 'morton' along a Morton (Z-order) curve through their
+        centers. Cell `i` of the mesh is cell `originalCellIDs[i]` of the
+        file.
     """
-    def __init__(self, arg, communicator=parallelComm, overlap=1, background=None):
+    def __init__(self, arg, communicator=parallelComm, overlap=1, background=None, reorder=None):
         self.mshFile  = openMSHFile(arg,
                                     dimensions=3,
                                     communicator=communicator,
                                     overlap=overlap,
                                     mode='r',
-                                    background=background)
+                                    background=background,
+                                    reorder=reorder)
 
         # openMSHFile may have "downgraded" the communicator
         # if, e.g., too many overlaps were requested
@@ -1991,6 +1929,7 @@ class Gmsh3D(Mesh):
          self.cellGlobalIDs,
          self.gCellGlobalIDs,
          self._orderedCellVertexIDs_data) = self.mshFile.read()
+        self.originalCellIDs = self.mshFile.originalCellIDs
 
         self.mshFile.close()
 
@@ -2012,9 +1951,19 @@ class Gmsh3D(Mesh):
 
         del self.mshFile
 
+    def __getstate__(self):
+        state = super(Gmsh3D, self).__getstate__()
+        state["originalCellIDs"] = self.originalCellIDs
+        return state
+
     def __setstate__(self, state):
+        state = dict(state)
+        originalCellIDs = state.pop("originalCellIDs", None)
         super(Gmsh3D, self).__setstate__(state)
         self.cellGlobalIDs = list(nx.arange(self.cellFaceIDs.shape[-1]))
+        if originalCellIDs is None:
+            originalCellIDs = nx.arange(self.cellFaceIDs.shape[-1])
+        self.originalCellIDs = originalCellIDs
         self.gCellGlobalIDs = []
         self.communicator = serialComm
         self.mshFile = None
@@ -2225,7 +2174,7 @@ class GmshGrid2D(Gmsh2D):
         width  = nx * dx
         numLayers = int(ny / float(dy))
 
-        if _gmshVersion() < StrictVersion("2.7"):
+        if _gmshVersion() < _strictVersion("2.7"):
             # kludge: must offset cellSize by `eps` to work properly
             eps = float(dx)/(nx * 10)
         else:
@@ -2299,7 +2248,7 @@ class GmshGrid3D(Gmsh3D):
         width  = nx * dx
         depth  = nz * dz
 
-        if _gmshVersion() < StrictVersion("2.7"):
+        if _gmshVersion() < _strictVersion("2.7"):
             # kludge: must offset cellSize by `eps` to work properly
             eps = float(dx)/(nx * 10)
         else:
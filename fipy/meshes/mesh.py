@@ -3,6 +3,8 @@ from __future__ import unicode_literals
 from builtins import range
 __docformat__ = 'restructuredtext'
 
+import os
+
 from fipy.meshes.abstractMesh import AbstractMesh
 from fipy.meshes.representations.meshRepresentation import _MeshRepresentation
 from fipy.meshes.topologies.meshTopology import _MeshTopology
@@ -11,6 +13,7 @@ from fipy.tools import numerix
 from fipy.tools.numerix import MA
 from fipy.tools.dimensions.physicalField import PhysicalField
 from fipy.tools import serialComm
+from fipy.tools.raggedArray import _RaggedArray, _indexType
 
 __all__ = ["MeshAdditionError", "Mesh"]
 from future.utils import text_to_native_str
@@ -25,8 +28,24 @@ class Mesh(AbstractMesh):
         Meshes contain cells, faces, and vertices.
 
         This is built for a non-mixed element mesh.
+
+        If the `FIPY_COMPACT_CONNECTIVITY` environment variable is set,
+        `faceVertexIDs` and `cellFaceIDs` are stored as compressed ragged
+        arrays of the narrowest sufficient integer type, rather than as
+        padded masked arrays, which saves memory on meshes that mix element
+        types. The padded forms are then built whenever they are accessed.
+        Otherwise, the compressed forms are built from the padded ones when
+        first needed, and kept until the connectivity is next assigned.
     """
 
+    _compactConnectivity = 'FIPY_COMPACT_CONNECTIVITY' in os.environ
+
+    _faceVertexIDs = None
+    _faceVertexIDsRagged = None
+    _cellFaceIDs = None
+    _cellFaceIDsRagged = None
+    _cellVertexIDsRagged = None
+
     def __init__(self, vertexCoords, faceVertexIDs, cellFaceIDs, communicator=serialComm, _RepresentationClass=_MeshRepresentation, _TopologyClass=_MeshTopology):
         super(Mesh, self).__init__(communicator=communicator,
                                    _RepresentationClass=_RepresentationClass,
@@ -35,15 +54,15 @@ class Mesh(AbstractMesh):
         """faceVertexIds and cellFacesIds must be padded with minus ones."""
 
         self.vertexCoords = vertexCoords
-        self.faceVertexIDs = MA.masked_values(faceVertexIDs, -1)
-        self.cellFaceIDs = MA.masked_values(cellFaceIDs, -1)
+        self.faceVertexIDs = faceVertexIDs
+        self.cellFaceIDs = cellFaceIDs
 
         self.dim = self.vertexCoords.shape[0]
 
         if not hasattr(self, "numberOfFaces"):
-            self.numberOfFaces = self.faceVertexIDs.shape[-1]
+            self.numberOfFaces = len(self._faceVertexIDsCSR)
         if not hasattr(self, "numberOfCells"):
-            self.numberOfCells = self.cellFaceIDs.shape[-1]
+            self.numberOfCells = len(self._cellFaceIDsCSR)
         if not hasattr(self, "globalNumberOfCells"):
             self.globalNumberOfCells = self.numberOfCells
         if not hasattr(self, "globalNumberOfFaces"):
@@ -54,6 +73,99 @@ class Mesh(AbstractMesh):
         self._setTopology()
         self._setGeometry(scaleLength = 1.)
 
+    """
+    Connectivity storage
+    """
+
+    @staticmethod
+    def _masked(ids):
+        if isinstance(ids, _RaggedArray):
+            return ids.toMasked()
+        return MA.masked_values(ids, -1)
+
+    def _getFaceVertexIDs(self):
+        if self._faceVertexIDs is None:
+            return self._faceVertexIDsRagged.toMasked()
+        return self._faceVertexIDs
+
+    def _setFaceVertexIDs(self, ids):
+        if self._compactConnectivity:
+            self._faceVertexIDsRagged = _RaggedArray.fromMasked(ids)
+            self._faceVertexIDs = None
+        else:
+            self._faceVertexIDs = self._masked(ids)
+            self._faceVertexIDsRagged = None
+        self._cellVertexIDsRagged = None
+
+    faceVertexIDs = property(_getFaceVertexIDs, _setFaceVertexIDs)
+
+    def _getCellFaceIDsInternal(self):
+        if self._cellFaceIDs is None:
+            return self._cellFaceIDsRagged.toMasked()
+        return self._cellFaceIDs
+
+    def _setCellFaceIDsInternal(self, ids):
+        if self._compactConnectivity:
+            self._cellFaceIDsRagged = _RaggedArray.fromMasked(ids)
+            self._cellFaceIDs = None
+        else:
+            self._cellFaceIDs = self._masked(ids)
+            self._cellFaceIDsRagged = None
+        self._cellVertexIDsRagged = None
+
+    cellFaceIDs = property(_getCellFaceIDsInternal, _setCellFaceIDsInternal)
+
+    @property
+    def _faceVertexIDsCSR(self):
+        """Vertices of each face, as a `_RaggedArray`"""
+        if self._faceVertexIDsRagged is None:
+            self._faceVertexIDsRagged = _RaggedArray.fromMasked(self._faceVertexIDs)
+        return self._faceVertexIDsRagged
+
+    @property
+    def _cellFaceIDsCSR(self):
+        """Faces of each cell, as a `_RaggedArray`"""
+        if self._cellFaceIDsRagged is None:
+            self._cellFaceIDsRagged = _RaggedArray.fromMasked(self._cellFaceIDs)
+        return self._cellFaceIDsRagged
+
+    @property
+    def _cellVertexIDsCSR(self):
+        """Vertices of each cell, in descending order, as a `_RaggedArray`
+
+        Gathered face by face from the ragged connectivity, without
+        building the padded `(faces, vertices, cells)` array.
+        """
+        if self._cellVertexIDsRagged is None:
+            self._cellVertexIDsRagged = self._calcCellVertexIDsCSR()
+        return self._cellVertexIDsRagged
+
+    def _calcCellVertexIDsCSR(self):
+        cellFaces = self._cellFaceIDsCSR
+        faceVertices = self._faceVertexIDsCSR
+
+        # the vertices of every face of every cell
+        counts = faceVertices.counts[cellFaces.indices]
+        starts = numerix.repeat(faceVertices.offsets[:-1][cellFaces.indices]
+                                - (numerix.cumsum(counts) - counts), counts)
+        vertices = faceVertices.indices[numerix.arange(counts.sum()) + starts]
+        cells = numerix.repeat(cellFaces.elementIDs, counts)
+
+        # unique vertices, in descending order, within each cell
+        numberOfVertices = self.vertexCoords.shape[-1]
+        keys = numerix.unique(cells.astype(numerix.int64) * numberOfVertices
+                              + (numberOfVertices - 1 - vertices))
+        cells = keys // numberOfVertices
+        vertices = numberOfVertices - 1 - keys % numberOfVertices
+
+        counts = numerix.bincount(cells, minlength=self.numberOfCells)
+        offsets = numerix.zeros((len(counts) + 1,), dtype=_indexType(len(vertices)))
+        numerix.cumsum(counts, out=offsets[1:])
+
+        return _RaggedArray(offsets=offsets,
+                            indices=vertices.astype(_indexType(numberOfVertices)),
+                            numberOfTargets=numberOfVertices)
+
     """
     Topology set and calculate
     """
@@ -456,29 +568,26 @@ class Mesh(AbstractMesh):
 
     @property
     def _maxFacesPerCell(self):
-        return self.cellFaceIDs.shape[0]
+        if self._cellFaceIDs is None:
+            return self._cellFaceIDsRagged.maxCount
+        return self._cellFaceIDs.shape[0]
+
+    @property
+    def _facesPerCell(self):
+        if self._cellFaceIDs is None:
+            return self._cellFaceIDsRagged.counts
+        return super(Mesh, self)._facesPerCell
+
+    @property
+    def _unsortedNodesPerFace(self):
+        cellFaceIDs = self.cellFaceIDs
+        nodesPerFace = numerix.take(self._faceVertexIDsCSR.counts,
+                                    MA.filled(cellFaceIDs, 0))
+        return numerix.where(MA.getmaskarray(cellFaceIDs), 0, nodesPerFace)
 
     @property
     def _cellVertexIDs(self):
-        ## Get all the vertices from all the faces for each cell
-        cellFaceVertices = numerix.take(self.faceVertexIDs, self.cellFaceIDs, axis=1)
-
-        ## get a sorted list of vertices for each cell
-        cellVertexIDs = numerix.reshape(cellFaceVertices, (-1, self.numberOfCells))
-        cellVertexIDs = MA.sort(cellVertexIDs, axis=0, fill_value=-1)
-
-        cellVertexIDs = MA.sort(MA.concatenate((cellVertexIDs[-1, numerix.newaxis],
-                                                MA.masked_where(cellVertexIDs[:-1]
-                                                                == cellVertexIDs[1:],
-                                                                cellVertexIDs[:-1]))),
-                                axis=0, fill_value=-1)
-
-        ## resize the array to remove extra masked values
-        if cellVertexIDs.shape[-1] == 0:
-            length = 0
-        else:
-            length = min(numerix.sum(MA.getmaskarray(cellVertexIDs), axis=0))
-        return cellVertexIDs[length:][::-1]
+        return self._cellVertexIDsCSR.toMasked()
 
 #     Below is an ordered version of _getCellVertexIDs()
 #     It works for the test case in this file (other than the ordering, obviously)
@@ -544,8 +653,27 @@ class Mesh(AbstractMesh):
            >>> print(m0._getNearestCellID(m1.cellCenters.globalValue))
            [4 5 7 8]
 
+        The spatial index of the cell centers is built once
+
+           >>> index = m0._nearestCellIndex
+           >>> print(m0._getNearestCellID(([5.], [0.])))
+           [2]
+           >>> print(m0._nearestCellIndex is index)
+           True
+
         """
-        return numerix.nearest(data=self.cellCenters.globalValue, points=points)
+        return self._nearestCellIndex.query(points)
+
+    _nearestCellIndexCache = (None, None)
+
+    @property
+    def _nearestCellIndex(self):
+        """Spatial index of the cell centers, built on first use"""
+        cellCenters, index = self._nearestCellIndexCache
+        if index is None or cellCenters is not self._scaledCellCenters:
+            index = numerix._NearestIndex(self.cellCenters.globalValue)
+            self._nearestCellIndexCache = (self._scaledCellCenters, index)
+        return index
 
     def _test(self):
         """
@@ -753,6 +881,39 @@ class Mesh(AbstractMesh):
             >>> print(numerix.allequal(mesh.cellCenters, unpickledMesh.cellCenters))
             True
 
+            Connectivity stored compactly gives the same mesh
+
+            >>> compactMesh = Mesh.__new__(Mesh)
+            >>> compactMesh._compactConnectivity = True
+            >>> Mesh.__init__(compactMesh, vertexCoords=vertices,
+            ...               faceVertexIDs=faces, cellFaceIDs=cells)
+            >>> print(compactMesh._cellFaceIDsCSR.indices)
+            [0 1 2 3 4 5 3 6 7 8 9]
+            >>> print(compactMesh._cellFaceIDsCSR.counts)
+            [6 5]
+            >>> print(numerix.allequal(mesh.cellFaceIDs, compactMesh.cellFaceIDs))
+            True
+            >>> print(numerix.allequal(mesh._cellVertexIDs, compactMesh._cellVertexIDs))
+            True
+            >>> print(numerix.allequal(mesh._vertexCellIDs, compactMesh._vertexCellIDs))
+            True
+            >>> print(numerix.allclose(mesh.cellVolumes, compactMesh.cellVolumes))
+            True
+            >>> print(numerix.allequal(mesh._cellTopology, compactMesh._cellTopology))
+            True
+
+            The compressed connectivity is built once, and rebuilt when the
+            connectivity is assigned
+
+            >>> print(mesh._cellVertexIDsCSR is mesh._cellVertexIDsCSR)
+            True
+            >>> ragged = mesh._cellFaceIDsCSR
+            >>> print(ragged is mesh._cellFaceIDsCSR)
+            True
+            >>> mesh.cellFaceIDs = mesh.cellFaceIDs
+            >>> print(ragged is mesh._cellFaceIDsCSR)
+            False
+
             >>> dx = 1.
             >>> dy = 1.
             >>> nx = 10
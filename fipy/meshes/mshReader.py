@@ -0,0 +1,663 @@
+"""Vectorized reader for Gmsh `MSH` files
+
+Reads the ASCII and binary forms of versions 2 and 4.1 of the `MSH`
+format straight into arrays, without running Gmsh. ASCII sections are
+read in chunks of whole lines, each converted to numbers in one call, and
+binary sections are read with :func:`numpy.fromfile`, so no Python code
+runs per node or per element.
+"""
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import object
+from builtins import range
+__docformat__ = 'restructuredtext'
+
+__all__ = []
+
+from fipy.tools import numerix as nx
+
+# number of nodes of each Gmsh element type
+_nodesPerElement = {
+     1: 2,   2: 3,   3: 4,   4: 4,   5: 8,   6: 6,   7: 5,   8: 3,   9: 6,
+    10: 9,  11: 10, 12: 27, 13: 18, 14: 14, 15: 1,  16: 8,  17: 20, 18: 15,
+    19: 13, 20: 9,  21: 10, 22: 12, 23: 15, 24: 15, 25: 21, 26: 4,  27: 5,
+    28: 6,  29: 20, 30: 35, 31: 56, 92: 64, 93: 125
+}
+
+def _tokensPerLine(chunk):
+    """Count the whitespace-separated tokens on each non-blank line
+
+        >>> print(_tokensPerLine(b"3\\n1 2  3\\n\\n 4 5\\n"))
+        [1 3 2]
+    """
+    chars = nx.frombuffer(chunk, dtype=nx.uint8)
+    space = chars <= ord(b" ")
+    starts = ~space
+    starts[1:] &= space[:-1]
+    lines = nx.searchsorted(nx.flatnonzero(chars == ord(b"\n")),
+                            nx.flatnonzero(starts))
+    counts = nx.bincount(lines)
+    return counts[counts > 0]
+
+def _fromASCII(chunk, dtype):
+    if len(chunk.strip()) == 0:
+        # `fromstring` returns garbage for a blank string
+        return nx.empty((0,), dtype=dtype)
+    return nx.fromstring(chunk, dtype=dtype, sep=" ")
+
+class _ElementBlock(object):
+    """Elements read from an `MSH` file
+
+    Attributes
+    ----------
+    types, tags, physical, geometrical : ndarray
+        Gmsh type, tag, physical entity and elementary entity of
+        each element.
+    nodes : ndarray
+        `(numElements, maxNodes)` Gmsh tags of the nodes of each element,
+        padded with `-1`.
+    partitions : ndarray
+        `(numElements, maxPartitionTags)` remaining tags of each element
+        of an `MSH` 2 file, padded with `0`. The first is normally the
+        count of the partitions that follow.
+    numPartitionTags : ndarray
+        Number of `partitions` of each element.
+    order : ndarray
+        Position of each element in the file.
+    """
+    def __init__(self, types, tags, nodes, physical, geometrical,
+                 partitions=None, numPartitionTags=None, order=None):
+        self.types = nx.asarray(types)
+        self.tags = nx.asarray(tags)
+        self.nodes = nx.asarray(nodes)
+        self.physical = nx.asarray(physical)
+        self.geometrical = nx.asarray(geometrical)
+        n = len(self.tags)
+        if partitions is None:
+            partitions = nx.zeros((n, 0), dtype=nx.int64)
+        if numPartitionTags is None:
+            numPartitionTags = nx.zeros((n,), dtype=nx.int64)
+        self.partitions = nx.asarray(partitions)
+        self.numPartitionTags = nx.asarray(numPartitionTags)
+        if order is None:
+            order = nx.arange(n)
+        self.order = nx.asarray(order)
+
+    def __len__(self):
+        return len(self.tags)
+
+    @classmethod
+    def concatenate(cls, blocks):
+        """Combine `blocks`, in the order the elements appear in the file"""
+        if len(blocks) == 0:
+            return cls(types=nx.zeros((0,), dtype=nx.int64),
+                       tags=nx.zeros((0,), dtype=nx.int64),
+                       nodes=nx.zeros((0, 0), dtype=nx.int64),
+                       physical=nx.zeros((0,), dtype=nx.int64),
+                       geometrical=nx.zeros((0,), dtype=nx.int64))
+
+        def padded(arrays, fill):
+            width = max(a.shape[1] for a in arrays)
+            return nx.concatenate([nx.pad(a, ((0, 0), (0, width - a.shape[1])),
+                                          mode='constant', constant_values=fill)
+                                   for a in arrays])
+
+        order = nx.concatenate([b.order for b in blocks])
+        sort = nx.argsort(order, kind='stable')
+
+        return cls(types=nx.concatenate([b.types for b in blocks])[sort],
+                   tags=nx.concatenate([b.tags for b in blocks])[sort],
+                   nodes=padded([b.nodes for b in blocks], -1)[sort],
+                   physical=nx.concatenate([b.physical for b in blocks])[sort],
+                   geometrical=nx.concatenate([b.geometrical for b in blocks])[sort],
+                   partitions=padded([b.partitions for b in blocks], 0)[sort],
+                   numPartitionTags=nx.concatenate([b.numPartitionTags for b in blocks])[sort],
+                   order=order[sort])
+
+class _MSHReader(object):
+    """Read the mesh held in a Gmsh `MSH` file
+
+    After :meth:`read`, holds the Gmsh tags and `(3, numNodes)`
+    coordinates of the nodes, blocks of elements, and the physical names
+    of the mesh.
+
+        >>> import os
+        >>> import tempfile
+        >>> (f, mshFile) = tempfile.mkstemp('.msh')
+        >>> f = os.fdopen(f, 'w')
+        >>> output = f.write('''$MeshFormat
+        ... 2.2 0 8
+        ... $EndMeshFormat
+        ... $PhysicalNames
+        ... 2
+        ... 1 3 "edge"
+        ... 2 4 "the square"
+        ... $EndPhysicalNames
+        ... $Nodes
+        ... 5
+        ... 1 0.0 0.0 0.0
+        ... 2 1.0 0.0 0.0
+        ... 3 2.0 0.0 0.0
+        ... 4 0.0 1.0 0.0
+        ... 5 1.0 1.0 0.0
+        ... $EndNodes
+        ... $Elements
+        ... 3
+        ... 1 1 2 3 7 1 2
+        ... 2 3 2 4 9 1 2 5 4
+        ... 3 2 2 0 8 2 3 5
+        ... $EndElements
+        ... ''')
+        >>> f.close()
+
+        >>> reader = _MSHReader(mshFile, chunkSize=16)
+        >>> reader.read()
+        >>> print(reader.version, reader.binary)
+        2.2 False
+        >>> print(reader.nodeTags)
+        [1 2 3 4 5]
+        >>> print(reader.nodeCoords[:2])
+        [[ 0.  1.  2.  0.  1.]
+         [ 0.  0.  0.  1.  1.]]
+        >>> cells = reader.elements(types=(2, 3))
+        >>> print(cells.tags)
+        [2 3]
+        >>> print(cells.nodes)
+        [[ 1  2  5  4]
+         [ 2  3  5 -1]]
+        >>> print(cells.physical)
+        [4 0]
+        >>> print(reader.physicalNames[2])
+        {'the square': 4}
+
+    In the `MSH` 4.1 format, elements are grouped by elementary entity and
+    their physical entities are listed in `$Entities`
+
+        >>> f = open(mshFile, 'w')
+        >>> output = f.write('''$MeshFormat
+        ... 4.1 0 8
+        ... $EndMeshFormat
+        ... $Entities
+        ... 0 1 2 0
+        ... 7 0 0 0 1 0 0 1 3 2 1 -2
+        ... 8 1 0 0 2 1 0 0 0
+        ... 9 0 0 0 1 1 0 1 4 4 1 2 3 4
+        ... $EndEntities
+        ... $Nodes
+        ... 2 5 1 5
+        ... 2 9 0 2
+        ... 1
+        ... 2
+        ... 0.0 0.0 0.0
+        ... 1.0 0.0 0.0
+        ... 2 8 0 3
+        ... 3
+        ... 4
+        ... 5
+        ... 2.0 0.0 0.0
+        ... 0.0 1.0 0.0
+        ... 1.0 1.0 0.0
+        ... $EndNodes
+        ... $Elements
+        ... 3 3 1 3
+        ... 1 7 1 1
+        ... 1 1 2
+        ... 2 9 3 1
+        ... 2 1 2 5 4
+        ... 2 8 2 1
+        ... 3 2 3 5
+        ... $EndElements
+        ... ''')
+        >>> f.close()
+
+        >>> reader = _MSHReader(mshFile)
+        >>> reader.read()
+        >>> print(reader.version, reader.binary)
+        4.1 False
+        >>> print(reader.nodeCoords[:2])
+        [[ 0.  1.  2.  0.  1.]
+         [ 0.  0.  0.  1.  1.]]
+        >>> cells = reader.elements(types=(2, 3))
+        >>> print(cells.nodes)
+        [[ 1  2  5  4]
+         [ 2  3  5 -1]]
+        >>> print(cells.physical)
+        [4 0]
+        >>> print(cells.geometrical)
+        [9 8]
+
+    An entity can have an empty block of elements
+
+        >>> f = open(mshFile, 'w')
+        >>> output = f.write('''$MeshFormat
+        ... 4.1 0 8
+        ... $EndMeshFormat
+        ... $Nodes
+        ... 1 3 1 3
+        ... 2 1 0 3
+        ... 1
+        ... 2
+        ... 3
+        ... 0.0 0.0 0.0
+        ... 1.0 0.0 0.0
+        ... 0.0 1.0 0.0
+        ... $EndNodes
+        ... $Elements
+        ... 2 1 1 1
+        ... 1 2 1 0
+        ... 2 1 2 1
+        ... 1 1 2 3
+        ... $EndElements
+        ... ''')
+        >>> f.close()
+
+        >>> reader = _MSHReader(mshFile)
+        >>> reader.read()
+        >>> print(reader.elements(types=(1, 2)).nodes)
+        [[1 2 3]]
+
+    Version 4.0 of the format is laid out differently from 4.1, and is
+    not read
+
+        >>> f = open(mshFile, 'w')
+        >>> output = f.write('''$MeshFormat
+        ... 4 0 8
+        ... $EndMeshFormat
+        ... ''')
+        >>> f.close()
+
+        >>> _MSHReader(mshFile).read()
+        Traceback (most recent call last):
+            ...
+        SyntaxError: Gmsh MSH file format version 4 is not supported; save the mesh as version 4.1 or 2.2, e.g., with `gmsh -save -format msh41`
+
+    Binary files are read with :func:`numpy.fromfile`
+
+        >>> import struct
+        >>> f = open(mshFile, 'wb')
+        >>> output = f.write(b"$MeshFormat\\n2.2 1 8\\n"
+        ...                  + struct.pack('<i', 1)
+        ...                  + b"\\n$EndMeshFormat\\n$Nodes\\n5\\n")
+        >>> for tag, x, y in ((1, 0., 0.), (2, 1., 0.), (3, 2., 0.),
+        ...                   (4, 0., 1.), (5, 1., 1.)):
+        ...     output = f.write(struct.pack('<i3d', tag, x, y, 0.))
+        >>> output = f.write(b"\\n$EndNodes\\n$Elements\\n2\\n"
+        ...                  + struct.pack('<3i', 3, 1, 2)
+        ...                  + struct.pack('<7i', 1, 4, 9, 1, 2, 5, 4)
+        ...                  + struct.pack('<3i', 2, 1, 2)
+        ...                  + struct.pack('<6i', 2, 0, 8, 2, 3, 5)
+        ...                  + b"\\n$EndElements\\n")
+        >>> f.close()
+
+        >>> reader = _MSHReader(mshFile)
+        >>> reader.read()
+        >>> print(reader.version, reader.binary)
+        2.2 True
+        >>> print(reader.nodeTags)
+        [1 2 3 4 5]
+        >>> cells = reader.elements(types=(2, 3))
+        >>> print(cells.tags)
+        [1 2]
+        >>> print(cells.nodes)
+        [[ 1  2  5  4]
+         [ 2  3  5 -1]]
+        >>> print(cells.physical)
+        [4 0]
+
+        >>> os.remove(mshFile)
+    """
+    def __init__(self, filename, chunkSize=2**22):
+        self.filename = filename
+        self.chunkSize = chunkSize
+
+        self.version = None
+        self.binary = False
+        self.dataSize = 8
+        self.byteorder = "<"
+        self.nodeTags = nx.zeros((0,), dtype=nx.int64)
+        self.nodeCoords = nx.zeros((3, 0))
+        self.blocks = []
+        self.physicalNames = dict((dim, dict()) for dim in range(4))
+        self.entityPhysical = dict()
+
+    @property
+    def fileType(self):
+        return int(self.binary)
+
+    def read(self):
+        with open(self.filename, 'rb') as self.fileobj:
+            while True:
+                section = self._nextSection()
+                if section is None:
+                    break
+                reader = getattr(self, "_read" + section, None)
+                if reader is None or (self.version is None and section != "MeshFormat"):
+                    self._skipSection(section)
+                else:
+                    reader()
+        del self.fileobj
+
+        if self.version is None:
+            raise EOFError("No `MeshFormat' header found!")
+
+    def elements(self, types):
+        """Return the elements of the given Gmsh `types` as one block"""
+        return _ElementBlock.concatenate([block for block in self.blocks
+                                          if len(block) > 0 and block.types[0] in types])
+
+    # file navigation
+
+    def _nextSection(self):
+        while True:
+            line = self.fileobj.readline()
+            if len(line) == 0:
+                return None
+            line = line.strip()
+            if line.startswith(b"$") and not line.startswith(b"$End"):
+                return line[1:].decode('ascii')
+
+    def _sectionChunks(self, section):
+        """Yield the content of `section`, in chunks of whole lines"""
+        end = b"\n$End" + section.encode('ascii')
+        carry = b"\n"
+        while True:
+            chunk = self.fileobj.read(self.chunkSize)
+            window = carry + chunk
+            index = window.find(end)
+            if index >= 0:
+                yield window[:index]
+                # return what was read beyond the end of the section
+                remainder = len(window) - index - len(end)
+                self.fileobj.seek(-remainder, 1)
+                self.fileobj.readline()
+                return
+            elif len(chunk) == 0:
+                raise EOFError("No `$End%s' found!" % section)
+
+            cut = window.rfind(b"\n")
+            if cut > 0:
+                yield window[:cut]
+                carry = window[cut:]
+            else:
+                carry = window
+
+    def _skipSection(self, section):
+        for chunk in self._sectionChunks(section):
+            pass
+
+    def _sectionText(self, section):
+        return b"".join(self._sectionChunks(section))
+
+    def _endSection(self, section):
+        """Consume the end of a binary `section`"""
+        for chunk in self._sectionChunks(section):
+            if len(chunk.strip()) > 0:
+                raise SyntaxError("Unexpected data at end of `%s'" % section)
+
+    # binary input
+
+    def _binary(self, dtype, count):
+        dtype = nx.dtype(dtype).newbyteorder(self.byteorder)
+        data = nx.fromfile(self.fileobj, dtype=dtype, count=count)
+        if len(data) != count:
+            raise EOFError("Unexpected end of file")
+        return data
+
+    @property
+    def _size_t(self):
+        return "u%d" % self.dataSize
+
+    # sections
+
+    def _readMeshFormat(self):
+        version, fileType, dataSize = self.fileobj.readline().split()[:3]
+        self.version = float(version)
+        self.binary = (int(fileType) == 1)
+        self.dataSize = int(dataSize)
+
+        if 4 <= self.version < 4.1:
+            # `MSH` 4.0 lays out its entities, nodes and elements
+            # differently from both 2 and 4.1
+            raise SyntaxError("Gmsh MSH file format version %s is not supported; "
+                              "save the mesh as version 4.1 or 2.2, "
+                              "e.g., with `gmsh -save -format msh41`" % version.decode('ascii'))
+        elif not (2 <= self.version < 3 or 4.1 <= self.version < 5):
+            raise SyntaxError("Gmsh MSH file format version %s is not supported" % version.decode('ascii'))
+
+        if self.binary:
+            one = nx.fromfile(self.fileobj, dtype="<i4", count=1)
+            self.byteorder = "<" if one[0] == 1 else ">"
+            self._endSection("MeshFormat")
+        else:
+            self._skipSection("MeshFormat")
+
+    def _readPhysicalNames(self):
+        lines = self._sectionText("PhysicalNames").decode('utf-8').splitlines()
+        lines = [line for line in lines if len(line.strip()) > 0]
+        for line in lines[1:]:
+            nm = line.split()
+            if self.version > 2.0:
+                dim = [int(nm.pop(0))]
+            else:
+                # Gmsh format prior to 2.1 did not unambiguously tie
+                # physical names to physical entities of different dimensions
+                # http://article.gmane.org/gmane.comp.cad.gmsh.general/1601
+                dim = [0, 1, 2, 3]
+            num = int(nm.pop(0))
+            name = " ".join(nm)[1:-1]
+            for d in dim:
+                self.physicalNames[d][name] = num
+
+    def _readEntities(self):
+        if self.binary:
+            counts = self._binary(self._size_t, 4)
+            for dim, count in enumerate(counts):
+                for i in range(count):
+                    tag = int(self._binary("i4", 1)[0])
+                    self._binary("f8", 3 if dim == 0 else 6)
+                    physical = self._binary("i4", int(self._binary(self._size_t, 1)[0]))
+                    if dim > 0:
+                        self._binary("i4", int(self._binary(self._size_t, 1)[0]))
+                    self._setEntityPhysical(dim, tag, physical)
+            self._endSection("Entities")
+        else:
+            values = _fromASCII(self._sectionText("Entities"), dtype=float).astype(nx.int64)
+            # only the integer entries are needed; bounding boxes are skipped
+            position = 4
+            for dim, count in enumerate(values[:4]):
+                for i in range(count):
+                    tag = values[position]
+                    position += 4 if dim == 0 else 7
+                    numPhysical = values[position]
+                    physical = values[position + 1:position + 1 + numPhysical]
+                    position += 1 + numPhysical
+                    if dim > 0:
+                        position += 1 + values[position]
+                    self._setEntityPhysical(dim, tag, physical)
+
+    def _setEntityPhysical(self, dim, tag, physical):
+        # as for `MSH` 2, elements take the first physical tag of their entity
+        self.entityPhysical[(int(dim), int(tag))] = int(physical[0]) if len(physical) > 0 else 0
+
+    def _readPartitionedEntities(self):
+        raise SyntaxError("Partitioned MSH 4 files are not supported; "
+                            "partition with `-format msh2`")
+
+    def _readNodes(self):
+        if self.version < 3:
+            self._readNodes2()
+        else:
+            self._readNodes4()
+
+    def _readNodes2(self):
+        if self.binary:
+            numNodes = int(self.fileobj.readline())
+            nodes = self._binary([("tag", "i4"), ("xyz", "f8", (3,))], numNodes)
+            self.nodeTags = nodes["tag"].astype(nx.int64)
+            self.nodeCoords = nodes["xyz"].T.astype(float)
+            self._endSection("Nodes")
+        else:
+            values = nx.concatenate([_fromASCII(chunk, dtype=float)
+                                     for chunk in self._sectionChunks("Nodes")])
+            nodes = values[1:].reshape((-1, 4))
+            self.nodeTags = nodes[:, 0].astype(nx.int64)
+            self.nodeCoords = nodes[:, 1:].T.copy()
+
+    def _readNodes4(self):
+        if self.binary:
+            numBlocks, numNodes, minTag, maxTag = self._binary(self._size_t, 4)
+        else:
+            values = nx.concatenate([_fromASCII(chunk, dtype=float)
+                                     for chunk in self._sectionChunks("Nodes")])
+            numBlocks, numNodes, minTag, maxTag = values[:4].astype(nx.int64)
+            position = 4
+
+        tags = []
+        coords = []
+        for block in range(numBlocks):
+            if self.binary:
+                dim, entity, parametric = self._binary("i4", 3)
+                numInBlock = int(self._binary(self._size_t, 1)[0])
+                blockTags = self._binary(self._size_t, numInBlock)
+            else:
+                dim, entity, parametric, numInBlock = values[position:position + 4].astype(nx.int64)
+                position += 4
+                blockTags = values[position:position + numInBlock]
+                position += numInBlock
+
+            width = 3 + (dim if parametric else 0)
+            if self.binary:
+                blockCoords = self._binary("f8", numInBlock * width)
+            else:
+                blockCoords = values[position:position + numInBlock * width]
+                position += numInBlock * width
+
+            tags.append(nx.asarray(blockTags).astype(nx.int64))
+            coords.append(blockCoords.reshape((numInBlock, width))[:, :3])
+
+        if len(tags) > 0:
+            self.nodeTags = nx.concatenate(tags)
+            self.nodeCoords = nx.concatenate(coords).T.astype(float)
+
+        if self.binary:
+            self._endSection("Nodes")
+
+    def _readElements(self):
+        if self.version < 3:
+            if self.binary:
+                self._readElements2Binary()
+            else:
+                self._readElements2ASCII()
+        else:
+            self._readElements4()
+
+    def _addElements2(self, types, ids, tags, nodes, order):
+        """Add elements of an `MSH` 2 file that have the same number of tags"""
+        numTags = tags.shape[1]
+        if numTags >= 2:
+            physical = tags[:, 0]
+            geometrical = tags[:, 1]
+            partitions = tags[:, 2:]
+        else:
+            physical = geometrical = nx.zeros((len(ids),), dtype=nx.int64) - 1
+            partitions = tags
+        self.blocks.append(_ElementBlock(types=types,
+                                         tags=ids,
+                                         nodes=nodes,
+                                         physical=physical,
+                                         geometrical=geometrical,
+                                         partitions=partitions,
+                                         numPartitionTags=nx.zeros((len(ids),), dtype=nx.int64) + partitions.shape[1],
+                                         order=order))
+
+    def _readElements2ASCII(self):
+        values = []
+        counts = []
+        for chunk in self._sectionChunks("Elements"):
+            values.append(_fromASCII(chunk, dtype=nx.int64))
+            counts.append(_tokensPerLine(chunk))
+        values = nx.concatenate(values)
+        counts = nx.concatenate(counts)
+
+        # the first line is the number of elements
+        starts = nx.cumsum(counts) - counts
+        starts, counts = starts[1:], counts[1:]
+
+        types = values[starts + 1]
+        numTags = values[starts + 2]
+
+        # each line is `tag type numTags tags... nodes...`,
+        # so group the lines that have the same layout
+        keys = types * (counts.max() + 1) + numTags
+        for key in nx.unique(keys):
+            lines = nx.flatnonzero(keys == key)
+            n = int(numTags[lines[0]])
+            elements = values[starts[lines][..., nx.newaxis] + nx.arange(counts[lines[0]])]
+            self._addElements2(types=types[lines],
+                               ids=elements[:, 0],
+                               tags=elements[:, 3:3 + n],
+                               nodes=elements[:, 3 + n:],
+                               order=lines)
+
+    def _readElements2Binary(self):
+        numElements = int(self.fileobj.readline())
+        position = 0
+        while position < numElements:
+            elementType, numInBlock, numTags = self._binary("i4", 3)
+            width = 1 + numTags + _nodesPerElement[elementType]
+            elements = self._binary("i4", numInBlock * width).reshape((numInBlock, width))
+            elements = elements.astype(nx.int64)
+            self._addElements2(types=nx.zeros((numInBlock,), dtype=nx.int64) + elementType,
+                               ids=elements[:, 0],
+                               tags=elements[:, 1:1 + numTags],
+                               nodes=elements[:, 1 + numTags:],
+                               order=nx.arange(position, position + numInBlock))
+            position += numInBlock
+        self._endSection("Elements")
+
+    def _readElements4(self):
+        if self.binary:
+            numBlocks, numElements, minTag, maxTag = self._binary(self._size_t, 4)
+        else:
+            values = nx.concatenate([_fromASCII(chunk, dtype=nx.int64)
+                                     for chunk in self._sectionChunks("Elements")])
+            numBlocks, numElements, minTag, maxTag = values[:4]
+            position = 4
+
+        count = 0
+        for block in range(numBlocks):
+            if self.binary:
+                dim, entity, elementType = self._binary("i4", 3)
+                numInBlock = int(self._binary(self._size_t, 1)[0])
+            else:
+                dim, entity, elementType, numInBlock = values[position:position + 4]
+                position += 4
+
+            width = 1 + _nodesPerElement[elementType]
+            if self.binary:
+                elements = self._binary(self._size_t, numInBlock * width)
+            else:
+                elements = values[position:position + numInBlock * width]
+                position += numInBlock * width
+            elements = elements.reshape((numInBlock, width)).astype(nx.int64)
+
+            def constant(value):
+                return nx.zeros((numInBlock,), dtype=nx.int64) + value
+
+            self.blocks.append(_ElementBlock(types=constant(elementType),
+                                             tags=elements[:, 0],
+                                             nodes=elements[:, 1:],
+                                             physical=constant(self.entityPhysical.get((int(dim), int(entity)), 0)),
+                                             geometrical=constant(entity),
+                                             order=nx.arange(count, count + numInBlock)))
+            count += numInBlock
+
+        if self.binary:
+            self._endSection("Elements")
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
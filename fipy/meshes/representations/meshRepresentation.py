@@ -10,9 +10,15 @@ class _MeshRepresentation(_AbstractRepresentation):
     def getstate(self):
         """Collect the necessary information to ``pickle`` the `Mesh` to persistent storage.
         """
+        if self.mesh._compactConnectivity:
+            faceVertexIDs = self.mesh._faceVertexIDsCSR
+            cellFaceIDs = self.mesh._cellFaceIDsCSR
+        else:
+            faceVertexIDs = self.mesh.faceVertexIDs
+            cellFaceIDs = self.mesh.cellFaceIDs
         return dict(vertexCoords=self.mesh.vertexCoords *  self.mesh.scale['length'],
-                    faceVertexIDs=self.mesh.faceVertexIDs,
-                    cellFaceIDs=self.mesh.cellFaceIDs,
+                    faceVertexIDs=faceVertexIDs,
+                    cellFaceIDs=cellFaceIDs,
                     _RepresentationClass=self.__class__)
 
     @staticmethod
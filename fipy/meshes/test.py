@@ -16,6 +16,8 @@ def _suite():
         'fipy.meshes.nonUniformGrid3D',
         'fipy.meshes.tri2D',
         'fipy.meshes.gmshMesh',
+        'fipy.meshes.mshReader',
+        'fipy.meshes.cellOrdering',
         'fipy.meshes.periodicGrid1D',
         'fipy.meshes.periodicGrid2D',
         'fipy.meshes.periodicGrid3D',
@@ -18,6 +18,14 @@ class _MeshTopology(_AbstractTopology):
     def _isOrthogonal(self):
         return False
 
+    @property
+    def _vertexCellIDs(self):
+        return self.mesh._cellVertexIDsCSR.inverted().toMasked()
+
+    @property
+    def _vertexFaceIDs(self):
+        return self.mesh._faceVertexIDsCSR.inverted().toMasked()
+
     @property
     def _cellTopology(self):
         """return a map of the topology of each cell"""
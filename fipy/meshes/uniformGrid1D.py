@@ -89,6 +89,14 @@ class UniformGrid1D(UniformGrid):
         interiorFaces[numerix.arange(self.numberOfFaces-2) + 1] = True
         return interiorFaces
 
+    @property
+    def _stencilFaces(self):
+        """Shape of the cells and, for each axis, the ID of the first face
+        normal to it and the shape of the block of those faces, from which
+        the matrix stencil of the interior faces is found analytically.
+        """
+        return (self.nx,), [(0, 0, (self.nx + 1,))]
+
     @property
     def _cellToFaceOrientations(self):
         orientations = numerix.ones((2, self.numberOfCells), 'l')
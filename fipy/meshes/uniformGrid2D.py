@@ -109,6 +109,16 @@ class UniformGrid2D(UniformGrid):
         interiorFaces[interiorIDs] = True
         return interiorFaces
 
+    @property
+    def _stencilFaces(self):
+        """Shape of the cells and, for each axis, the ID of the first face
+        normal to it and the shape of the block of those faces, from which
+        the matrix stencil of the interior faces is found analytically.
+        """
+        return ((self.ny, self.nx),
+                [(0, 0, (self.numberOfHorizontalRows, self.nx)),
+                 (1, self.numberOfHorizontalFaces, (self.ny, self.numberOfVerticalColumns))])
+
     @property
     def _cellToFaceOrientations(self):
         cellFaceOrientations = numerix.ones((4, self.numberOfCells), 'l')
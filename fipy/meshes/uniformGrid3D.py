@@ -122,6 +122,17 @@ class UniformGrid3D(UniformGrid):
         interiorFaces[interiorIDs] = True
         return interiorFaces
 
+    @property
+    def _stencilFaces(self):
+        """Shape of the cells and, for each axis, the ID of the first face
+        normal to it and the shape of the block of those faces, from which
+        the matrix stencil of the interior faces is found analytically.
+        """
+        return ((self.nz, self.ny, self.nx),
+                [(0, 0, (self.nz + 1, self.ny, self.nx)),
+                 (1, self.numberOfXYFaces, (self.nz, self.ny + 1, self.nx)),
+                 (2, self.numberOfXYFaces + self.numberOfXZFaces, (self.nz, self.ny, self.nx + 1))])
+
     @property
     def _cellToFaceOrientations(self):
         tmp = numerix.take(self.faceCellIDs[0], self.cellFaceIDs)
@@ -1,13 +1,15 @@
 from __future__ import unicode_literals
 from builtins import str
 import os
+import sys
 
 from fipy.tools.parser import _parseSolver
 
 from fipy.solvers.solver import *
-__all__ = list(solver.__all__)
 from future.utils import text_to_native_str
-__all__ = [text_to_native_str(n) for n in __all__]
+# the names of the chosen suite are added once it is imported
+_solverNames = [text_to_native_str(n) for n in solver.__all__]
+__all__ = list(_solverNames)
 
 _desired_solver = _parseSolver()
 
@@ -22,126 +24,178 @@ try:
 except ImportError:
     _Nproc = 1
 
-_exceptions = []
-
 class SerialSolverError(Exception):
     def __init__(self):
         super(SerialSolverError, self).__init__('solver does not run in parallel')
 
-_exceptions = {}
-
-solver = None
-
-from fipy.tools.comms.dummyComm import DummyComm
-serialComm, parallelComm = DummyComm(), DummyComm()
-
-if solver is None and _desired_solver in ["pysparse", None]:
-    try:
-        if _Nproc > 1:
-            raise SerialSolverError()
-        from fipy.solvers.pysparse import *
-        __all__.extend(pysparse.__all__)
-        from fipy.matrices.pysparseMatrix import _PysparseMeshMatrix
-        _MeshMatrix =  _PysparseMeshMatrix
-        solver = "pysparse"
-    except Exception as inst:
-        _exceptions["pysparse"] = inst
-
-if solver is None and _desired_solver in ["petsc", None]:
-    try:
-        from fipy.solvers.petsc import *
-        __all__.extend(petsc.__all__)
+# for each suite, the subpackage of its solvers, the module and class of
+# its matrices, the packages it needs, and whether it only runs in serial
+_suites = {
+    "pysparse": ("pysparse", "fipy.matrices.pysparseMatrix", "_PysparseMeshMatrix",
+                 ["pysparse"], True),
+    "petsc": ("petsc", "fipy.matrices.petscMatrix", "_PETScMeshMatrix",
+              ["petsc4py"], False),
+    "trilinos": ("trilinos", "fipy.matrices.pysparseMatrix", "_PysparseMeshMatrix",
+                 ["PyTrilinos", "pysparse"], False),
+    "no-pysparse": ("trilinos", "fipy.matrices.trilinosMatrix", "_TrilinosMeshMatrix",
+                    ["PyTrilinos"], False),
+    "scipy": ("scipy", "fipy.matrices.scipyMatrix", "_ScipyMeshMatrix",
+              ["scipy"], True),
+    "pyamg": ("pyAMG", "fipy.matrices.scipyMatrix", "_ScipyMeshMatrix",
+              ["pyamg"], True),
+    "pyamgx": ("pyamgx", "fipy.matrices.scipyMatrix", "_ScipyMeshMatrix",
+               ["pyamgx"], True)
+}
+
+def _candidates(desired):
+    """The suites to try, in turn, for the `desired` one
+
+        >>> print(_candidates("trilinos"))
+        ['trilinos', 'no-pysparse']
+        >>> print(_candidates("fortran"))
+        []
+    """
+    if desired is None:
+        return ["pysparse", "petsc", "trilinos", "no-pysparse", "scipy", "pyamg", "pyamgx"]
+    elif desired == "trilinos":
+        # the Trilinos solvers work on PySparse matrices where they can
+        return ["trilinos", "no-pysparse"]
+    elif desired in _suites:
+        return [desired]
+    else:
+        return []
 
+def _comms(name):
+    """Serial and parallel communicators of the suite `name`"""
+    if name == "petsc":
         from fipy.solvers.petsc.comms.serialPETScCommWrapper import SerialPETScCommWrapper
-        serialComm = SerialPETScCommWrapper()
-
         if _Nproc > 1:
             from fipy.solvers.petsc.comms.parallelPETScCommWrapper import ParallelPETScCommWrapper
-            parallelComm = ParallelPETScCommWrapper()
-        else:
-            parallelComm = SerialPETScCommWrapper()
-
-        from fipy.matrices.petscMatrix import _PETScMeshMatrix
-        _MeshMatrix =  _PETScMeshMatrix
-        solver = "petsc"
-    except Exception as inst:
-        _exceptions["petsc"] = inst
-
-if solver is None and _desired_solver in ["trilinos", "no-pysparse", None]:
-    try:
-        from fipy.solvers.trilinos import *
-        __all__.extend(trilinos.__all__)
-        
+            return SerialPETScCommWrapper(), ParallelPETScCommWrapper()
+        return SerialPETScCommWrapper(), SerialPETScCommWrapper()
+    elif name in ["trilinos", "no-pysparse"]:
         from fipy.solvers.trilinos.comms.serialEpetraCommWrapper import SerialEpetraCommWrapper
-        serialComm = SerialEpetraCommWrapper()
-
         if _Nproc > 1:
             from fipy.solvers.trilinos.comms.parallelEpetraCommWrapper import ParallelEpetraCommWrapper
-            parallelComm = ParallelEpetraCommWrapper()
-        else:
-            parallelComm = SerialEpetraCommWrapper()
-
-        if _desired_solver != "no-pysparse":
-            try:
-                from fipy.matrices.pysparseMatrix import _PysparseMeshMatrix
-                _MeshMatrix =  _PysparseMeshMatrix
-                solver = "trilinos"
-            except ImportError:
-                pass
-                
-        if solver is None:
-            # no-pysparse requested or pysparseMatrix failed to import
-            from fipy.matrices.trilinosMatrix import _TrilinosMeshMatrix
-            _MeshMatrix =  _TrilinosMeshMatrix
-            solver = "no-pysparse"
-    except Exception as inst:
-        _exceptions["trilinos"] = inst
-
-if solver is None and _desired_solver in ["scipy", None]:
-    try:
-        if _Nproc > 1:
-            raise SerialSolverError()
-        from fipy.solvers.scipy import *
-        __all__.extend(scipy.__all__)
-        from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
-        _MeshMatrix = _ScipyMeshMatrix
-        solver = "scipy"
-    except Exception as inst:
-        _exceptions["scipy"] = inst
-
-if solver is None and _desired_solver in ["pyamg", None]:
-    try:
-        if _Nproc > 1:
-            raise SerialSolverError()
-        from fipy.solvers.pyAMG import *
-        __all__.extend(pyAMG.__all__)
-        from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
-        _MeshMatrix = _ScipyMeshMatrix
-        solver = "pyamg"
-    except Exception as inst:
-        _exceptions["pyamg"] = inst
-
-if solver is None and _desired_solver in ["pyamgx", None]:
-    try:
-        if _parallelComm.Nproc > 1:
-            raise  SerialSolverError('pyamgx')
-        from fipy.solvers.pyamgx import *
-        __all__.extend(pyamgx.__all__)
-        from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
-        _MeshMatrix = _ScipyMeshMatrix
-        solver = "pyamgx"
-    except Exception as inst:
-        _exceptions["pyamgx"] = inst
+            return SerialEpetraCommWrapper(), ParallelEpetraCommWrapper()
+        return SerialEpetraCommWrapper(), SerialEpetraCommWrapper()
+    else:
+        from fipy.tools.comms.dummyComm import DummyComm
+        return DummyComm(), DummyComm()
+
+def _select(name, check):
+    """Choose the suite `name`, and set up its communicators
+
+    If `check`, only check that the packages the suite needs can be found,
+    and leave its solvers to be imported when they are first used.
+    Otherwise, import them now.
+    """
+    global serialComm, parallelComm
+
+    subpackage, matrixModule, matrixClass, packages, serialOnly = _suites[name]
+    if serialOnly and _Nproc > 1:
+        raise SerialSolverError()
+    if check:
+        import importlib.util
+        for package in packages:
+            if importlib.util.find_spec(package) is None:
+                raise ImportError("No module named '%s'" % package)
+    comms = _comms(name)
+    if not check:
+        _load(name)
+    serialComm, parallelComm = comms
+
+def _load(name):
+    """Import the solvers and matrices of the suite `name`"""
+    import importlib
+
+    subpackage, matrixModule, matrixClass, packages, serialOnly = _suites[name]
+    suite = importlib.import_module("fipy.solvers." + subpackage)
+    matrices = getattr(importlib.import_module(matrixModule), matrixClass)
+    names = [n for n in suite.__all__ if n not in _solverNames]
+    for n in names:
+        globals()[n] = getattr(suite, n)
+    globals()["_MeshMatrix"] = matrices
+    globals()["__all__"] = _solverNames + [text_to_native_str(n) for n in names]
+
+def __getattr__(name):
+    """Import the solvers of the chosen suite on first use
+
+    Module attributes are only looked up lazily from Python 3.7.
+
+        >>> import fipy.solvers
+        >>> print(fipy.solvers.DefaultSolver.__module__.startswith("fipy.solvers."))
+        True
+        >>> print("DefaultSolver" in fipy.solvers.__all__)
+        True
+
+    When the suite is asked for, `import fipy` does not import it
+
+        >>> import os
+        >>> import subprocess
+        >>> script = "\\n".join(["import sys",
+        ...                     "import fipy",
+        ...                     "print('fipy.solvers.scipy' in sys.modules)",
+        ...                     "print(fipy.DefaultSolver.__module__)"])
+        >>> env = dict(os.environ, FIPY_SOLVERS="scipy")
+        >>> output = subprocess.check_output([sys.executable, "-W", "ignore", "-c", script],
+        ...                                  env=env)
+        >>> print(output.decode('ascii').strip())
+        False
+        fipy.solvers.scipy.linearLUSolver
+    """
+    if name.startswith("__") and name != "__all__":
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    if solver is not None and "_MeshMatrix" not in globals():
+        _load(solver)
+        if name in globals():
+            return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+_exceptions = {}
+
+solver = None
+
+from fipy.tools.comms.dummyComm import DummyComm
+serialComm, parallelComm = DummyComm(), DummyComm()
+
+# a suite that is asked for, or that the last unconstrained search in this
+# environment found, is only imported once it is used; otherwise, each is
+# imported in turn until one can be
+from fipy.solvers.suiteCache import _readCachedSuite, _writeCachedSuite
+_searches = [(_desired_solver, _desired_solver is not None and sys.version_info >= (3, 7))]
+if _desired_solver is None:
+    _cached_solver = _readCachedSuite(parallel=_Nproc > 1)
+    if _cached_solver is not None:
+        _searches.insert(0, (_cached_solver, sys.version_info >= (3, 7)))
+
+for _desired_solver, _lazy in _searches:
+    for _candidate in _candidates(_desired_solver):
+        try:
+            _select(_candidate, check=_lazy)
+            solver = _candidate
+            break
+        except Exception as inst:
+            _exceptions[_candidate] = inst
+
+    if solver is not None:
+        if _desired_solver is None:
+            _writeCachedSuite(solver, parallel=_Nproc > 1)
+        break
 
 if solver is None:
     if _desired_solver is None:
         raise ImportError('Unable to load a solver: %s' % str(_exceptions))
     else:
         if len(_exceptions) > 0:
-            raise ImportError('Unable to load solver %s: %s' % (_desired_solver, _exceptions[_desired_solver]))
+            raise ImportError('Unable to load solver %s: %s' % (_desired_solver, _exceptions))
         else:
             raise ImportError('Unknown solver package %s' % _desired_solver)
 
+if "_MeshMatrix" not in globals():
+    # so that `from fipy.solvers import *` imports the suite
+    del __all__
+
 from fipy.tests.doctestPlus import register_skipper
 
 register_skipper(flag='PYSPARSE_SOLVER',
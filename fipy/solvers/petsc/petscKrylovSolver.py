@@ -5,6 +5,8 @@ import os
 from petsc4py import PETSc
 
 from fipy.solvers.petsc.petscSolver import PETScSolver
+from fipy.solvers.solver import Solver
+from fipy.tools import numerix
 
 __all__ = ["PETScKrylovSolver"]
 
@@ -37,12 +39,16 @@ class PETScKrylovSolver(PETScSolver):
 
     """
       
-    def __init__(self, tolerance=1e-10, iterations=1000, precon=None):
+    def __init__(self, tolerance=1e-10, iterations=1000, precon=None, matrixFree=False):
         """
         :Parameters:
           - `tolerance`: The required error tolerance.
           - `iterations`: The maximum number of iterative steps to perform.
           - `precon`: Preconditioner to use (string). 
+          - `matrixFree`: Apply the terms to vectors, through a PETSc shell
+            matrix, rather than assemble their matrix. Only preconditioners
+            that need no more than the diagonal, like `"jacobi"`, can be
+            used, and none is used by default. Only on one processor.
 
         """
         if self.__class__ is PETScKrylovSolver:
@@ -50,20 +56,80 @@ class PETScKrylovSolver(PETScSolver):
             
         PETScSolver.__init__(self, tolerance=tolerance,
                              iterations=iterations, precon=precon)
+        self.matrixFree = matrixFree
+
+    @property
+    def _matrixClass(self):
+        if self.matrixFree:
+            from fipy.matrices.matrixFreeMatrix import _MatrixFreeMeshMatrix
+            return _MatrixFreeMeshMatrix
+        else:
+            return PETScSolver._matrixClass.fget(self)
+
+    def _solve(self):
+        if not self.matrixFree:
+            return PETScSolver._solve(self)
+
+        if self.var.mesh.communicator.Nproc > 1:
+            raise Exception("Matrix-free PETSc solvers cannot be used with multiple processors")
+
+        x = PETSc.Vec().createWithArray(numerix.array(self.var.ravel(), dtype=float),
+                                        comm=PETSc.COMM_SELF)
+        b = PETSc.Vec().createWithArray(numerix.array(self.RHSvector, dtype=float).ravel(),
+                                        comm=PETSc.COMM_SELF)
+        L = PETSc.Mat().createPython(self.matrix._shape,
+                                     context=_MatrixFreeContext(self.matrix),
+                                     comm=PETSc.COMM_SELF)
+        L.setUp()
+
+        self._solve_(L, x, b)
+
+        self.var[:] = numerix.reshape(numerix.array(x.getArray()), self.var.shape)
+
+    def _calcResidualVector(self, residualFn=None):
+        if self.matrixFree:
+            return Solver._calcResidualVector(self, residualFn=residualFn)
+        else:
+            return PETScSolver._calcResidualVector(self, residualFn=residualFn)
+
+    def _calcResidual(self, residualFn=None):
+        if self.matrixFree:
+            return Solver._calcResidual(self, residualFn=residualFn)
+        else:
+            return PETScSolver._calcResidual(self, residualFn=residualFn)
+
+    def _calcRHSNorm(self):
+        if self.matrixFree:
+            return Solver._calcRHSNorm(self)
+        else:
+            return PETScSolver._calcRHSNorm(self)
 
     def _solve_(self, L, x, b):
-        ksp = PETSc.KSP()
-        ksp.create(L.comm)
-        ksp.setType(self.solver)
-        if self.preconditioner is not None:
-            ksp.getPC().setType(self.preconditioner)
+        built = []
+        def build():
+            ksp = PETSc.KSP()
+            ksp.create(L.comm)
+            ksp.setType(self.solver)
+            if self.preconditioner is not None:
+                ksp.getPC().setType(self.preconditioner)
+            elif self.matrixFree:
+                # the default preconditioners need the entries of the matrix
+                ksp.getPC().setType("none")
+            built.append(True)
+            return ksp
+        # the KSP holds the preconditioner, so it is kept as long as that is
+        ksp = self._laggedPreconditioner(build, key=L.getSize())
         ksp.setTolerances(rtol=self.tolerance, max_it=self.iterations)
         L.assemblyBegin()
         L.assemblyEnd()
         ksp.setOperators(L)
-        ksp.setFromOptions()
+        ksp.setReusePreconditioner(not built)
+        if built:
+            ksp.setFromOptions()
         ksp.solve(b, x)
 
+        self._countIterations(ksp.its)
+
         if 'FIPY_VERBOSE_SOLVER' in os.environ:
             from fipy.tools.debug import PRINT
 #             L.view()
@@ -74,3 +140,14 @@ class PETScKrylovSolver(PETScSolver):
             PRINT('iterations: %d / %d' % (ksp.its, self.iterations))
             PRINT('norm:', ksp.norm)
             PRINT('norm_type:', ksp.norm_type)
+
+class _MatrixFreeContext(object):
+    """Context of a PETSc shell matrix that applies a `_MatrixFreeMatrix`"""
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def mult(self, mat, x, y):
+        y.setArray(self.matrix.matvec(x.array_r))
+
+    def getDiagonal(self, mat, d):
+        d.setArray(self.matrix.takeDiagonal())
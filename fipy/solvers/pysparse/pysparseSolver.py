@@ -41,11 +41,20 @@ class PysparseSolver(_PysparseMatrixSolver):
         if self.preconditioner is None:
             P = None
         else:
-            P, A = self.preconditioner._applyToMatrix(A)
+            built = []
+            def build():
+                P, converted = self.preconditioner._applyToMatrix(A)
+                built.append(converted)
+                return P
+            P = self._laggedPreconditioner(build, key=A.shape)
+            if built:
+                # the preconditioner may have converted `A` for its own use
+                A, = built
 
         info, iter, relres = self.solveFnc(A, b, x, self.tolerance,
                                            self.iterations, P)
 
+        self._countIterations(iter)
         self._raiseWarning(info, iter, relres)
 
         if 'FIPY_VERBOSE_SOLVER' in os.environ:
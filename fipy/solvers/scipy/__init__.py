@@ -3,7 +3,9 @@ from fipy.solvers.scipy.linearCGSSolver import *
 from fipy.solvers.scipy.linearGMRESSolver import *
 from fipy.solvers.scipy.linearBicgstabSolver import *
 from fipy.solvers.scipy.linearLUSolver import *
+from fipy.solvers.scipy.linearBandedSolver import *
 from fipy.solvers.scipy.linearPCGSolver import *
+from fipy.solvers.scipy.preconditioners import *
 
 DefaultSolver = LinearLUSolver
 DummySolver = LinearGMRESSolver
@@ -21,4 +23,6 @@ __all__.extend(linearCGSSolver.__all__)
 __all__.extend(linearGMRESSolver.__all__)
 __all__.extend(linearBicgstabSolver.__all__)
 __all__.extend(linearLUSolver.__all__)
+__all__.extend(linearBandedSolver.__all__)
 __all__.extend(linearPCGSolver.__all__)
+__all__.extend(preconditioners.__all__)
@@ -0,0 +1,183 @@
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+from scipy.linalg.lapack import get_lapack_funcs
+
+from fipy.solvers.scipy.linearLUSolver import LinearLUSolver
+from fipy.tools import numerix
+
+__all__ = ["LinearBandedSolver"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class LinearBandedSolver(LinearLUSolver):
+    """
+    The `LinearBandedSolver` solves a linear system of equations whose
+    matrix is banded, as are those of the equations on `Grid1D`,
+    `CylindricalGrid1D` and `SphericalGrid1D` meshes, by LU-factorization
+    of the band with the LAPACK `gbtrf` and `gbtrs` routines.
+
+    The band is found from the matrix, without any fill-reducing ordering
+    or symbolic analysis. The matrix of a single equation on a 1D mesh is
+    tridiagonal
+
+        >>> from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm
+        >>> mesh = Grid1D(nx=10)
+        >>> var = CellVariable(mesh=mesh, hasOld=True)
+        >>> var.constrain(1., where=mesh.facesLeft)
+        >>> eq = TransientTerm() == DiffusionTerm()
+        >>> solver = LinearBandedSolver()
+        >>> eq.solve(var=var, dt=1., solver=solver)
+        >>> print(solver._LU.bandwidth)
+        (1, 1)
+
+    and the solution is that of the sparse LU-factorization
+
+        >>> from fipy.solvers.scipy import LinearLUSolver
+        >>> other = CellVariable(mesh=mesh, hasOld=True)
+        >>> other.constrain(1., where=mesh.facesLeft)
+        >>> eq.solve(var=other, dt=1., solver=LinearLUSolver())
+        >>> print(numerix.allclose(var, other))
+        True
+
+    As with `LinearLUSolver`, the factorization is reused while the
+    matrix is unchanged, and the members of an ensemble that share a
+    matrix are solved together, as the columns of the right-hand side of
+    one banded solve
+
+        >>> ensemble = CellVariable(mesh=mesh, elementshape=(3,))
+        >>> ensemble.constrain([[1.], [2.], [3.]], where=mesh.facesLeft)
+        >>> (TransientTerm() == DiffusionTerm()).solve(var=ensemble, dt=1., solver=solver)
+        >>> print(solver._LU.shape, solver._LU.blockShape, solver._LU.LU.bandwidth)
+        (30, 30) (10, 10) (1, 1)
+        >>> print(numerix.allclose(ensemble, [other, 2 * other, 3 * other]))
+        True
+
+    The unknowns of coupled equations of scalar variables are interleaved
+    cell by cell, so that two coupled equations on a 1D mesh have a band
+    of three diagonals on each side
+
+        >>> from fipy import ImplicitSourceTerm
+        >>> u = CellVariable(mesh=mesh, hasOld=True)
+        >>> v = CellVariable(mesh=mesh, hasOld=True)
+        >>> u.constrain(1., where=mesh.facesLeft)
+        >>> v.constrain(1., where=mesh.facesRight)
+        >>> eqU = TransientTerm(var=u) == DiffusionTerm(var=u) + ImplicitSourceTerm(0.1, var=v)
+        >>> eqV = TransientTerm(var=v) == DiffusionTerm(var=v) + ImplicitSourceTerm(0.1, var=u)
+        >>> (eqU & eqV).solve(dt=1., solver=solver)
+        >>> print(solver._LU.bandwidth)
+        (3, 3)
+        >>> banded = numerix.array((u.value, v.value))
+
+        >>> u.setValue(0.)
+        >>> v.setValue(0.)
+        >>> (eqU & eqV).solve(dt=1., solver=LinearLUSolver())
+        >>> print(numerix.allclose(banded, (u, v)))
+        True
+
+    A matrix whose band would hold many more entries than its nonzeros,
+    e.g., that of a 2D or periodic mesh, is factored by SciPy's sparse
+    LU-factorization instead
+
+        >>> from fipy import Grid2D, PeriodicGrid1D
+        >>> for mesh in (Grid2D(nx=10, ny=10), PeriodicGrid1D(nx=10)):
+        ...     var = CellVariable(mesh=mesh, value=mesh.x)
+        ...     DiffusionTerm().solve(var=var, solver=solver)
+        ...     print(isinstance(solver._LU, _BandedLU))
+        False
+        False
+    """
+
+    #: how many times the number of nonzeros the band can hold and still
+    #: be factored as a band
+    _maximumFill = 4
+
+    def _factor(self, matrix):
+        lower, upper = _bandwidth(matrix)
+        if (lower + upper + 1) * matrix.shape[0] > self._maximumFill * matrix.nnz:
+            return super(LinearBandedSolver, self)._factor(matrix)
+        else:
+            return _BandedLU(matrix, lower=lower, upper=upper)
+
+def _bandwidth(matrix):
+    """Numbers of diagonals below and above the main one that hold the
+    entries of a SciPy CSC `matrix`
+
+        >>> from scipy.sparse import csc_matrix
+        >>> print(_bandwidth(csc_matrix([[1., 2., 0.],
+        ...                              [0., 1., 0.],
+        ...                              [0., 3., 1.]])))
+        (1, 1)
+        >>> print(_bandwidth(csc_matrix([[1., 0., 2.],
+        ...                              [0., 1., 0.],
+        ...                              [0., 0., 1.]])))
+        (0, 2)
+    """
+    columns = numerix.repeat(numerix.arange(matrix.shape[1]), numerix.diff(matrix.indptr))
+    offsets = matrix.indices - columns
+    if len(offsets) == 0:
+        return 0, 0
+    return max(offsets.max(), 0), max(-offsets.min(), 0)
+
+class _BandedLU(object):
+    """LAPACK LU-factorization of a matrix with `lower` diagonals below
+    the main one and `upper` above it
+
+        >>> from scipy.sparse import csc_matrix
+        >>> A = numerix.array([[ 4., -1.,  0.,  0.],
+        ...                    [-1.,  4., -1.,  0.],
+        ...                    [ 0., -1.,  4., -1.],
+        ...                    [ 0.,  0., -1.,  4.]])
+        >>> LU = _BandedLU(csc_matrix(A), lower=1, upper=1)
+        >>> x = LU.solve(numerix.array([3., 2., 2., 3.]))
+        >>> print(numerix.allclose(x, 1.))
+        True
+
+    Several right-hand sides are solved at once, as columns
+
+        >>> b = numerix.array([[3., 6.], [2., 4.], [2., 4.], [3., 6.]])
+        >>> print(numerix.allclose(LU.solve(b), [[1., 2.]] * 4))
+        True
+
+    A singular matrix cannot be factored
+
+        >>> _BandedLU(csc_matrix(numerix.zeros((2, 2))), lower=1, upper=1)
+        Traceback (most recent call last):
+            ...
+        RuntimeError: Factor is exactly singular
+    """
+    def __init__(self, matrix, lower, upper):
+        self.shape = matrix.shape
+        self.bandwidth = (lower, upper)
+
+        entries = matrix.tocoo()
+        entries.sum_duplicates()
+
+        # LAPACK band storage, with room for the fill of the pivoting
+        band = numerix.zeros((2 * lower + upper + 1, self.shape[1]), 'd', order='F')
+        band[lower + upper + entries.row - entries.col, entries.col] = entries.data
+
+        gbtrf, self._gbtrs = get_lapack_funcs(('gbtrf', 'gbtrs'), (band,))
+        self._LU, self._pivots, info = gbtrf(band, lower, upper, overwrite_ab=True)
+        if info > 0:
+            raise RuntimeError("Factor is exactly singular")
+        elif info < 0:
+            raise RuntimeError("gbtrf returned error code %d" % info)
+
+    def solve(self, rhs):
+        rhs = numerix.asarray(rhs, dtype=float)
+        lower, upper = self.bandwidth
+        x, info = self._gbtrs(self._LU, lower, upper,
+                              rhs.reshape((self.shape[0], -1)), self._pivots)
+        if info != 0:
+            raise RuntimeError("gbtrs returned error code %d" % info)
+        return x.reshape(rhs.shape)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -15,7 +15,7 @@ class LinearGMRESSolver(_ScipyKrylovSolver):
     Scipy, with no preconditioning by default.
     """
 
-    def __init__(self, tolerance=1e-15, iterations=2000, precon=None):
+    def __init__(self, tolerance=1e-15, iterations=2000, precon=None, matrixFree=False):
         """
         Parameters
         ----------
@@ -25,7 +25,16 @@ class LinearGMRESSolver(_ScipyKrylovSolver):
             Maximum number of iterative steps to perform.
         precon
             Preconditioner to use.
+        matrixFree : bool
+            Apply the terms to vectors, rather than assemble their matrix.
         """
 
-        super(LinearGMRESSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon)
+        super(LinearGMRESSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon,
+                                                matrixFree=matrixFree)
         self.solveFnc = gmres
+
+    def _iterationCallback(self):
+        kwargs = super(LinearGMRESSolver, self)._iterationCallback()
+        # count each inner iteration, rather than each restart
+        kwargs['callback_type'] = 'pr_norm'
+        return kwargs
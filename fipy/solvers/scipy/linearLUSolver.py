@@ -1,14 +1,17 @@
 from __future__ import division
 from __future__ import unicode_literals
 from builtins import range
+from builtins import object
 __docformat__ = 'restructuredtext'
 
+import hashlib
 import os
 
 from scipy.sparse.linalg import splu
 
 from fipy.solvers.scipy.scipySolver import _ScipySolver
 from fipy.tools import numerix
+from fipy.tools import instrumentation
 
 __all__ = ["LinearLUSolver"]
 from future.utils import text_to_native_str
@@ -19,8 +22,162 @@ class LinearLUSolver(_ScipySolver):
     The `LinearLUSolver` solves a linear system of equations using
     LU-factorization.  The `LinearLUSolver` is a wrapper class for the
     the Scipy `scipy.sparse.linalg.splu` module.
+
+    The factorization is kept and reused for as long as the matrix does
+    not change, as for a linear equation with constant coefficients and
+    a fixed time step
+
+        >>> from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm
+        >>> mesh = Grid1D(nx=10)
+        >>> var = CellVariable(mesh=mesh, hasOld=True)
+        >>> var.constrain(1., where=mesh.facesLeft)
+        >>> eq = TransientTerm() == DiffusionTerm()
+        >>> solver = LinearLUSolver()
+        >>> eq.solve(var=var, dt=1., solver=solver)
+        >>> LU = solver._LU
+        >>> var.updateOld()
+        >>> eq.solve(var=var, dt=1., solver=solver)
+        >>> print(solver._LU is LU)
+        True
+        >>> var.updateOld()
+        >>> eq.solve(var=var, dt=2., solver=solver)
+        >>> print(solver._LU is LU)
+        False
+
+    With `reuse=True`, a factorization that the matrix has drifted too far
+    from for the refinement to converge is replaced
+
+        >>> stale = LinearLUSolver(reuse=True, tolerance=1e-12)
+        >>> var.updateOld()
+        >>> eq.solve(var=var, dt=1e-3, solver=stale)
+        >>> LU = stale._LU
+        >>> var.updateOld()
+        >>> fresh = var.copy()
+        >>> eq.solve(var=fresh, dt=1e3, solver=LinearLUSolver())
+        >>> eq.solve(var=var, dt=1e3, solver=stale)
+        >>> print(stale._LU is LU)
+        False
+        >>> print(numerix.allclose(var, fresh))
+        True
+
+    When the components of a vector `CellVariable` are uncoupled, e.g.,
+    the members of an ensemble that differ only in their initial or
+    boundary values, and share the same matrix, only one block is
+    factored and all members are solved together
+
+        >>> ensemble = CellVariable(mesh=mesh, elementshape=(3,))
+        >>> ensemble.constrain([[1.], [2.], [3.]], where=mesh.facesLeft)
+        >>> (TransientTerm() == DiffusionTerm()).solve(var=ensemble, dt=1., solver=solver)
+        >>> print(solver._LU.shape, solver._LU.blockShape)
+        (30, 30) (10, 10)
+
+        >>> single = CellVariable(mesh=mesh)
+        >>> single.constrain(1., where=mesh.facesLeft)
+        >>> (TransientTerm() == DiffusionTerm()).solve(var=single, dt=1.)
+        >>> print(numerix.allclose(ensemble, [single, 2 * single, 3 * single]))
+        True
     """
 
+    def __init__(self, tolerance=1e-10, iterations=1000, precon=None, reuse=None):
+        """
+        Parameters
+        ----------
+        tolerance : float
+            Required error tolerance.
+        iterations : int
+            Maximum number of iterative steps to perform.
+        precon
+            *ignored*
+        reuse : bool
+            If `True`, keep the first factorization without checking
+            whether the matrix has changed; the iterative refinement
+            then corrects for a matrix that has drifted from it. If
+            `False`, factor the matrix at every solve. By default, the
+            factorization is reused while the matrix is unchanged.
+        """
+        super(LinearLUSolver, self).__init__(tolerance=tolerance,
+                                             iterations=iterations,
+                                             precon=precon)
+        self.reuse = reuse
+        self._LU = None
+        self._factoredDigest = None
+
+    def _isFactored(self, matrix, digest):
+        """Whether `matrix`, whose `_digest` is `digest` if the matrix
+        is checked for changes, is the one last factored"""
+        if self._LU is None:
+            return False
+        elif self.reuse:
+            return self._LU.shape == matrix.shape
+        elif self.reuse is None:
+            return self._factoredDigest == digest
+        else:
+            return False
+
+    def _factorMatrix(self, L, matrix):
+        block = self._sharedBlock(L.matrix)
+        if block is None:
+            return self._factor(matrix)
+        else:
+            return _BlockLU(self._factor(block), shape=matrix.shape)
+
+    def _factor(self, matrix):
+        return splu(matrix, diag_pivot_thresh=1.,
+                            relax=1,
+                            panel_size=10,
+                            permc_spec=3)
+
+    def _sharedBlock(self, matrix):
+        """The diagonal block repeated by a block diagonal `matrix`
+
+        Returns `None` unless `matrix` couples each component of the
+        vector solution variable only to itself, with the same
+        coefficients for every component. The indices of `matrix` are
+        sorted in a copy, if they need to be
+
+            >>> from scipy.sparse import csr_matrix
+            >>> solver = LinearLUSolver()
+            >>> solver.var = numerix.zeros((2, 2))
+            >>> matrix = csr_matrix((numerix.array([1., 2., 3., 1., 2., 3.]),
+            ...                      numerix.array([1, 0, 1, 3, 2, 3]),
+            ...                      numerix.array([0, 2, 3, 5, 6])), shape=(4, 4))
+            >>> print(solver._sharedBlock(matrix).toarray())
+            [[ 2.  1.]
+             [ 0.  3.]]
+            >>> print(matrix.indices)
+            [1 0 1 3 2 3]
+        """
+        shape = numerix.shape(self.var)
+        if len(shape) != 2 or shape[0] < 2:
+            return None
+        components, n = shape
+
+        matrix = matrix.tocsr()
+        if matrix.shape != (components * n, components * n):
+            return None
+        if not matrix.has_sorted_indices:
+            matrix = matrix.sorted_indices()
+
+        counts = numerix.diff(matrix.indptr)
+        rows = numerix.repeat(numerix.arange(components * n), counts)
+        if not numerix.array_equal(matrix.indices // n, rows // n):
+            return None
+
+        counts = counts.reshape((components, n))
+        if not (counts == counts[0]).all():
+            return None
+
+        nnz = counts[0].sum()
+        indices = (matrix.indices.reshape((components, nnz))
+                   - n * numerix.arange(components)[..., numerix.newaxis])
+        data = matrix.data.reshape((components, nnz))
+        if not ((indices == indices[0]).all() and (data == data[0]).all()):
+            return None
+
+        from scipy.sparse import csr_matrix
+        return csr_matrix((data[0], indices[0], matrix.indptr[:n + 1]),
+                          shape=(n, n)).tocsc()
+
     def _solve_(self, L, x, b):
         diag = L.takeDiagonal()
         maxdiag = max(numerix.absolute(diag))
@@ -28,25 +185,94 @@ class LinearLUSolver(_ScipySolver):
         L = L * (1 / maxdiag)
         b = b * (1 / maxdiag)
 
-        LU = splu(L.matrix.asformat("csc"), diag_pivot_thresh=1.,
-                                            relax=1,
-                                            panel_size=10,
-                                            permc_spec=3)
+        matrix = L.matrix.asformat("csc")
+        digest = None
+        if self.reuse is None:
+            digest = _digest(matrix)
 
-        error0 = numerix.sqrt(numerix.sum((L * x - b)**2))
+        refactored = not self._isFactored(matrix, digest)
+        if refactored:
+            self._LU = instrumentation._setup(self, lambda: self._factorMatrix(L, matrix))
+            self._factoredDigest = digest
 
-        for iteration in range(min(self.iterations, 10)):
-            errorVector = L * x - b
+        iterations, residual = self._refine(L, x, b)
 
-            if (numerix.sqrt(numerix.sum(errorVector**2)) / error0)  <= self.tolerance:
-                break
+        if residual > self.tolerance and not refactored:
+            # the factorization that was kept is too far from the matrix
+            # for the refinement to make up for it
+            self._LU = instrumentation._setup(self, lambda: self._factorMatrix(L, matrix))
+            self._factoredDigest = digest
+            moreIterations, residual = self._refine(L, x, b)
+            iterations += moreIterations
 
-            xError = LU.solve(errorVector)
-            x[:] = x - xError
+        self._countIterations(iterations)
+
+        if residual > self.tolerance:
+            self._raiseWarning(-1, iterations, residual)
 
         if 'FIPY_VERBOSE_SOLVER' in os.environ:
             from fipy.tools.debug import PRINT
-            PRINT('iterations: %d / %d' % (iteration+1, self.iterations))
-            PRINT('residual:', numerix.sqrt(numerix.sum(errorVector**2)))
+            PRINT('iterations: %d / %d' % (iterations, self.iterations))
+            PRINT('residual:', residual)
 
         return x
+
+    def _refine(self, L, x, b):
+        """Correct `x` with the factorization until the residual, relative
+        to that of the initial `x`, is within the tolerance, for at most
+        10 iterations
+
+        Returns the number of iterations and the relative residual.
+        """
+        error0 = numerix.sqrt(numerix.sum((L * x - b)**2))
+        if error0 == 0:
+            return 0, 0.
+
+        for iteration in range(min(self.iterations, 10)):
+            xError = self._LU.solve(L * x - b)
+            x[:] = x - xError
+
+            residual = numerix.sqrt(numerix.sum((L * x - b)**2)) / error0
+            if residual <= self.tolerance:
+                break
+
+        return iteration + 1, residual
+
+def _digest(matrix):
+    """Digest of the structure and the values of a SciPy sparse `matrix`,
+    to tell whether it has changed without keeping a copy of it
+
+        >>> from scipy.sparse import csc_matrix
+        >>> A = csc_matrix([[1., 2.], [0., 3.]])
+        >>> print(_digest(A) == _digest(A.copy()))
+        True
+        >>> print(_digest(A) == _digest(2 * A))
+        False
+        >>> print(_digest(A) == _digest(csc_matrix([[1., 0.], [2., 3.]])))
+        False
+    """
+    digest = hashlib.sha1()
+    for array in (matrix.indptr, matrix.indices, matrix.data):
+        digest.update(numerix.ascontiguousarray(array))
+    return (matrix.shape, matrix.nnz, digest.hexdigest())
+
+class _BlockLU(object):
+    """Factorization of a block diagonal matrix whose blocks are all `LU`"""
+    def __init__(self, LU, shape):
+        self.LU = LU
+        self.shape = shape
+
+    @property
+    def blockShape(self):
+        return self.LU.shape
+
+    def solve(self, rhs):
+        n = self.LU.shape[0]
+        return self.LU.solve(rhs.reshape((-1, n)).T).T.ravel()
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,7 @@
+from __future__ import unicode_literals
+from fipy.solvers.scipy.preconditioners.jacobiPreconditioner import *
+from fipy.solvers.scipy.preconditioners.blockJacobiPreconditioner import *
+
+__all__ = []
+__all__.extend(jacobiPreconditioner.__all__)
+__all__.extend(blockJacobiPreconditioner.__all__)
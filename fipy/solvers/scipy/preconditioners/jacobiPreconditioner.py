@@ -0,0 +1,23 @@
+from __future__ import unicode_literals
+from scipy.sparse import diags
+
+from fipy.solvers.scipy.preconditioners.preconditioner import Preconditioner
+from fipy.tools import numerix
+
+__all__ = ["JacobiPreconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class JacobiPreconditioner(Preconditioner):
+    """
+    Jacobi preconditioner for SciPy.
+
+    Needs only the diagonal of the matrix, so it can also be used by
+    solvers with `matrixFree=True`.
+    """
+    def _applyToMatrix(self, A):
+        """
+        Returns the inverse of the diagonal of `A`, leaving out any zeros
+        """
+        diagonal = numerix.asarray(A.diagonal(), dtype=float)
+        return diags(1. / numerix.where(diagonal == 0, 1., diagonal))
@@ -0,0 +1,26 @@
+from __future__ import unicode_literals
+from builtins import object
+__all__ = ["Preconditioner"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+class Preconditioner(object):
+    """
+    Base preconditioner class
+
+    .. attention:: This class is abstract. Always create one of its subclasses.
+    """
+
+    def __init__(self):
+        """
+        Create a `Preconditioner` object.
+        """
+        if self.__class__ is Preconditioner:
+            raise NotImplementedError("can't instantiate abstract base class")
+
+    def _applyToMatrix(self, A):
+        """
+        Returns the preconditioner for the SciPy matrix, or
+        `LinearOperator`, `A`, as anything that SciPy's solvers accept.
+        """
+        raise NotImplementedError
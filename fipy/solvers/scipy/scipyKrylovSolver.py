@@ -5,6 +5,9 @@ __all__ = []
 
 import os
 
+from scipy.sparse.linalg import LinearOperator, aslinearoperator
+
+from fipy.matrices.matrixFreeMatrix import _MatrixFreeMeshMatrix
 from fipy.solvers.scipy.scipySolver import _ScipySolver
 
 class _ScipyKrylovSolver(_ScipySolver):
@@ -12,23 +15,150 @@ class _ScipyKrylovSolver(_ScipySolver):
     The base `ScipyKrylovSolver` class.
 
     .. attention:: This class is abstract. Always create one of its subclasses.
+
+    The preconditioner can be kept across sweeps and time steps
+
+        >>> from scipy.sparse import diags
+        >>> class JacobiPreconditioner(object):
+        ...     builds = 0
+        ...     def _applyToMatrix(self, A):
+        ...         self.builds += 1
+        ...         return diags(1. / A.diagonal())
+
+        >>> from fipy import Grid1D, CellVariable, TransientTerm, DiffusionTerm
+        >>> from fipy.solvers.solver import PreconditionerLifetime
+        >>> from fipy.solvers.scipy.linearPCGSolver import LinearPCGSolver
+        >>> mesh = Grid1D(nx=20)
+        >>> var = CellVariable(mesh=mesh, hasOld=True)
+        >>> var.constrain(1., where=mesh.facesLeft)
+        >>> eq = TransientTerm() == DiffusionTerm(coeff=1. + var)
+        >>> solver = LinearPCGSolver(precon=JacobiPreconditioner(), tolerance=1e-10)
+        >>> solver.preconditionerLifetime = PreconditionerLifetime(every=3)
+        >>> for step in range(5):
+        ...     var.updateOld()
+        ...     eq.solve(var=var, dt=1., solver=solver)
+        >>> print(solver.preconditioner.builds)
+        2
+
+    The solution is that of a preconditioner rebuilt for every solve
+
+        >>> var2 = CellVariable(mesh=mesh, hasOld=True)
+        >>> var2.constrain(1., where=mesh.facesLeft)
+        >>> eq2 = TransientTerm() == DiffusionTerm(coeff=1. + var2)
+        >>> solver2 = LinearPCGSolver(precon=JacobiPreconditioner(), tolerance=1e-10)
+        >>> for step in range(5):
+        ...     var2.updateOld()
+        ...     eq2.solve(var=var2, dt=1., solver=solver2)
+        >>> print(solver2.preconditioner.builds)
+        5
+        >>> print(var.allclose(var2, atol=1e-8))
+        True
+
+    With `matrixFree=True`, the terms are not assembled into a matrix, but
+    applied to each vector, with a pass over the faces of a uniform grid,
+    and a `JacobiPreconditioner` takes the diagonal from them
+
+        >>> from fipy import Grid3D
+        >>> from fipy.solvers.scipy.preconditioners import JacobiPreconditioner
+        >>> mesh = Grid3D(nx=8, ny=6, nz=4)
+        >>> def solve(solver):
+        ...     var = CellVariable(mesh=mesh)
+        ...     var.constrain(1., where=mesh.facesLeft)
+        ...     var.constrain(0., where=mesh.facesRight)
+        ...     eq = TransientTerm() == DiffusionTerm(coeff=1. + mesh.faceCenters[2])
+        ...     eq.solve(var=var, dt=1., solver=solver)
+        ...     return var
+        >>> assembled = solve(LinearPCGSolver(precon=JacobiPreconditioner(), tolerance=1e-12))
+        >>> matrixFree = solve(LinearPCGSolver(precon=JacobiPreconditioner(), tolerance=1e-12,
+        ...                                    matrixFree=True))
+        >>> print(matrixFree.allclose(assembled, atol=1e-10))
+        True
     """
 
+    def __init__(self, tolerance=1e-15, iterations=2000, precon=None, matrixFree=False):
+        """
+        Parameters
+        ----------
+        tolerance : float
+            Required error tolerance.
+        iterations : int
+            Maximum number of iterative steps to perform.
+        precon
+            Preconditioner to use.
+        matrixFree : bool
+            Apply the terms to vectors, rather than assemble their matrix.
+            Only preconditioners that need no more than the diagonal, like
+            `JacobiPreconditioner`, can be used.
+        """
+        super(_ScipyKrylovSolver, self).__init__(tolerance=tolerance, iterations=iterations, precon=precon)
+        self.matrixFree = matrixFree
+
+    @property
+    def _matrixClass(self):
+        if self.matrixFree:
+            return _MatrixFreeMeshMatrix
+        else:
+            return super(_ScipyKrylovSolver, self)._matrixClass
+
+    def _iterationCallback(self):
+        """Keyword arguments of `solveFnc` that count its iterations"""
+        def callback(*args):
+            self._iterationCount += 1
+        return dict(callback=callback)
+
+    def _countingPreconditioner(self, M):
+        """Wrap `M` to count its applications, one per iteration"""
+        M = aslinearoperator(M)
+
+        def matvec(x):
+            self._applications += 1
+            return M.matvec(x)
+
+        return LinearOperator(M.shape, matvec=matvec, dtype=M.dtype)
+
     def _solve_(self, L, x, b):
-        A = L.matrix
+        if self.matrixFree:
+            A = L.asLinearOperator()
+        else:
+            A = L.matrix
         if self.preconditioner is None:
             M = None
         else:
-            M = self.preconditioner._applyToMatrix(A)
+            M = self._laggedPreconditioner(lambda: self.preconditioner._applyToMatrix(A),
+                                           key=A.shape)
+
+        counting = (M is not None
+                    and self.preconditionerLifetime.iterationGrowth is not None)
+        if counting:
+            self._applications = 0
+            M = self._countingPreconditioner(M)
+
+        kwargs = {}
+        if getattr(self, '_instrumentedSolve', None) is not None:
+            self._iterationCount = 0
+            kwargs = self._iterationCallback()
 
         x, info = self.solveFnc(A, b, x,
                                 tol=self.tolerance,
                                 maxiter=self.iterations,
                                 M=M,
-                                atol='legacy')
+                                atol='legacy',
+                                **kwargs)
+
+        if counting:
+            self._countIterations(self._applications)
+        elif len(kwargs) > 0:
+            self._countIterations(self._iterationCount)
 
         if 'FIPY_VERBOSE_SOLVER' in os.environ:
             if info < 0:
                 PRINT('failure', self._warningList[info].__class__.__name__)
 
         return x
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
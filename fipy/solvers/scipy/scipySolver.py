@@ -23,4 +23,12 @@ class _ScipySolver(Solver):
          if self.var.mesh.communicator.Nproc > 1:
              raise Exception("SciPy solvers cannot be used with multiple processors")
 
-         self.var[:] = numerix.reshape(self._solve_(self.matrix, self.var.ravel(), numerix.array(self.RHSvector)), self.var.shape)
+         L, order = self.matrix._inSolverOrder()
+         x = self.var.ravel()
+         b = numerix.array(self.RHSvector)
+         if order is None:
+             x = self._solve_(L, x, b)
+         else:
+             x = self._solve_(L, x[order], b[order])[numerix.argsort(order)]
+
+         self.var[:] = numerix.reshape(x, self.var.shape)
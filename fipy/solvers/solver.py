@@ -18,11 +18,13 @@ from builtins import str
 __docformat__ = 'restructuredtext'
 
 from fipy.tools import numerix
+from fipy.tools import instrumentation
 
 __all__ = ["SolverConvergenceWarning", "MaximumIterationWarning",
            "PreconditionerWarning", "IllConditionedPreconditionerWarning",
            "PreconditionerNotPositiveDefiniteWarning", "MatrixIllConditionedWarning",
-           "StagnatedSolverWarning", "ScalarQuantityOutOfRangeWarning", "Solver"]
+           "StagnatedSolverWarning", "ScalarQuantityOutOfRangeWarning",
+           "PreconditionerLifetime", "Solver"]
 from future.utils import text_to_native_str
 __all__ = [text_to_native_str(n) for n in __all__]
 
@@ -62,6 +64,59 @@ class ScalarQuantityOutOfRangeWarning(SolverConvergenceWarning):
     def __str__(self):
         return "A scalar quantity became too small or too large to continue computing. Iterations: %g. Relative error: %g" % (self.iter, self.relres)
 
+class PreconditionerLifetime(object):
+    """
+    How long a `Solver` keeps a preconditioner it has built.
+
+    Building a preconditioner, particularly an incomplete factorization
+    or a multigrid hierarchy, can cost more than the iterations it saves
+    when the coefficients change slowly between sweeps and time steps. A
+    preconditioner built for an earlier matrix is still a valid, if less
+    effective, preconditioner for the current one. It is never reused
+    for a system of a different size.
+
+    Assign to the `preconditionerLifetime` of a `Solver`, *e.g.*::
+
+        solver.preconditionerLifetime = PreconditionerLifetime(every=10,
+                                                               iterationGrowth=0.5)
+    """
+
+    def __init__(self, every=1, iterationGrowth=None):
+        """
+        Parameters
+        ----------
+        every : int
+            Number of solves to use each preconditioner for. The
+            default of 1 rebuilds it for every solve.
+        iterationGrowth : float, optional
+            Rebuild sooner, once a solve takes this fraction more
+            iterations than the first solve with the preconditioner.
+        """
+        self.every = every
+        self.iterationGrowth = iterationGrowth
+
+    def _expired(self, lagged):
+        if lagged.uses >= self.every:
+            return True
+        elif (self.iterationGrowth is not None
+              and lagged.iterations is not None):
+            return lagged.iterations > max(lagged.baseline, 1) * (1 + self.iterationGrowth)
+        else:
+            return False
+
+    def __repr__(self):
+        return '%s(every=%g, iterationGrowth=%r)' \
+            % (self.__class__.__name__, self.every, self.iterationGrowth)
+
+class _LaggedPreconditioner(object):
+    """A preconditioner kept by a `Solver`, with its record of use"""
+    def __init__(self, preconditioner, key):
+        self.preconditioner = preconditioner
+        self.key = key
+        self.uses = 0
+        self.baseline = None
+        self.iterations = None
+
 class Solver(object):
     """
     The base `LinearXSolver` class.
@@ -90,6 +145,8 @@ class Solver(object):
         self.iterations = iterations
 
         self.preconditioner = precon
+        self.preconditionerLifetime = PreconditionerLifetime()
+        self._lagged = None
 
     def _storeMatrix(self, var, matrix, RHSvector):
         self.var = var
@@ -99,6 +156,35 @@ class Solver(object):
     def _solve(self):
         raise NotImplementedError
 
+    def _laggedPreconditioner(self, build, key):
+        """Return the preconditioner last returned by `build()`, or a new
+        one, as `preconditionerLifetime` dictates
+
+        Parameters
+        ----------
+        build : function
+            Builds a preconditioner for the current matrix.
+        key
+            Identifies the size of the system.
+        """
+        lagged = self._lagged
+        if (lagged is None
+            or lagged.key != key
+            or self.preconditionerLifetime._expired(lagged)):
+            # release the old preconditioner before building its replacement
+            self._lagged = None
+            lagged = self._lagged = _LaggedPreconditioner(instrumentation._setup(self, build), key)
+        lagged.uses += 1
+        return lagged.preconditioner
+
+    def _countIterations(self, iterations):
+        """Record the iterations taken with the lagged preconditioner"""
+        instrumentation._iterations(self, iterations)
+        if self._lagged is not None:
+            if self._lagged.baseline is None:
+                self._lagged.baseline = iterations
+            self._lagged.iterations = iterations
+
     def _solve_(self, L, x, b):
         raise NotImplementedError
 
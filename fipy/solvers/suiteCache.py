@@ -0,0 +1,119 @@
+"""Remember which suite of solvers could be imported
+
+Probing for each suite of solvers in turn means attempting, and often
+failing, to import large packages, which is slow on networked file
+systems. If :envvar:`FIPY_SOLVER_CACHE` names a directory, the suite found
+by an unconstrained search is recorded there, per Python environment, and
+is tried first the next time. Nothing is written otherwise. The environment is identified by the interpreter and by the
+entries of `sys.path` and their modification times, so installing or
+removing a package starts a new search.
+"""
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+import hashlib
+import os
+import sys
+
+__all__ = []
+
+def _cacheDirectory():
+    """Directory of the cache, or `None` if caching is not switched on
+
+        >>> saved = os.environ.pop('FIPY_SOLVER_CACHE', None)
+        >>> print(_cacheDirectory())
+        None
+        >>> os.environ['FIPY_SOLVER_CACHE'] = ''
+        >>> print(_cacheDirectory())
+        None
+        >>> os.environ['FIPY_SOLVER_CACHE'] = os.path.join('some', 'where')
+        >>> print(_cacheDirectory() == os.path.join('some', 'where'))
+        True
+        >>> _restoreEnvironment(saved)
+    """
+    return os.environ.get('FIPY_SOLVER_CACHE') or None
+
+def _restoreEnvironment(saved):
+    """Put back the value of :envvar:`FIPY_SOLVER_CACHE` that a test replaced"""
+    if saved is None:
+        os.environ.pop('FIPY_SOLVER_CACHE', None)
+    else:
+        os.environ['FIPY_SOLVER_CACHE'] = saved
+
+def _environmentKey(parallel):
+    """Digest of everything that decides which suites can be imported"""
+    description = [sys.executable, sys.version, repr(parallel), __file__]
+    # the first entry is the directory of the script, which varies
+    for path in sys.path[1:]:
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            mtime = None
+        description.append("%s:%r" % (path, mtime))
+    return hashlib.sha1("\n".join(description).encode('utf-8')).hexdigest()
+
+def _cacheFile(parallel):
+    directory = _cacheDirectory()
+    if directory is None:
+        return None
+    return os.path.join(directory, "solvers-%s" % _environmentKey(parallel))
+
+def _readCachedSuite(parallel):
+    """The suite of solvers found last time, if any
+
+        >>> import tempfile, shutil
+        >>> saved = os.environ.get('FIPY_SOLVER_CACHE')
+        >>> os.environ['FIPY_SOLVER_CACHE'] = tempfile.mkdtemp()
+        >>> print(_readCachedSuite(parallel=False))
+        None
+        >>> _writeCachedSuite("scipy", parallel=False)
+        >>> print(_readCachedSuite(parallel=False))
+        scipy
+        >>> print(_readCachedSuite(parallel=True))
+        None
+
+    A cache that cannot be written is ignored
+
+        >>> blocked = os.path.join(os.environ['FIPY_SOLVER_CACHE'], 'file')
+        >>> open(blocked, 'w').close()
+        >>> os.environ['FIPY_SOLVER_CACHE'] = os.path.join(blocked, 'cache')
+        >>> _writeCachedSuite("scipy", parallel=False)
+        >>> print(_readCachedSuite(parallel=False))
+        None
+        >>> shutil.rmtree(os.path.dirname(blocked))
+        >>> _restoreEnvironment(saved)
+    """
+    filename = _cacheFile(parallel)
+    if filename is None:
+        return None
+    try:
+        with open(filename, 'r') as f:
+            suite = f.read().strip()
+    except (IOError, OSError):
+        return None
+    return suite or None
+
+def _writeCachedSuite(suite, parallel):
+    """Record `suite`, without complaint if the cache cannot be written"""
+    filename = _cacheFile(parallel)
+    if filename is None:
+        return
+    try:
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # write privately, then rename, so that concurrent processes
+        # never read a partial file
+        tmp = "%s.%d" % (filename, os.getpid())
+        with open(tmp, 'w') as f:
+            f.write(suite)
+        os.rename(tmp, filename)
+    except (IOError, OSError):
+        pass
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -1,12 +1,25 @@
 from __future__ import unicode_literals
 __all__ = []
 
-from fipy.tests.lateImportTest import _LateImportTestSuite
+from fipy.tests.doctestPlus import _LateImportDocTestSuite
 import fipy.tests.testProgram
 
 def _suite():
-    return _LateImportTestSuite(testModuleNames = (),
-                                base = __name__)
+    theSuite = _LateImportDocTestSuite(testModuleNames = (),
+                                   docTestModuleNames = (
+                                       'suiteCache',
+                                       'scipy.linearLUSolver',
+                                       'scipy.linearBandedSolver',
+                                       'scipy.scipyKrylovSolver',
+                                       'scipy.preconditioners.blockJacobiPreconditioner',
+                                   ),
+                                   base = __name__)
+    # the package itself
+    theSuite.addTest(_LateImportDocTestSuite(docTestModuleNames = (
+        'solvers',
+        ), base = 'fipy.solvers'))
+
+    return theSuite
 
 if __name__ == '__main__':
     fipy.tests.testProgram.main(defaultTest='_suite')
@@ -47,7 +47,19 @@ class TrilinosAztecOOSolver(TrilinosSolver):
         Solver.SetAztecOption(AztecOO.AZ_output, AztecOO.AZ_none)
 
         if self.preconditioner is not None:
-            self.preconditioner._applyToSolver(solver=Solver, matrix=L)
+            built = []
+            def build():
+                self.preconditioner._applyToSolver(solver=Solver, matrix=L)
+                built.append(True)
+                # keep the matrix alive for as long as the preconditioner built from it
+                return (getattr(self.preconditioner, 'Prec', None), L)
+            Prec, matrix = self._laggedPreconditioner(build, key=L.NumGlobalRows())
+            if not built:
+                if Prec is not None:
+                    Solver.SetPrecOperator(Prec)
+                else:
+                    # preconditioners that AztecOO builds itself are only options
+                    self.preconditioner._applyToSolver(solver=Solver, matrix=L)
         else:
             Solver.SetAztecOption(AztecOO.AZ_precond, AztecOO.AZ_none)
 
@@ -57,9 +69,10 @@ class TrilinosAztecOOSolver(TrilinosSolver):
             if hasattr(self.preconditioner, 'Prec'):
                 del self.preconditioner.Prec
 
-        if 'FIPY_VERBOSE_SOLVER' in os.environ:
-            status = Solver.GetAztecStatus()
+        status = Solver.GetAztecStatus()
+        self._countIterations(status[AztecOO.AZ_its])
 
+        if 'FIPY_VERBOSE_SOLVER' in os.environ:
             from fipy.tools.debug import PRINT
             PRINT('iterations: %d / %d' % (status[AztecOO.AZ_its], self.iterations))
             failure = {AztecOO.AZ_normal : 'AztecOO.AZ_normal',
@@ -4,11 +4,70 @@ __docformat__ = 'restructuredtext'
 __all__ = []
 
 import os
+import threading
 
 from fipy.terms.term import Term
 from fipy.terms.explicitSourceTerm import _ExplicitSourceTerm
 from fipy.terms import ExplicitVariableError
 
+# pools of threads that build terms, by number of threads
+_pools = {}
+
+# whether the current thread belongs to one of the pools
+_local = threading.local()
+
+def _assemblyPool():
+    """The pool of threads to build terms with, if
+    :envvar:`FIPY_ASSEMBLY_THREADS` asks for more than one, and this thread
+    is not already one of them"""
+    threads = int(os.environ.get('FIPY_ASSEMBLY_THREADS', 1) or 1)
+    if threads < 2 or getattr(_local, 'building', False):
+        return None
+    if threads not in _pools:
+        from concurrent.futures import ThreadPoolExecutor
+        _pools[threads] = ThreadPoolExecutor(max_workers=threads)
+    return _pools[threads]
+
+def _buildConcurrently(pool, build, tasks):
+    """Results of `build(*task)` for each of `tasks`, in order, built by
+    the threads of `pool`
+
+    A `Variable` that the tasks share is evaluated by one of them, and
+    the others use its value
+
+        >>> from concurrent.futures import ThreadPoolExecutor
+        >>> from fipy import Grid1D, CellVariable
+        >>> from fipy.tools import numerix
+        >>> from fipy.variables.variable import Variable
+        >>> calculations = []
+        >>> class _CountedVariable(CellVariable):
+        ...     def _calcValue(self):
+        ...         calculations.append(1)
+        ...         return numerix.sin(self.mesh.x)
+        >>> shared = _CountedVariable(mesh=Grid1D(nx=1000))
+        >>> shared._markStale()
+        >>> pool = ThreadPoolExecutor(max_workers=4)
+        >>> sums = _buildConcurrently(pool, lambda i: float((shared * i).sum()),
+        ...                           [(i,) for i in range(16)])
+        >>> print(len(calculations), numerix.allclose(sums, numerix.arange(16) * sums[1]))
+        1 True
+        >>> print(Variable._concurrency)
+        0
+        >>> pool.shutdown()
+    """
+    def work(task):
+        # terms built within a task are built in its thread
+        _local.building = True
+        try:
+            return build(*task)
+        finally:
+            _local.building = False
+
+    from fipy.variables.variable import Variable
+
+    with Variable._concurrentEvaluation():
+        return list(pool.map(work, tasks))
+
 class _AbstractBinaryTerm(Term):
     def __init__(self, term, other):
 
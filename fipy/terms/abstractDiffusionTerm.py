@@ -124,12 +124,7 @@ class _AbstractDiffusionTerm(_UnaryTerm):
 
             coeff = self.nthCoeff
 
-            shape = numerix.getShape(coeff)
-
-            if isinstance(coeff, FaceVariable):
-                rank = coeff.rank
-            else:
-                rank = len(shape)
+            rank = self._nthCoeffRank()
 
             if var.rank == 0:
                 anisotropicRank = rank
@@ -138,7 +133,12 @@ class _AbstractDiffusionTerm(_UnaryTerm):
             else:
                 raise IndexError('the solution variable has the wrong rank')
 
-            if anisotropicRank == 0 and self._treatMeshAsOrthogonal(mesh):
+            if self._isComponentwise(var):
+                if rank == 1 and numerix.getShape(coeff)[0] != var.shape[0]:
+                    raise IndexError('diffusion coefficient (N,) shape must match the solution variable (N,) shape')
+
+            if ((anisotropicRank == 0 and self._treatMeshAsOrthogonal(mesh))
+                or self._isComponentwise(var)):
 
                 if coeff.shape != () and not isinstance(coeff, FaceVariable):
                     coeff = coeff[..., numerix.newaxis]
@@ -167,6 +167,24 @@ class _AbstractDiffusionTerm(_UnaryTerm):
 
             return None
 
+    def _nthCoeffRank(self):
+        if isinstance(self.nthCoeff, FaceVariable):
+            return self.nthCoeff.rank
+        else:
+            return len(numerix.getShape(self.nthCoeff))
+
+    def _isComponentwise(self, var):
+        """Whether each component of a vector `var` is only coupled to itself
+
+        A rank-0 or rank-1 coefficient of a vector solution variable
+        applies to each component, e.g., to each member of an ensemble,
+        independently. Only the isotropic flux normal to each face is
+        then assembled.
+        """
+        return (var.rank == 1
+                and self.nthCoeff is not None
+                and self._nthCoeffRank() < 2)
+
     def _getCoefficientMatrixForTests(self, SparseMatrix, var, coeff):
         """
         This method was introduced because `__getCoefficientMatrix` is private, but
@@ -177,24 +195,24 @@ class _AbstractDiffusionTerm(_UnaryTerm):
     def __getCoefficientMatrix(self, SparseMatrix, var, coeff):
         mesh = var.mesh
 
-        id1, id2 = mesh._adjacentCellIDs
-        interiorFaces = numerix.nonzero(mesh.interiorFaces)[0]
-
-        id1 = numerix.take(id1, interiorFaces)
-        id2 = numerix.take(id2, interiorFaces)
+        coefficientMatrix = SparseMatrix(mesh=mesh, bandwidth = mesh._maxFacesPerCell + 1)
 
-        id1 = self._reshapeIDs(var, id1)
-        id2 = self._reshapeIDs(var, id2)
+        stencil = self._getStencilPattern(var)
+        if stencil is not None and numerix.size(coeff) == mesh.numberOfFaces:
+            coeff = numerix.asarray(coeff).reshape((-1,))
+            coefficientMatrix.addAtStencil(stencil, coeff, -coeff, -coeff, coeff)
+            return coefficientMatrix
 
-##         print 'id1',id1
-##         print 'id2',id2
+        componentwise = self._isComponentwise(var)
+        interiorFaces, pattern = self._getInteriorFacePattern(var, componentwise=componentwise)
 
-        coefficientMatrix = SparseMatrix(mesh=mesh, bandwidth = mesh._maxFacesPerCell + 1)
-        interiorCoeff = numerix.take(coeff, interiorFaces, axis=-1).ravel()
-        coefficientMatrix.addAt(interiorCoeff, id1.ravel(), id1.swapaxes(0, 1).ravel())
-        coefficientMatrix.addAt(-interiorCoeff, id1.ravel(), id2.swapaxes(0, 1).ravel())
-        coefficientMatrix.addAt(-interiorCoeff, id2.ravel(), id1.swapaxes(0, 1).ravel())
-        coefficientMatrix.addAt(interiorCoeff, id2.ravel(), id2.swapaxes(0, 1).ravel())
+        interiorCoeff = numerix.take(coeff, interiorFaces, axis=-1)
+        if componentwise:
+            interiorCoeff = interiorCoeff * numerix.ones((var.shape[0], len(interiorFaces)))
+        interiorCoeff = interiorCoeff.ravel()
+        coefficientMatrix.addAtPattern(numerix.concatenate((interiorCoeff, -interiorCoeff,
+                                                            -interiorCoeff, interiorCoeff)),
+                                       pattern)
 
 ##         print 'coefficientMatrix',coefficientMatrix
 ##         raw_input('stopped')
@@ -296,6 +314,14 @@ class _AbstractDiffusionTerm(_UnaryTerm):
                 if len(var.shape) == 1 and len(self.nthCoeff.shape) > 1:
                     nthCoeffFaceGrad = var.faceGrad.dot(self.nthCoeff)
                     normalsNthCoeff =  normals.dot(self.nthCoeff)
+                elif self._isComponentwise(var):
+                    if self.nthCoeff.shape != () and not isinstance(self.nthCoeff, FaceVariable):
+                        coeff = self.nthCoeff[..., numerix.newaxis]
+                    else:
+                        coeff = self.nthCoeff
+
+                    nthCoeffFaceGrad = coeff * var.faceGrad
+                    normalsNthCoeff = coeff * normals[:, numerix.newaxis]
                 else:
 
                     if self.nthCoeff.shape != () and not isinstance(self.nthCoeff, FaceVariable):
@@ -318,9 +344,15 @@ class _AbstractDiffusionTerm(_UnaryTerm):
 
                 self.constraintL = -constrainedNormalsDotCoeffOverdAP.divergence * mesh.cellVolumes
 
-            ids = self._reshapeIDs(var, numerix.arange(mesh.numberOfCells))
-            L.addAt(self.constraintL.ravel(), ids.ravel(), ids.swapaxes(0, 1).ravel())
-            b += numerix.reshape(self.constraintB.ravel(), ids.shape).sum(-2).ravel()
+            if self._isComponentwise(var):
+                ids = self._componentIDs(var, numerix.arange(mesh.numberOfCells)).ravel()
+                ones = numerix.ones(var.shape, 'd')
+                L.addAt((self.constraintL * ones).ravel(), ids, ids)
+                b += (self.constraintB * ones).ravel()
+            else:
+                ids = self._reshapeIDs(var, numerix.arange(mesh.numberOfCells))
+                L.addAt(self.constraintL.ravel(), ids.ravel(), ids.swapaxes(0, 1).ravel())
+                b += numerix.reshape(self.constraintB.ravel(), ids.shape).sum(-2).ravel()
 
         return (var, L, b)
 
@@ -34,21 +34,29 @@ class CellTerm(_NonDiffusionTerm):
         self.coeffVectors = None
         self._var = None
 
-    def _checkCoeff(self, var):
+    def _coeffShape(self):
+        """The shape of the coefficient in each cell"""
         if isinstance(self.coeff, CellVariable):
-            shape = self.coeff.shape[:-1]
+            return self.coeff.shape[:-1]
         else:
-            shape = self.coeff.shape
-
-        if var.rank == 1 and (shape == () or len(shape) == 1):
-            if len(self.coeff.shape) == 2 and isinstance(self.coeff, CellVariable):
-                self.coeff *= numerix.identity(var.shape[0])[..., numerix.newaxis]
-            else:
-                self.coeff *= numerix.identity(var.shape[0])
-            if isinstance(self.coeff, CellVariable):
-                shape = self.coeff.shape[:-1]
-            else:
-                shape = self.coeff.shape
+            return self.coeff.shape
+
+    def _isComponentwise(self, var):
+        """Whether each component of a vector `var` is only coupled to itself
+
+        A rank-0 or rank-1 coefficient of a vector solution variable
+        applies to each component, e.g., to each member of an ensemble,
+        independently.
+        """
+        return var.rank == 1 and len(self._coeffShape()) < 2
+
+    def _checkCoeff(self, var):
+        shape = self._coeffShape()
+
+        if self._isComponentwise(var):
+            if shape != () and shape[0] != var.shape[0]:
+                raise TypeError("The coefficient (N,) shape must match the the solution variable (N,) shape.")
+            return
 
         if var.rank == 0:
             if shape != ():
@@ -111,6 +119,14 @@ class CellTerm(_NonDiffusionTerm):
 
         L.addAtDiagonal(updatePyArray)
 
+    def _buildMatrixComponentwise_(self, L, oldArray, b, dt, coeffVectors):
+        ids = self._componentIDs(oldArray, numerix.arange(oldArray.shape[-1])).ravel()
+        ones = numerix.ones(oldArray.shape, 'd')
+        b += (oldArray.value * coeffVectors['old value']).ravel() / dt
+        b += (coeffVectors['b vector'] * ones).ravel()
+        L.addAt((coeffVectors['new value'] * ones).ravel() / dt, ids, ids)
+        L.addAt((coeffVectors['diagonal'] * ones).ravel(), ids, ids)
+
     def _buildMatrixNoInline_(self, L, oldArray, b, dt, coeffVectors):
         ids = self._reshapeIDs(oldArray, numerix.arange(oldArray.shape[-1]))
         b += (oldArray.value[numerix.newaxis] * coeffVectors['old value']).sum(-2).ravel() / dt
@@ -129,6 +145,8 @@ class CellTerm(_NonDiffusionTerm):
 
         if inline.doInline and var.rank == 0:
             self._buildMatrixInline_(L=L, oldArray=var.old, b=b, dt=dt, coeffVectors=coeffVectors)
+        elif self._isComponentwise(var):
+            self._buildMatrixComponentwise_(L=L, oldArray=var.old, b=b, dt=dt, coeffVectors=coeffVectors)
         else:
             self._buildMatrixNoInline_(L=L, oldArray=var.old, b=b, dt=dt, coeffVectors=coeffVectors)
 
@@ -169,6 +187,10 @@ class CellTerm(_NonDiffusionTerm):
             Traceback (most recent call last):
                 ...
             TypeError: The coefficient must be rank 0 for a rank 0 solution variable.
+            >>> TransientTerm(coeff=(1, 2, 3)).solve(vcv)
+            Traceback (most recent call last):
+                ...
+            TypeError: The coefficient (N,) shape must match the the solution variable (N,) shape.
 
         """
         pass
@@ -1,9 +1,10 @@
 from __future__ import unicode_literals
+from builtins import range
 __docformat__ = 'restructuredtext'
 
 __all__ = []
 
-from fipy.terms.abstractBinaryTerm import _AbstractBinaryTerm
+from fipy.terms.abstractBinaryTerm import _AbstractBinaryTerm, _assemblyPool, _buildConcurrently
 from fipy.variables.coupledCellVariable import _CoupledCellVariable
 from fipy.variables.cellVariable import CellVariable
 from fipy.tools import numerix
@@ -62,6 +63,15 @@ class _CoupledBinaryTerm(_AbstractBinaryTerm):
 
         """
 
+        pool = _assemblyPool()
+        if (SparseMatrix._blockMatrixClass is not None
+            and all(tmpVar.rank == 0 for tmpVar in var.vars)):
+            return self._buildAndAddBlocks(pool, var, SparseMatrix, dt=dt,
+                                           buildExplicitIfOther=buildExplicitIfOther)
+        elif pool is not None:
+            return self._buildAndAddMatricesConcurrently(pool, var, SparseMatrix, dt=dt,
+                                                         buildExplicitIfOther=buildExplicitIfOther)
+
         from fipy.matrices.offsetSparseMatrix import OffsetSparseMatrix
         SparseMatrix =  OffsetSparseMatrix(SparseMatrix=SparseMatrix,
                                            numberOfVariables=len(self._vars),
@@ -96,6 +106,172 @@ class _CoupledBinaryTerm(_AbstractBinaryTerm):
 
         return (var, matrix, _CoupledCellVariable(RHSvectors))
 
+    def _buildAndAddMatricesConcurrently(self, pool, var, SparseMatrix, dt, buildExplicitIfOther):
+        """Build the block of each equation for each variable in the
+        threads of `pool` and add them in a single reduction
+
+        Test that the threads build the same system as the blocks built in
+        turn
+
+        >>> import os
+        >>> from fipy import *
+        >>> m = Grid2D(nx=4, ny=3)
+        >>> vs = [CellVariable(mesh=m, value=m.x * i) for i in range(3)]
+        >>> vs[0].constrain(1., where=m.facesLeft)
+        >>> def build():
+        ...     eqs = [TransientTerm(var=vs[i]) == DiffusionTerm(coeff=1. + i, var=vs[i])
+        ...            + ImplicitSourceTerm(coeff=vs[i], var=vs[(i + 1) % 3]) for i in range(3)]
+        ...     eq = eqs[0] & eqs[1] & eqs[2]
+        ...     var, matrix, RHSvector = eq._buildAndAddMatrices(var=eq._verifyVar(None), SparseMatrix=DefaultSolver()._matrixClass, dt=1.)
+        ...     return matrix.numpyArray, RHSvector.globalValue
+        >>> serialMatrix, serialRHSvector = build()
+        >>> os.environ['FIPY_ASSEMBLY_THREADS'] = '4'
+        >>> threadedMatrix, threadedRHSvector = build()
+        >>> del os.environ['FIPY_ASSEMBLY_THREADS']
+        >>> print(numerix.allclose(serialMatrix, threadedMatrix))
+        True
+        >>> print(numerix.allclose(serialRHSvector, threadedRHSvector))
+        True
+        """
+        numberOfVariables = len(self._vars)
+        numberOfEquations = len(self._uncoupledTerms)
+
+        def build(equationIndex, varIndex):
+            # each block has its own offsets
+            BlockMatrix = OffsetSparseMatrix(SparseMatrix=SparseMatrix,
+                                             numberOfVariables=numberOfVariables,
+                                             numberOfEquations=numberOfEquations)
+            BlockMatrix.equationIndex = equationIndex
+            BlockMatrix.varIndex = varIndex
+
+            return self._buildBlock(var, equationIndex, varIndex, BlockMatrix, dt, buildExplicitIfOther)
+
+        tasks = [(equationIndex, varIndex)
+                 for equationIndex in range(numberOfEquations)
+                 for varIndex in range(len(var.vars))]
+        blocks = _buildConcurrently(pool, build, tasks)
+
+        matrix = OffsetSparseMatrix(SparseMatrix=SparseMatrix,
+                                    numberOfVariables=numberOfVariables,
+                                    numberOfEquations=numberOfEquations)(mesh=var.mesh)
+        matrix.addMatrices([tmpMatrix for tmpVar, tmpMatrix, tmpRHSvector in blocks])
+
+        RHSvectors = []
+        for equationIndex, uncoupledTerm in enumerate(self._uncoupledTerms):
+            equationBlocks = [block for (index, varIndex), block in zip(tasks, blocks)
+                              if index == equationIndex]
+            termRHSvector = sum(tmpRHSvector for tmpVar, tmpMatrix, tmpRHSvector in equationBlocks)
+
+            # only add up the equations whose matrices are kept
+            termMatrix = None
+            if uncoupledTerm._cacheMatrix:
+                termMatrix = OffsetSparseMatrix(SparseMatrix=SparseMatrix,
+                                                numberOfVariables=numberOfVariables,
+                                                numberOfEquations=numberOfEquations)(mesh=var.mesh)
+                termMatrix.addMatrices([tmpMatrix for tmpVar, tmpMatrix, tmpRHSvector in equationBlocks])
+            uncoupledTerm._buildCache(termMatrix, termRHSvector)
+            RHSvectors += [CellVariable(value=termRHSvector, mesh=var.mesh)]
+
+        return (var, matrix, _CoupledCellVariable(RHSvectors))
+
+    def _buildBlock(self, var, equationIndex, varIndex, SparseMatrix, dt, buildExplicitIfOther):
+        """Build the matrix of one equation for one of the variables"""
+        uncoupledTerm = self._uncoupledTerms[equationIndex]
+        tmpVar = var.vars[varIndex]
+
+        return uncoupledTerm._buildAndAddMatrices(tmpVar,
+                                                  SparseMatrix,
+                                                  boundaryConditions=(),
+                                                  dt=dt,
+                                                  transientGeomCoeff=uncoupledTerm._getTransientGeomCoeff(tmpVar),
+                                                  diffusionGeomCoeff=uncoupledTerm._getDiffusionGeomCoeff(tmpVar),
+                                                  buildExplicitIfOther=buildExplicitIfOther)
+
+    def _buildAndAddBlocks(self, pool, var, SparseMatrix, dt, buildExplicitIfOther):
+        """Build the matrix of each equation for each variable with
+        `SparseMatrix`, as though they were uncoupled, and couple them in a
+        single `SparseMatrix._blockMatrixClass`, with no offsets to apply
+        to their entries. The blocks are built in the threads of `pool`,
+        if there is one.
+
+        Test that the blocks give the same system as the offset matrices
+
+        >>> from fipy import *
+        >>> from fipy.matrices.scipyMatrix import _ScipyMeshMatrix
+        >>> from fipy.solvers.scipy import LinearLUSolver, LinearGMRESSolver
+        >>> m = Grid2D(nx=4, ny=3)
+        >>> vs = [CellVariable(mesh=m, value=m.x * i) for i in range(3)]
+        >>> vs[0].constrain(1., where=m.facesLeft)
+        >>> def build(SparseMatrix):
+        ...     eqs = [TransientTerm(var=vs[i]) == DiffusionTerm(coeff=1. + i, var=vs[i])
+        ...            + ImplicitSourceTerm(coeff=vs[i], var=vs[(i + 1) % 3]) for i in range(3)]
+        ...     eq = eqs[0] & eqs[1] & eqs[2]
+        ...     return eq._buildAndAddMatrices(var=eq._verifyVar(None), SparseMatrix=SparseMatrix, dt=1.)
+        >>> class _OffsetMeshMatrix(_ScipyMeshMatrix):
+        ...     _blockMatrixClass = None
+        >>> var, offsetMatrix, offsetRHSvector = build(_OffsetMeshMatrix)
+        >>> var, blockMatrix, blockRHSvector = build(_ScipyMeshMatrix)
+        >>> print(type(blockMatrix).__name__, blockMatrix._bsr.blocksize)
+        _ScipyBlockMatrix (3, 3)
+        >>> print(numerix.allclose(offsetMatrix.numpyArray, blockMatrix.numpyArray))
+        True
+        >>> print(numerix.allclose(offsetRHSvector.globalValue, blockRHSvector.globalValue))
+        True
+
+        and the same solution, which the solver finds with the unknowns of
+        each cell interleaved
+
+        >>> class _OffsetLUSolver(LinearLUSolver):
+        ...     _matrixClass = _OffsetMeshMatrix
+        >>> def solve(solver):
+        ...     for i, v in enumerate(vs):
+        ...         v.value = m.x * i
+        ...     eqs = [TransientTerm(var=vs[i]) == DiffusionTerm(coeff=1. + i, var=vs[i])
+        ...            + ImplicitSourceTerm(coeff=vs[i], var=vs[(i + 1) % 3]) for i in range(3)]
+        ...     (eqs[0] & eqs[1] & eqs[2]).solve(dt=1., solver=solver)
+        ...     return numerix.concatenate([v.value for v in vs])
+        >>> offset = solve(_OffsetLUSolver())
+        >>> print(numerix.allclose(solve(LinearLUSolver()), offset))
+        True
+        >>> print(numerix.allclose(solve(LinearGMRESSolver(tolerance=1e-12)), offset))
+        True
+        """
+        numberOfVariables = len(var.vars)
+        numberOfEquations = len(self._uncoupledTerms)
+
+        def build(equationIndex, varIndex):
+            return self._buildBlock(var, equationIndex, varIndex, SparseMatrix, dt, buildExplicitIfOther)
+
+        tasks = [(equationIndex, varIndex)
+                 for equationIndex in range(numberOfEquations)
+                 for varIndex in range(numberOfVariables)]
+        if pool is None:
+            built = [build(*task) for task in tasks]
+        else:
+            built = _buildConcurrently(pool, build, tasks)
+
+        blocks = [[None] * numberOfVariables for equationIndex in range(numberOfEquations)]
+        RHSvectors = [0] * numberOfEquations
+        for (equationIndex, varIndex), (tmpVar, tmpMatrix, tmpRHSvector) in zip(tasks, built):
+            blocks[equationIndex][varIndex] = tmpMatrix
+            RHSvectors[equationIndex] += tmpRHSvector
+
+        BlockMatrix = SparseMatrix._blockMatrixClass
+        matrix = BlockMatrix(mesh=var.mesh, blocks=blocks)
+
+        for equationIndex, uncoupledTerm in enumerate(self._uncoupledTerms):
+            # only couple the equations whose matrices are kept
+            termMatrix = None
+            if uncoupledTerm._cacheMatrix:
+                termMatrix = BlockMatrix(mesh=var.mesh,
+                                         blocks=[equationBlocks if index == equationIndex
+                                                 else [None] * numberOfVariables
+                                                 for index, equationBlocks in enumerate(blocks)])
+            uncoupledTerm._buildCache(termMatrix, RHSvectors[equationIndex])
+            RHSvectors[equationIndex] = CellVariable(value=RHSvectors[equationIndex], mesh=var.mesh)
+
+        return (var, matrix, _CoupledCellVariable(RHSvectors))
+
     def __repr__(self):
         return '(' + repr(self.term) + ' & ' + repr(self.other) + ')'
 
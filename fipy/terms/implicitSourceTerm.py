@@ -40,7 +40,13 @@ class ImplicitSourceTerm(SourceTerm):
         """
 
         coeff = self._getGeomCoeff(var)
-        diagonalSign = self._getDiagonalSign(transientGeomCoeff, diffusionGeomCoeff)
+        diagonalSign = numerix.array(self._getDiagonalSign(transientGeomCoeff, diffusionGeomCoeff))
+        if var.rank == 1:
+            # reconcile componentwise, i.e., block diagonal, and fully coupled terms
+            if self._isComponentwise(var) and diagonalSign.shape == 2 * var.shape[:1]:
+                diagonalSign = numerix.diagonal(diagonalSign)
+            elif not self._isComponentwise(var) and diagonalSign.shape == var.shape[:1]:
+                diagonalSign = numerix.where(numerix.identity(var.shape[0]), diagonalSign, 1)
         combinedSign = numerix.array(diagonalSign)[..., numerix.newaxis] * numerix.sign(coeff)
 
         return {'diagonal' : (combinedSign >= 0),
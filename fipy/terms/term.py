@@ -4,9 +4,11 @@ from builtins import object
 __docformat__ = 'restructuredtext'
 
 import os
+import weakref
 
 from fipy import input
 from fipy.tools import numerix
+from fipy.tools import instrumentation
 from fipy.terms import AbstractBaseClassError
 from fipy.terms import SolutionVariableRequiredError
 
@@ -14,6 +16,9 @@ __all__ = ["Term"]
 from future.utils import text_to_native_str
 __all__ = [text_to_native_str(n) for n in __all__]
 
+# sparsity patterns of each mesh, dropped with it
+_sparsityPatterns = weakref.WeakKeyDictionary()
+
 class Term(object):
     """
     .. attention:: This class is abstract. Always create one of its subclasses.
@@ -87,6 +92,120 @@ class Term(object):
     def _reshapeIDs(self, var, ids):
         raise NotImplementedError
 
+    def _componentIDs(self, var, ids):
+        """The IDs of cells `ids` in each component of a vector `var`"""
+        raise NotImplementedError
+
+    def _getInteriorFacePattern(self, var, componentwise=False):
+        """Interior face IDs and the sparsity pattern they induce.
+
+        The pattern holds the (`id1`, `id2`) pairs of the four blocks
+        coupling the cells on either side of each interior face, in the
+        order "cell 1 diag", "cell 1 offdiag", "cell 2 offdiag", "cell 2
+        diag". It depends only on the mesh connectivity and on the vector
+        size of `var`, so it is computed once for each mesh, and shared by
+        all terms.
+        If `componentwise`, each component of a vector `var` is only
+        coupled to itself.
+
+        >>> from fipy import Grid1D, CellVariable, DiffusionTerm
+        >>> m = Grid1D(nx=3)
+        >>> v = CellVariable(mesh=m)
+        >>> term = DiffusionTerm()
+        >>> interiorFaces, pattern = term._getInteriorFacePattern(v)
+        >>> print(interiorFaces)
+        [1 2]
+        >>> print(pattern.id1)
+        [0 1 0 1 1 2 1 2]
+        >>> print(pattern.id2)
+        [0 1 1 2 0 1 1 2]
+        >>> print(pattern.nnz)
+        7
+        >>> term._getInteriorFacePattern(v)[1] is pattern
+        True
+        >>> DiffusionTerm()._getInteriorFacePattern(v)[1] is pattern
+        True
+
+        The pattern does not keep its mesh alive
+
+        >>> import gc, weakref
+        >>> mesh = weakref.ref(m)
+        >>> del m, v
+        >>> print(gc.collect() >= 0 and mesh() is None)
+        True
+
+        >>> m = Grid1D(nx=3)
+
+        >>> v = CellVariable(mesh=m, elementshape=(2,))
+        >>> interiorFaces, pattern = term._getInteriorFacePattern(v, componentwise=True)
+        >>> print(pattern.id1)
+        [0 1 3 4 0 1 3 4 1 2 4 5 1 2 4 5]
+        >>> print(pattern.id2)
+        [0 1 3 4 1 2 4 5 0 1 3 4 1 2 4 5]
+        """
+        from fipy.matrices.sparseMatrix import _SparsityPattern
+
+        mesh = var.mesh
+        vectorSize = self._vectorSize(var)
+        componentwise = componentwise and vectorSize > 1
+        key = (vectorSize, componentwise)
+        patterns = _sparsityPatterns.setdefault(mesh, {})
+
+        if key not in patterns:
+            id1, id2 = mesh._adjacentCellIDs
+            interiorFaces = numerix.nonzero(mesh.interiorFaces)[0]
+
+            if componentwise:
+                id1 = self._componentIDs(var, numerix.take(id1, interiorFaces))
+                id2 = self._componentIDs(var, numerix.take(id2, interiorFaces))
+                transpose1, transpose2 = id1, id2
+            else:
+                id1 = self._reshapeIDs(var, numerix.take(id1, interiorFaces))
+                id2 = self._reshapeIDs(var, numerix.take(id2, interiorFaces))
+                transpose1, transpose2 = id1.swapaxes(0, 1), id2.swapaxes(0, 1)
+
+            rows = numerix.concatenate((id1.ravel(), id1.ravel(),
+                                        id2.ravel(), id2.ravel()))
+            cols = numerix.concatenate((transpose1.ravel(), transpose2.ravel(),
+                                        transpose1.ravel(), transpose2.ravel()))
+
+            size = mesh.numberOfCells * vectorSize
+            patterns[key] = (interiorFaces,
+                             _SparsityPattern(id1=rows, id2=cols, shape=(size, size)))
+
+        return patterns[key]
+
+    def _getStencilPattern(self, var):
+        """Sparsity pattern of the interior faces of a structured grid.
+
+        Returns `None` unless `var` is scalar and its mesh can describe its
+        interior faces as a regular stencil, in which case their
+        coefficients can be arranged in the matrix without the generic
+        gather and scatter of :meth:`_getInteriorFacePattern`.
+
+        >>> from fipy import Grid2D, Tri2D, CellVariable, DiffusionTerm
+        >>> term = DiffusionTerm()
+        >>> stencil = term._getStencilPattern(CellVariable(mesh=Grid2D(nx=3, ny=2)))
+        >>> print(stencil.nnz)
+        20
+        >>> print(term._getStencilPattern(CellVariable(mesh=Tri2D(nx=3, ny=2))))
+        None
+        >>> print(term._getStencilPattern(CellVariable(mesh=Grid2D(nx=3, ny=2), elementshape=(2,))))
+        None
+        """
+        from fipy.matrices.sparseMatrix import _StencilPattern
+
+        mesh = var.mesh
+        if self._vectorSize(var) > 1 or not hasattr(mesh, '_stencilFaces'):
+            return None
+
+        patterns = _sparsityPatterns.setdefault(mesh, {})
+
+        if "stencil" not in patterns:
+            patterns["stencil"] = _StencilPattern(*mesh._stencilFaces)
+
+        return patterns["stencil"]
+
     def _vectorSize(self, var=None):
         if var is None or var.rank != 1:
             return 1
@@ -175,7 +294,7 @@ class Term(object):
 
         solver = self._prepareLinearSystem(var, solver, boundaryConditions, dt)
 
-        solver._solve()
+        self._solveLinearSystem(solver)
 
     def sweep(self, var=None, solver=None, boundaryConditions=(), dt=None, underRelaxation=None, residualFn=None, cacheResidual=False, cacheError=False):
         r"""
@@ -229,10 +348,16 @@ class Term(object):
         if not cacheResidual:
             self.residualVector = None
 
-        solver._solve()
+        self._solveLinearSystem(solver)
 
         return residual
 
+    def _solveLinearSystem(self, solver):
+        if instrumentation._instruments:
+            instrumentation._solve(solver)
+        else:
+            solver._solve()
+
     def justResidualVector(self, var=None, solver=None, boundaryConditions=(), dt=None, underRelaxation=None, residualFn=None):
         r"""Builds the `Term`'s linear system once.
 
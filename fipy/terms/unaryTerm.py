@@ -3,10 +3,12 @@ __docformat__ = 'restructuredtext'
 
 __all__ = []
 
+import functools
 import os
 
 from fipy import input
 from fipy.tools import numerix
+from fipy.tools import instrumentation
 from fipy.terms.term import Term
 
 class _UnaryTerm(Term):
@@ -58,20 +60,25 @@ class _UnaryTerm(Term):
 
         """
 
+        if instrumentation._instruments:
+            buildMatrix = functools.partial(instrumentation._buildMatrix, self)
+        else:
+            buildMatrix = self._buildMatrix
+
         if var is self.var or self.var is None:
-            var, matrix, RHSvector = self._buildMatrix(var,
-                                                       SparseMatrix,
-                                                       boundaryConditions=boundaryConditions,
-                                                       dt=dt,
-                                                       transientGeomCoeff=transientGeomCoeff,
-                                                       diffusionGeomCoeff=diffusionGeomCoeff)
+            var, matrix, RHSvector = buildMatrix(var,
+                                                 SparseMatrix,
+                                                 boundaryConditions=boundaryConditions,
+                                                 dt=dt,
+                                                 transientGeomCoeff=transientGeomCoeff,
+                                                 diffusionGeomCoeff=diffusionGeomCoeff)
         elif buildExplicitIfOther:
-            _, matrix, RHSvector = self._buildMatrix(self.var,
-                                                     SparseMatrix,
-                                                     boundaryConditions=boundaryConditions,
-                                                     dt=dt,
-                                                     transientGeomCoeff=transientGeomCoeff,
-                                                     diffusionGeomCoeff=diffusionGeomCoeff)
+            _, matrix, RHSvector = buildMatrix(self.var,
+                                               SparseMatrix,
+                                               boundaryConditions=boundaryConditions,
+                                               dt=dt,
+                                               transientGeomCoeff=transientGeomCoeff,
+                                               diffusionGeomCoeff=diffusionGeomCoeff)
             RHSvector = RHSvector - matrix * self.var.value
             matrix = SparseMatrix(mesh=var.mesh)
         else:
@@ -94,6 +101,11 @@ class _UnaryTerm(Term):
         ids += X[..., numerix.newaxis]
         return ids
 
+    def _componentIDs(self, var, ids):
+        ids = numerix.resize(ids, (self._vectorSize(var), ids.shape[-1]))
+        ids += var.mesh.numberOfCells * numerix.arange(self._vectorSize(var))[..., numerix.newaxis]
+        return ids
+
     def _getDefaultSolver(self, var, solver, *args, **kwargs):
         if solver and not solver._canSolveAsymmetric():
             import warnings
@@ -238,11 +238,17 @@ class test(_test):
                 return
 
         if self.inline:
+            import os
+            os.environ['FIPY_INLINE'] = '1'
             try:
-                import weave
-            except ImportError as a:
-                print("!!! weave library is not installed", file=sys.stderr)
+                from fipy.tools import inline
+                backend = inline._availableBackend()
+            except ImportError as e:
+                print("!!! inline backend is not available: %s" % e, file=sys.stderr)
                 return
+            # FiPy may have been imported before inlining was requested
+            inline.backend = backend
+            inline.doInline = (backend == 'weave')
 
         if self.pythoncompiled is not None:
             import os
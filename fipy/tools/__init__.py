@@ -34,12 +34,35 @@ for M in (2, 3):
                          why="not running on processor %d of %d" % (N, M),
                          skipWarning=False)
 
+def _hasNumba():
+    try:
+        import numba
+        return True
+    except ImportError:
+        return False
+
+register_skipper(flag="NUMBA",
+                 test=_hasNumba,
+                 why="the `numba` package cannot be imported",
+                 skipWarning=True)
+
+def _notInline():
+    from fipy.tools import inline
+    return inline.backend is None
+
+register_skipper(flag="NOT_INLINE",
+                 test=_notInline,
+                 why="operator variables are evaluated by inline kernels",
+                 skipWarning=False)
+
 import fipy.tools.dump
 import fipy.tools.numerix
 import fipy.tools.vector
 from .dimensions.physicalField import PhysicalField
 from fipy.tools.numerix import *
 from fipy.tools.vitals import Vitals
+from fipy.tools.instrumentation import Instrumentation
+from fipy.tools.memory import MemoryProfile
 
 __all__ = ["serialComm",
            "parallelComm",
@@ -48,6 +71,8 @@ __all__ = ["serialComm",
            "vector",
            "PhysicalField",
            "Vitals",
+           "Instrumentation",
+           "MemoryProfile",
            "serial",
            "parallel"]
 from future.utils import text_to_native_str
@@ -8,10 +8,12 @@ import pickle
 import os
 import sys
 import gzip
+import weakref
 
 from fipy.tools import parallelComm
+from fipy.tools import numerix
 
-__all__ = ["write", "read"]
+__all__ = ["write", "read", "writeCheckpoint", "readCheckpoint"]
 from future.utils import text_to_native_str
 __all__ = [text_to_native_str(n) for n in __all__]
 
@@ -124,6 +126,393 @@ def read(filename, fileobject=None, communicator=parallelComm, mesh_unmangle=Fal
 
     return unpickler.load()
 
+_checkpointFormat = 2
+
+# the checkpoint directories each mesh has been written to
+_checkpointedMeshes = weakref.WeakKeyDictionary()
+
+def _checkpointFile(path, name, procID=None):
+    if procID is None:
+        return os.path.join(path, name)
+    return os.path.join(path, "%s.%d.npy" % (name, procID))
+
+def _meshArrays(mesh):
+    """The state of `mesh`, with each array in it replaced by a
+    description of the raw arrays that hold it, and those raw arrays, by
+    file name
+
+        >>> from fipy import Tri2D
+        >>> state, arrays = _meshArrays(Tri2D(nx=1, ny=1) + ((1.,), (0.,)))
+        >>> print(state["vertexCoords"])
+        ('array', 'mesh.vertexCoords.npy')
+        >>> print(state["faceVertexIDs"])
+        ('masked', 'mesh.faceVertexIDs.npy', 'mesh.faceVertexIDs.mask.npy')
+        >>> print(sorted(arrays.keys()))
+        ['mesh.cellFaceIDs.mask.npy', 'mesh.cellFaceIDs.npy', 'mesh.faceVertexIDs.mask.npy', 'mesh.faceVertexIDs.npy', 'mesh.vertexCoords.npy']
+    """
+    from fipy.tools.raggedArray import _RaggedArray
+
+    state = mesh.__getstate__().copy()
+    arrays = {}
+    for key, value in state.items():
+        name = "mesh.%s" % key
+        if isinstance(value, _RaggedArray):
+            arrays[name + ".offsets.npy"] = value.offsets
+            arrays[name + ".indices.npy"] = value.indices
+            state[key] = ("ragged", name + ".offsets.npy", name + ".indices.npy",
+                          value._numberOfTargets)
+        elif isinstance(value, numerix.MA.MaskedArray):
+            arrays[name + ".npy"] = numerix.MA.getdata(value)
+            arrays[name + ".mask.npy"] = numerix.MA.getmaskarray(value)
+            state[key] = ("masked", name + ".npy", name + ".mask.npy")
+        elif type(value) is numerix.ndarray:
+            arrays[name + ".npy"] = value
+            state[key] = ("array", name + ".npy")
+        else:
+            state[key] = ("object", value)
+
+    return state, arrays
+
+def _isPartitioned(mesh):
+    """Whether the state of `mesh` describes only the cells of this
+    processor, as that of a :term:`Gmsh` mesh does in parallel, rather than
+    the whole mesh, as that of a grid does"""
+    from fipy.meshes.representations.gridRepresentation import _GridRepresentation
+
+    return (mesh.communicator.Nproc > 1
+            and not isinstance(mesh.representation, _GridRepresentation))
+
+def _loadMesh(path, meshClass, state):
+    """Rebuild a mesh of `meshClass` from the `state` of :func:`_meshArrays`
+    and the raw arrays in `path`"""
+    from fipy.tools.raggedArray import _RaggedArray
+
+    def load(name):
+        return numerix.load(_checkpointFile(path, name))
+
+    rebuilt = {}
+    for key, value in state.items():
+        kind = value[0]
+        if kind == "ragged":
+            rebuilt[key] = _RaggedArray(offsets=load(value[1]),
+                                        indices=load(value[2]),
+                                        numberOfTargets=value[3])
+        elif kind == "masked":
+            rebuilt[key] = numerix.MA.array(load(value[1]), mask=load(value[2]))
+        elif kind == "array":
+            rebuilt[key] = load(value[1])
+        else:
+            rebuilt[key] = value[1]
+
+    mesh = meshClass.__new__(meshClass)
+    mesh.__setstate__(rebuilt)
+    return mesh
+
+def writeCheckpoint(path, variables):
+    """
+    Write `CellVariable` objects to a checkpoint directory for restart.
+
+    Unlike :func:`write`, nothing is compressed and no array is pickled.
+    The arrays of the mesh are written as raw :mod:`numpy` arrays by the
+    first processor, only the first time the mesh is written to `path`,
+    so a mesh partitioned among processors must be a grid, which each
+    processor describes whole.
+    A description of the mesh and of each variable is pickled, and every
+    processor writes the values of the cells it owns, with their global
+    IDs, as raw arrays in files of its own.
+
+        >>> from fipy import Grid2D, CellVariable
+        >>> mesh = Grid2D(nx=3, ny=2)
+        >>> phi = CellVariable(mesh=mesh, name="phi", hasOld=True,
+        ...                    value=mesh.cellCenters[0] * mesh.cellCenters[1])
+        >>> phi.updateOld()
+        >>> phi.setValue(-1., where=mesh.cellCenters[0] < 1)
+        >>> velocity = CellVariable(mesh=mesh, name="velocity", rank=1,
+        ...                         value=mesh.cellCenters, unit="m/s")
+
+        >>> import tempfile
+        >>> path = tempfile.mkdtemp() # doctest: +SERIAL
+        >>> writeCheckpoint(path, {"phi": phi, "u": velocity}) # doctest: +SERIAL
+
+        >>> newMesh, newVariables = readCheckpoint(path) # doctest: +SERIAL
+        >>> newPhi = newVariables["phi"] # doctest: +SERIAL
+        >>> print(newPhi.name) # doctest: +SERIAL
+        phi
+        >>> print(numerix.allclose(newPhi, phi)) # doctest: +SERIAL
+        True
+        >>> print(numerix.allclose(newPhi.old, phi.old)) # doctest: +SERIAL
+        True
+        >>> newVelocity = newVariables["u"] # doctest: +SERIAL
+        >>> print(newVelocity.rank, newVelocity.unit.name()) # doctest: +SERIAL
+        1 m/s
+        >>> print(numerix.allclose(newVelocity.numericValue, velocity.numericValue)) # doctest: +SERIAL
+        True
+        >>> print(newVelocity.mesh is newPhi.mesh is newMesh) # doctest: +SERIAL
+        True
+
+    The values are mapped from their files, and are only read, or copied,
+    as they are used
+
+        >>> print(isinstance(newPhi.numericValue.base, numerix.memmap)) # doctest: +SERIAL
+        True
+        >>> newPhi.setValue(0.) # doctest: +SERIAL
+        >>> print(numerix.allclose(readCheckpoint(path)[1]["phi"], phi)) # doctest: +SERIAL
+        True
+
+        >>> import shutil
+        >>> shutil.rmtree(path) # doctest: +SERIAL
+
+    Only the values of a variable are written, so a subclass of
+    `CellVariable`, or an expression of variables, is read as a plain
+    `CellVariable` holding the value it had
+
+        >>> from fipy import GaussianNoiseVariable
+        >>> noise = GaussianNoiseVariable(mesh=mesh, variance=1.)
+        >>> path = tempfile.mkdtemp() # doctest: +SERIAL
+        >>> writeCheckpoint(path, {"noise": noise, "twice": 2 * phi}) # doctest: +SERIAL
+        >>> newVariables = readCheckpoint(path)[1] # doctest: +SERIAL
+        >>> for key in ("noise", "twice"):
+        ...     print(type(newVariables[key]).__name__) # doctest: +SERIAL
+        CellVariable
+        CellVariable
+        >>> print(numerix.allclose(newVariables["noise"], noise)) # doctest: +SERIAL
+        True
+        >>> print(numerix.allclose(newVariables["twice"], 2 * phi)) # doctest: +SERIAL
+        True
+        >>> shutil.rmtree(path) # doctest: +SERIAL
+
+    The mesh is written to a directory once, and later checkpoints of its
+    variables there leave it be
+
+        >>> from fipy import Tri2D
+        >>> triangles = Tri2D(nx=3, ny=2) + ((1.,), (0.,))
+        >>> psi = CellVariable(mesh=triangles, value=triangles.x)
+        >>> path = tempfile.mkdtemp() # doctest: +SERIAL
+        >>> writeCheckpoint(path, {"psi": psi}) # doctest: +SERIAL
+        >>> meshFile = _checkpointFile(path, "mesh.vertexCoords.npy") # doctest: +SERIAL
+        >>> written = os.stat(meshFile).st_mtime_ns # doctest: +SERIAL
+        >>> psi.setValue(triangles.y)
+        >>> writeCheckpoint(path, {"psi": psi}) # doctest: +SERIAL
+        >>> print(os.stat(meshFile).st_mtime_ns == written) # doctest: +SERIAL
+        True
+        >>> print(numerix.allclose(readCheckpoint(path)[1]["psi"], triangles.y)) # doctest: +SERIAL
+        True
+
+    and a checkpoint can be read by another process, which has no mesh of
+    its own
+
+        >>> import subprocess
+        >>> script = ("from fipy.tools.dump import readCheckpoint; "
+        ...           "mesh, variables = readCheckpoint(%r); "
+        ...           "print(type(mesh).__name__, mesh.numberOfCells, "
+        ...           "round(float(variables['psi'].sum()), 6))" % path)
+        >>> output = subprocess.check_output([sys.executable, "-c", script]) # doctest: +SERIAL
+        >>> print(output.decode().split()) # doctest: +SERIAL
+        ['Mesh2D', '24', '24.0']
+        >>> shutil.rmtree(path) # doctest: +SERIAL
+
+    A checkpoint can only hold `CellVariable` objects of a single mesh,
+    which is checked before anything is written
+
+        >>> try:
+        ...     writeCheckpoint(path, {"phi": phi, "psi": psi})
+        ... except ValueError as e:
+        ...     print(e)
+        All variables of a checkpoint must share a mesh
+        >>> try:
+        ...     writeCheckpoint(path, {"phi": phi, "flux": phi.faceValue})
+        ... except TypeError as e:
+        ...     print(e)
+        Only a CellVariable can be checkpointed
+        >>> print(os.path.exists(path))
+        False
+
+    Only a grid is described by its whole mesh on every processor. An
+    unstructured mesh, e.g., one read from :term:`Gmsh`, that is
+    partitioned among processors cannot be checkpointed
+
+        >>> class TwoProcessors(object):
+        ...     procID = 0
+        ...     Nproc = 2
+        >>> partitioned = Tri2D(nx=3, ny=2) + ((1.,), (0.,))
+        >>> partitioned.communicator = TwoProcessors()
+        >>> try:
+        ...     writeCheckpoint(path, {"xi": CellVariable(mesh=partitioned)})
+        ... except NotImplementedError as e:
+        ...     print(e)
+        Only a grid, or a mesh on a single processor, can be checkpointed
+        >>> print(os.path.exists(path))
+        False
+
+    The values of a grid checkpointed by several processors are gathered
+    from the files of each, here split as though by two processors that
+    each own every other cell
+
+        >>> path = tempfile.mkdtemp() # doctest: +SERIAL
+        >>> writeCheckpoint(path, {"phi": phi}) # doctest: +SERIAL
+        >>> value = numerix.load(_checkpointFile(path, "value0", 0)) # doctest: +SERIAL
+        >>> old = numerix.load(_checkpointFile(path, "old0", 0)) # doctest: +SERIAL
+        >>> for procID in range(2):
+        ...     cellIDs = numerix.arange(procID, mesh.numberOfCells, 2)
+        ...     numerix.save(_checkpointFile(path, "value0", procID), value[..., cellIDs])
+        ...     numerix.save(_checkpointFile(path, "old0", procID), old[..., cellIDs])
+        ...     numerix.save(_checkpointFile(path, "cellIDs", procID), cellIDs) # doctest: +SERIAL
+        >>> description = read(_checkpointFile(path, "checkpoint.gz")) # doctest: +SERIAL
+        >>> description["Nproc"] = 2 # doctest: +SERIAL
+        >>> write(description, filename=_checkpointFile(path, "checkpoint.gz")) # doctest: +SERIAL
+        >>> newPhi = readCheckpoint(path)[1]["phi"] # doctest: +SERIAL
+        >>> print(numerix.allclose(newPhi, phi), numerix.allclose(newPhi.old, phi.old)) # doctest: +SERIAL
+        True True
+        >>> shutil.rmtree(path) # doctest: +SERIAL
+
+    Parameters
+    ----------
+    path : str
+        Name of the directory to hold the checkpoint. It is created if
+        it does not exist.
+    variables : dict
+        The `CellVariable` objects to write, keyed by the names that
+        :func:`readCheckpoint` returns them under.
+    """
+    from fipy.variables.cellVariable import CellVariable
+
+    meshes = []
+    for var in variables.values():
+        if not isinstance(var, CellVariable):
+            raise TypeError("Only a CellVariable can be checkpointed")
+        if not any(var.mesh is mesh for mesh in meshes):
+            meshes.append(var.mesh)
+    if len(meshes) != 1:
+        raise ValueError("All variables of a checkpoint must share a mesh")
+    mesh, = meshes
+    communicator = mesh.communicator
+
+    if _isPartitioned(mesh):
+        # each processor would write only its own part of the mesh
+        raise NotImplementedError("Only a grid, or a mesh on a single processor, can be checkpointed")
+
+    if communicator.procID == 0 and not os.path.isdir(path):
+        os.makedirs(path)
+    communicator.Barrier()
+
+    meshState, meshArrays = _meshArrays(mesh)
+    written = _checkpointedMeshes.setdefault(mesh, set())
+    if communicator.procID == 0 and not (os.path.realpath(path) in written
+                                         and all(os.path.exists(_checkpointFile(path, name))
+                                                 for name in meshArrays)):
+        for name, value in meshArrays.items():
+            numerix.save(_checkpointFile(path, name), value)
+    written.add(os.path.realpath(path))
+
+    localIDs = mesh._localNonOverlappingCellIDs
+    owned = (len(localIDs) == mesh.numberOfCells)
+
+    def local(value):
+        if owned:
+            return numerix.asarray(value)
+        return numerix.asarray(value)[..., localIDs]
+
+    keys = sorted(variables.keys())
+    descriptions = []
+    for index, key in enumerate(keys):
+        var = variables[key]
+        numerix.save(_checkpointFile(path, "value%d" % index, communicator.procID),
+                     local(var.numericValue))
+        hasOld = (getattr(var, "_old", None) is not None)
+        if hasOld:
+            numerix.save(_checkpointFile(path, "old%d" % index, communicator.procID),
+                         local(var.old.numericValue))
+        descriptions.append(dict(key=key, name=var.name, unit=var.unit,
+                                 hasOld=hasOld))
+
+    numerix.save(_checkpointFile(path, "cellIDs", communicator.procID),
+                 mesh._globalNonOverlappingCellIDs)
+
+    # pickled by the first processor, once all values are on disk
+    communicator.Barrier()
+    write(dict(format=_checkpointFormat,
+               meshClass=mesh.__class__,
+               meshState=meshState,
+               Nproc=communicator.Nproc,
+               variables=descriptions),
+          filename=_checkpointFile(path, "checkpoint.gz"),
+          communicator=communicator)
+    communicator.Barrier()
+
+def readCheckpoint(path, communicator=parallelComm):
+    """
+    Read the mesh and `CellVariable` objects of a checkpoint written by
+    :func:`writeCheckpoint`. Returns the mesh and a `dict` of the
+    variables.
+
+    The values of the cells each processor needs are gathered from
+    memory-mapped files, so the checkpoint may have been written by a
+    different number of processors. When it was written by one
+    processor, and is read by one, the values stay mapped, and are
+    copied only where they are changed.
+
+    Parameters
+    ----------
+    path : str
+        Name of the directory that holds the checkpoint.
+    communicator : ~fipy.tools.comms.commWrapper.CommWrapper
+        A duck-typed object with `procID` and `Nproc` attributes is sufficient
+    """
+    from fipy.variables.cellVariable import CellVariable
+
+    description = read(_checkpointFile(path, "checkpoint.gz"), communicator=communicator)
+    if description.get("format") != _checkpointFormat:
+        raise IOError("%s is not a checkpoint of a known format" % path)
+
+    mesh = _loadMesh(path, description["meshClass"], description["meshState"])
+    Nproc = description["Nproc"]
+
+    neededIDs = numerix.asarray(mesh._globalOverlappingCellIDs)
+    if Nproc == 1 and numerix.array_equal(neededIDs, numerix.arange(len(neededIDs))):
+        # the cells are stored in the order they are needed
+        selections = None
+    else:
+        position = numerix.empty((mesh.globalNumberOfCells,), dtype=numerix.INT_DTYPE)
+        position.fill(-1)
+        position[neededIDs] = numerix.arange(len(neededIDs))
+        selections = []
+        for procID in range(Nproc):
+            cellIDs = numerix.load(_checkpointFile(path, "cellIDs", procID))
+            where = position[cellIDs]
+            selected = where >= 0
+            selections.append((procID, selected, where[selected]))
+
+    def load(name):
+        if selections is None:
+            # copied on write, so the file is left as it is
+            mapped = numerix.load(_checkpointFile(path, name, 0), mmap_mode='c')
+            return mapped.view(numerix.ndarray)
+
+        value = None
+        for procID, selected, where in selections:
+            shard = numerix.load(_checkpointFile(path, name, procID), mmap_mode='r')
+            if value is None:
+                value = numerix.empty(shard.shape[:-1] + (len(neededIDs),), dtype=shard.dtype)
+            value[..., where] = shard[..., selected]
+        return value
+
+    def variable(name, unit, value):
+        # the storage `CellVariable` allocates is replaced, not copied into
+        new = CellVariable(mesh=mesh, name=name, unit=unit,
+                           elementshape=value.shape[:-1])
+        new._setNumericValue(value)
+        new._markFresh()
+        return new
+
+    variables = {}
+    for index, var in enumerate(description["variables"]):
+        new = variable(var["name"], var["unit"], load("value%d" % index))
+        if var["hasOld"]:
+            new._old = variable(var["name"], var["unit"], load("old%d" % index))
+        variables[var["key"]] = new
+
+    return mesh, variables
+
 def _test():
     import fipy.tests.doctestPlus
     return fipy.tests.doctestPlus.testmod()
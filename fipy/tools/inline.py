@@ -1,17 +1,58 @@
 from __future__ import unicode_literals
 from builtins import range
-__all__ = ["doInline"]
+__all__ = ["doInline", "backend"]
 from future.utils import text_to_native_str
 __all__ = [text_to_native_str(n) for n in __all__]
 
 import inspect
 import os
 import sys
+import threading
 
-if '--inline' in [s.lower() for s in sys.argv[1:]]:
-    doInline = True
-else:
-    doInline = 'FIPY_INLINE' in os.environ
+_backends = ('weave', 'numba', 'numpy')
+
+def _chooseBackend():
+    """Select the inline kernel backend.
+
+    Inlining is requested with `--inline` or `FIPY_INLINE`. The backend
+    is taken from `FIPY_INLINE_BACKEND`, if set, or else is the first of
+    `weave`, `numba`, and `numpy` that can be imported.
+    """
+    if not ('--inline' in [s.lower() for s in sys.argv[1:]]
+            or 'FIPY_INLINE' in os.environ):
+        return None
+
+    return _availableBackend()
+
+def _availableBackend():
+    """The inline kernel backend that would be used, if inlining were
+    requested
+
+    Raises `ImportError` if the backend named by `FIPY_INLINE_BACKEND`
+    is unknown or cannot be imported.
+    """
+    if 'FIPY_INLINE_BACKEND' in os.environ:
+        desired = os.environ['FIPY_INLINE_BACKEND'].lower()
+        if desired not in _backends:
+            raise ImportError('Unknown inline backend %s' % desired)
+        candidates = (desired,)
+    else:
+        candidates = _backends
+
+    for candidate in candidates:
+        if candidate == 'numpy':
+            return candidate
+        try:
+            __import__(candidate)
+            return candidate
+        except ImportError:
+            if candidate == candidates[-1]:
+                raise
+
+backend = _chooseBackend()
+
+# hand-written C blocks throughout FiPy can only be compiled by weave
+doInline = (backend == 'weave')
 
 _inlineFrameComment = 'FIPY_INLINE_COMMENT' in os.environ
 
@@ -45,7 +86,7 @@ def _rawCodeComment(code, level=2):
         return ""
 
 def _operatorVariableComment(canInline=True, level=3):
-    if canInline and doInline and _inlineFrameComment:
+    if canInline and backend is not None and _inlineFrameComment:
         finfo = _getframeinfo(level=level)
 
         # note:
@@ -185,3 +226,420 @@ static int arrayIndex(PyArrayObject* array, int i, int vec[])
     return index / array->descr->elsize;
 }
                  """)
+
+class _KernelError(Exception):
+    """Raised when an inline expression cannot be compiled by `backend`
+    """
+    pass
+
+def _parseAssignment(code_in):
+    """Parse a `result[...] = expression;` fragment into a Python expression tree
+
+        >>> import ast
+        >>> expression = _parseAssignment("result[i + j * ni] = (var0[i + j * ni] * var1);")
+        >>> print(isinstance(expression, ast.BinOp))
+        True
+        >>> try:
+        ...     _parseAssignment("{ int i; }")
+        ... except _KernelError as e:
+        ...     print(e)
+        Unable to parse inline code: { int i; }
+    """
+    import ast
+
+    try:
+        tree = ast.parse(code_in.strip().rstrip(';'), mode='exec')
+    except SyntaxError:
+        raise _KernelError("Unable to parse inline code: %s" % code_in)
+
+    if (len(tree.body) != 1
+        or not isinstance(tree.body[0], ast.Assign)
+        or len(tree.body[0].targets) != 1
+        or not isinstance(tree.body[0].targets[0], ast.Subscript)
+        or getattr(tree.body[0].targets[0].value, 'id', None) != 'result'):
+        raise _KernelError("Inline code is not an assignment to `result`: %s" % code_in)
+
+    return tree.body[0].value
+
+# C math names that are spelled differently by NumPy
+_numpyNames = {
+    'asin': 'arcsin',
+    'acos': 'arccos',
+    'atan': 'arctan',
+    'atan2': 'arctan2',
+    'asinh': 'arcsinh',
+    'acosh': 'arccosh',
+    'atanh': 'arctanh',
+    'pow': 'power'
+}
+
+class _NumpyKernel(object):
+    """Evaluate an inline expression as a chain of NumPy ufuncs
+
+    The expression is compiled once to a postfix program. The first
+    evaluation for a given set of argument shapes and types plans the
+    intermediate buffers, so that later evaluations reuse them with the
+    `out` argument of each ufunc, rather than allocating a temporary
+    for every node of the expression. Indices are dropped, as NumPy
+    broadcasting reproduces the indexing generated by
+    :meth:`~fipy.variables.variable.Variable._getCstring`.
+
+        >>> from fipy.tools import numerix
+        >>> kernel = _NumpyKernel("result[i] = ((var00[i] * var01[i]) + sin(var1));")
+        >>> result = numerix.empty((3,))
+        >>> args = dict(var00=numerix.array((1., 2., 3.)),
+        ...             var01=numerix.array((4., 5., 6.)),
+        ...             var1=0.5, ni=3)
+        >>> kernel(result=result, **args)
+        >>> print(numerix.allclose(result, (4.479425538604203,
+        ...                                 10.479425538604203,
+        ...                                 18.479425538604203)))
+        True
+
+    Subsequent evaluations write into the planned buffers and, for the
+    final operation, directly into `result`
+
+        >>> args['var1'] = 0.
+        >>> kernel(result=result, **args)
+        >>> print(result)
+        [  4.  10.  18.]
+        >>> print(len(kernel._plans))
+        1
+
+    The planned buffers belong to the thread that planned them, so
+    threads that evaluate the same expression at once, as those of
+    :envvar:`FIPY_ASSEMBLY_THREADS` do, cannot overwrite each other's
+
+        >>> from concurrent.futures import ThreadPoolExecutor
+        >>> def evaluate(n):
+        ...     x = numerix.arange(1000.) * n
+        ...     out = numerix.empty((1000,))
+        ...     for repeat in range(50):
+        ...         kernel(result=out, var00=x, var01=x, var1=0., ni=1000)
+        ...     return numerix.allclose(out, x * x)
+        >>> with ThreadPoolExecutor(max_workers=4) as pool:
+        ...     print(all(pool.map(evaluate, range(16))))
+        True
+        >>> print(len(kernel._plans))
+        1
+
+    and only the plans for the last few sets of argument shapes and
+    types are kept
+
+        >>> for n in range(2 * _NumpyKernel._maxPlans):
+        ...     kernel(result=numerix.empty((n,)), var00=numerix.ones((n,)),
+        ...            var01=numerix.ones((n,)), var1=0., ni=n)
+        >>> print(len(kernel._plans) == _NumpyKernel._maxPlans)
+        True
+
+    Expressions that are not built from ufuncs cannot be compiled
+
+        >>> try:
+        ...     _NumpyKernel("result[i] = _MeshVariable._dot(var0[i], var1[i], index);")
+        ... except _KernelError as e:
+        ...     print(e)
+        Unable to compile `_MeshVariable._dot` as a ufunc
+    """
+
+    _binops = {
+        'Add': 'add',
+        'Sub': 'subtract',
+        'Mult': 'multiply',
+        'Div': 'true_divide',
+        'FloorDiv': 'floor_divide',
+        'Mod': 'remainder',
+        'Pow': 'power',
+        'LShift': 'left_shift',
+        'RShift': 'right_shift',
+        'BitAnd': 'bitwise_and',
+        'BitOr': 'bitwise_or',
+        'BitXor': 'bitwise_xor'
+    }
+
+    _unops = {
+        'UAdd': 'positive',
+        'USub': 'negative',
+        'Invert': 'invert',
+        'Not': 'logical_not'
+    }
+
+    _cmpops = {
+        'Lt': 'less',
+        'LtE': 'less_equal',
+        'Gt': 'greater',
+        'GtE': 'greater_equal',
+        'Eq': 'equal',
+        'NotEq': 'not_equal'
+    }
+
+    # marks the final operation as writing directly into `result`
+    _RESULT = object()
+
+    # the number of plans each thread keeps
+    _maxPlans = 8
+
+    def __init__(self, code_in):
+        self.program = []
+        self.root = self._compile(_parseAssignment(code_in))
+        self._local = threading.local()
+
+    @property
+    def _plans(self):
+        """The plans of the current thread, the most recently used last"""
+        plans = getattr(self._local, 'plans', None)
+        if plans is None:
+            from collections import OrderedDict
+            plans = self._local.plans = OrderedDict()
+        return plans
+
+    @staticmethod
+    def _ufunc(name):
+        from fipy.tools import numerix
+
+        ufunc = getattr(numerix, _numpyNames.get(name, name), None)
+        if not isinstance(ufunc, numerix.ufunc):
+            raise _KernelError("Unable to compile `%s` as a ufunc" % name)
+        return ufunc
+
+    def _emit(self, name, operands):
+        self.program.append((self._ufunc(name), operands))
+        return ('tmp', len(self.program) - 1)
+
+    def _compile(self, node):
+        import ast
+
+        if isinstance(node, ast.Subscript):
+            node = node.value
+
+        kind = node.__class__.__name__
+        if isinstance(node, ast.Name):
+            if node.id in ('True', 'False'):
+                return ('const', node.id == 'True')
+            return ('arg', node.id)
+        elif kind in ('Constant', 'Num', 'NameConstant'):
+            return ('const', getattr(node, 'value', getattr(node, 'n', None)))
+        elif isinstance(node, ast.BinOp) and node.op.__class__.__name__ in self._binops:
+            return self._emit(self._binops[node.op.__class__.__name__],
+                              [self._compile(node.left), self._compile(node.right)])
+        elif isinstance(node, ast.UnaryOp) and node.op.__class__.__name__ in self._unops:
+            return self._emit(self._unops[node.op.__class__.__name__],
+                              [self._compile(node.operand)])
+        elif (isinstance(node, ast.Compare)
+              and len(node.ops) == 1
+              and node.ops[0].__class__.__name__ in self._cmpops):
+            return self._emit(self._cmpops[node.ops[0].__class__.__name__],
+                              [self._compile(node.left), self._compile(node.comparators[0])])
+        elif isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and len(node.keywords) == 0:
+                return self._emit(node.func.id, [self._compile(arg) for arg in node.args])
+            elif isinstance(node.func, ast.Attribute):
+                name = node.func.attr
+                value = node.func.value
+                while isinstance(value, ast.Attribute):
+                    name = value.attr + "." + name
+                    value = value.value
+                name = getattr(value, 'id', '...') + "." + name
+            else:
+                name = getattr(node.func, 'id', '...')
+            raise _KernelError("Unable to compile `%s` as a ufunc" % name)
+        else:
+            raise _KernelError("Unable to compile `%s` node" % kind)
+
+    @staticmethod
+    def _fetch(operand, args, values):
+        kind, value = operand
+        if kind == 'arg':
+            return args[value]
+        elif kind == 'tmp':
+            return values[value]
+        else:
+            return value
+
+    @staticmethod
+    def _signature(result, args):
+        return tuple((name, getattr(value, 'shape', ()), getattr(value, 'dtype', type(value)))
+                     for name, value in sorted(args.items())) + ((result.shape, result.dtype),)
+
+    def _plan(self, result, values):
+        """Assign a buffer to the output of every operation
+
+        The inputs of each operation are released before its output is
+        allocated, so that buffers are reused along the chain.
+        """
+        from fipy.tools import numerix
+
+        free = {}
+        plan = []
+        for n, ((ufunc, operands), value) in enumerate(zip(self.program, values)):
+            for kind, index in operands:
+                if kind == 'tmp' and plan[index] is not None:
+                    key = (values[index].shape, values[index].dtype)
+                    free.setdefault(key, []).append(plan[index])
+
+            if numerix.shape(value) == () or not hasattr(value, 'dtype'):
+                plan.append(None)
+            elif (n == len(self.program) - 1
+                  and value.shape == result.shape and value.dtype == result.dtype):
+                plan.append(self._RESULT)
+            else:
+                key = (value.shape, value.dtype)
+                if len(free.get(key, [])) > 0:
+                    plan.append(free[key].pop())
+                else:
+                    plan.append(numerix.empty(value.shape, value.dtype))
+
+        return plan
+
+    def __call__(self, result, **args):
+        plans = self._plans
+        signature = self._signature(result, args)
+        plan = plans.pop(signature, None)
+        if plan is not None:
+            plans[signature] = plan
+
+        values = []
+        try:
+            if plan is None:
+                for ufunc, operands in self.program:
+                    values.append(ufunc(*[self._fetch(operand, args, values) for operand in operands]))
+            else:
+                for (ufunc, operands), out in zip(self.program, plan):
+                    inputs = [self._fetch(operand, args, values) for operand in operands]
+                    if out is None:
+                        values.append(ufunc(*inputs))
+                    elif out is self._RESULT:
+                        values.append(ufunc(*inputs, out=result))
+                    else:
+                        values.append(ufunc(*inputs, out=out))
+
+            value = self._fetch(self.root, args, values)
+            if value is not result:
+                result[...] = value
+        except (KeyError, TypeError, ValueError) as e:
+            raise _KernelError(str(e))
+
+        if plan is None:
+            plans[signature] = self._plan(result, values)
+            while len(plans) > self._maxPlans:
+                plans.popitem(last=False)
+
+# NumPy names of C math functions, as they may appear in inline code
+_mathNames = {
+    'arcsin': 'asin',
+    'arccos': 'acos',
+    'arctan': 'atan',
+    'arctan2': 'atan2',
+    'arcsinh': 'asinh',
+    'arccosh': 'acosh',
+    'arctanh': 'atanh',
+    'power': 'pow',
+    'absolute': 'fabs'
+}
+
+class _NumbaKernel(object):
+    """Evaluate an inline expression as a loop nest compiled by Numba
+
+    The loops mirror those that :func:`_runInline` wraps around the
+    expression for weave, over flattened, contiguous copies of the
+    arguments.
+
+        >>> from fipy.tools import numerix
+        >>> kernel = _NumbaKernel("result[i + j * ni] = ((var0[i + j * ni] * var1[i]) + fabs(var2));") # doctest: +NUMBA
+        >>> result = numerix.empty((2, 3))
+        >>> kernel(result=result,
+        ...        var0=numerix.array(((1., 2., 3.), (4., 5., 6.))),
+        ...        var1=numerix.array((1., 10., 100.)),
+        ...        var2=-1., ni=3, nj=2) # doctest: +NUMBA
+        >>> print(result) # doctest: +NUMBA
+        [[   2.   21.  301.]
+         [   5.   51.  601.]]
+    """
+
+    def __init__(self, code_in):
+        # validate before handing the code to Numba
+        _parseAssignment(code_in)
+        self.code = code_in.strip().rstrip(';')
+        self.function = None
+
+    def _build(self, names):
+        import math
+        try:
+            import numba
+        except ImportError as e:
+            raise _KernelError(str(e))
+
+        namespace = dict((name, getattr(math, name)) for name in dir(math)
+                         if not name.startswith('_'))
+        namespace.update((name, getattr(math, alias)) for name, alias in _mathNames.items())
+        namespace['pow'] = math.pow
+
+        dimensions = len([n for n in ('ni', 'nj', 'nk') if n in names])
+        lines = ["def kernel(%s):" % ", ".join(names)]
+        indent = "    "
+        for d in "kji"[3 - dimensions:]:
+            lines.append(indent + "for %s in range(n%s):" % (d, d))
+            indent += "    "
+        lines.append(indent + self.code)
+
+        exec(compile("\n".join(lines), "<inline kernel>", "exec"), namespace)
+
+        return numba.njit(namespace['kernel'])
+
+    def __call__(self, result, **args):
+        from fipy.tools import numerix
+
+        names = ['result'] + sorted(args.keys())
+        if self.function is None:
+            self.function = self._build(names)
+
+        flat = result.reshape(-1)
+        if not numerix.may_share_memory(flat, result):
+            flat = numerix.array(flat)
+
+        values = [flat]
+        for name in names[1:]:
+            value = args[name]
+            if hasattr(value, 'shape') and value.shape != ():
+                value = numerix.ascontiguousarray(value).reshape(-1)
+            values.append(value)
+
+        try:
+            self.function(*values)
+        except Exception as e:
+            raise _KernelError(str(e))
+
+        if flat.base is not result and not numerix.may_share_memory(flat, result):
+            result[...] = flat.reshape(result.shape)
+
+_kernels = {}
+
+def _runKernel(code_in, comment=None, **args):
+    """Evaluate a `result[...] = expression;` fragment with `backend`
+
+    Compiled kernels are cached by their code. A fragment that `backend`
+    cannot compile raises :class:`_KernelError`, allowing the caller to
+    fall back to evaluating the expression with NumPy.
+    """
+    key = (backend, code_in)
+    kernel = _kernels.get(key)
+    if kernel is None:
+        try:
+            if backend == 'numba':
+                kernel = _NumbaKernel(code_in)
+            else:
+                kernel = _NumpyKernel(code_in)
+        except _KernelError as e:
+            kernel = e
+        _kernels[key] = kernel
+
+    if isinstance(kernel, _KernelError):
+        raise kernel
+
+    kernel(**args)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
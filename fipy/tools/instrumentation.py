@@ -0,0 +1,437 @@
+"""Record where each step of a simulation spends its time
+
+An :class:`Instrumentation` records, for each step
+
+- the time taken to build the matrix of each class of
+  :class:`~fipy.terms.term.Term`, including and excluding the evaluation
+  of the variables it requires,
+- the time taken to evaluate each
+  :class:`~fipy.variables.variable.Variable`, including and excluding the
+  evaluation of the variables it requires, and
+- for each linear solve, the time spent setting up the solver, *i.e.*,
+  building a preconditioner or factoring the matrix, the time spent
+  solving, the number of iterations, where the solver reports them, and
+  the residual before and after.
+
+Setting the :envvar:`FIPY_INSTRUMENT` environment variable to the name of
+a `.json` or `.csv` file records the whole run, starting a new step at the
+first call to :meth:`~fipy.variables.cellVariable.CellVariable.updateOld`
+after each solve, and writes the report to that file on exit.
+
+While no `Instrumentation` is active, the only cost is a check of an
+empty list at each recorded event.
+"""
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+import csv
+import json
+import os
+import threading
+import time
+import weakref
+
+__all__ = ["Instrumentation"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+# active `Instrumentation` objects, or any other `_Instrument`
+_instruments = []
+
+# time taken by the variables required by each variable being evaluated
+# or term being built, in each thread that builds terms
+_local = threading.local()
+
+def _nested():
+    if not hasattr(_local, 'nested'):
+        _local.nested = []
+    return _local.nested
+
+class _Solve(object):
+    """Record of one linear solve"""
+    def __init__(self, solver):
+        self.solver = solver
+        self.setup = 0.
+        self.seconds = 0.
+        self.iterations = None
+        self.initialResidual = None
+        self.finalResidual = None
+
+    def toDict(self):
+        return dict(solver=self.solver,
+                    setupSeconds=self.setup,
+                    seconds=self.seconds,
+                    iterations=self.iterations,
+                    initialResidual=self.initialResidual,
+                    finalResidual=self.finalResidual)
+
+class _Step(object):
+    """Everything recorded during one step"""
+    def __init__(self):
+        self.start = time.time()
+        self.seconds = None
+        self.terms = {}
+        self.variables = {}
+        self.solves = []
+
+    def toDict(self):
+        return dict(seconds=self.seconds,
+                    terms=self.terms,
+                    variables=self.variables,
+                    solves=[solve.toDict() for solve in self.solves])
+
+class _Labels(object):
+    """Labels of the variables recorded, kept only while each is alive, as
+    the `id` of a collected variable is soon that of another
+
+        >>> from fipy import Variable
+        >>> labels = _Labels()
+        >>> var = Variable(name="kept")
+        >>> print(labels[var])
+        kept
+        >>> var.name = "renamed"
+        >>> print(labels[var])
+        kept
+        >>> del var
+        >>> print(len(labels))
+        0
+    """
+    def __init__(self):
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._labels)
+
+    def __getitem__(self, var):
+        key = id(var)
+        entry = self._labels.get(key)
+        if entry is None or entry[0]() is not var:
+            labels = self._labels
+            lock = self._lock
+
+            def evict(ref, key=key):
+                with lock:
+                    if key in labels and labels[key][0] is ref:
+                        del labels[key]
+
+            entry = (weakref.ref(var, evict), _label(var))
+            with lock:
+                labels[key] = entry
+        return entry[1]
+
+def _label(var):
+    """Name of `var`, or of the operation that computes it"""
+    try:
+        label = var.name
+    except Exception:
+        # some operators cannot be decompiled into a name
+        label = None
+    if not label:
+        label = type(var).__name__
+        if hasattr(var, 'op'):
+            label += "(%s)" % getattr(var.op, '__name__', '')
+    if len(label) > 80:
+        label = label[:77] + "..."
+    return label
+
+class _Instrument(object):
+    """Recipient of the events recorded while active"""
+    def __enter__(self):
+        _instruments.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _instruments.remove(self)
+
+    def _recordTerm(self, term, seconds, own):
+        pass
+
+    def _recordVariable(self, var, value, seconds, own):
+        pass
+
+    def _recordSolve(self, solve):
+        pass
+
+    def _updateOld(self):
+        pass
+
+class Instrumentation(_Instrument):
+    """
+    Record where each step of a simulation spends its time.
+
+    Each `with` block of the instrumentation is one step.
+
+        >>> from fipy import CellVariable, Grid1D, TransientTerm, DiffusionTerm
+        >>> from fipy import ImplicitSourceTerm
+        >>> mesh = Grid1D(nx=10)
+        >>> phi = CellVariable(mesh=mesh, name="phi", hasOld=True)
+        >>> phi.constrain(1., where=mesh.facesLeft)
+        >>> eq = (TransientTerm() == DiffusionTerm(coeff=1 + phi**2)
+        ...       - ImplicitSourceTerm(coeff=phi))
+        >>> instrumentation = Instrumentation()
+        >>> for step in range(3):
+        ...     phi.updateOld()
+        ...     with instrumentation:
+        ...         for sweep in range(2):
+        ...             residual = eq.sweep(var=phi, dt=1.)
+
+    Time was spent building the matrix of each kind of term
+
+        >>> report = instrumentation.report()
+        >>> print(len(report))
+        3
+        >>> print(sorted(report[0]['terms'].keys()))
+        ['DiffusionTerm', 'ImplicitSourceTerm', 'TransientTerm']
+        >>> print(report[0]['terms']['DiffusionTerm']['calls'])
+        2
+
+    and in each solve
+
+        >>> print(len(report[0]['solves']))
+        2
+        >>> solve = report[0]['solves'][1]
+        >>> print(solve['finalResidual'] < solve['initialResidual'])
+        True
+
+    The report can be written as JSON or as a table of comma-separated
+    values
+
+        >>> import io
+        >>> stream = io.StringIO()
+        >>> instrumentation.toCSV(stream)
+        >>> print(stream.getvalue().splitlines()[0])
+        step,category,name,calls,seconds,selfSeconds,setupSeconds,iterations,initialResidual,finalResidual
+    """
+
+    def __init__(self, autoStep=False):
+        """
+        Parameters
+        ----------
+        autoStep : bool
+            If `True`, start a new step at the first call to
+            :meth:`~fipy.variables.cellVariable.CellVariable.updateOld`
+            after a solve, rather than at each `with` block.
+        """
+        self.steps = []
+        self.autoStep = autoStep
+        self._labels = _Labels()
+        # terms and variables are recorded from every thread that builds terms
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.steps.append(_Step())
+        return _Instrument.__enter__(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._finishStep()
+        _Instrument.__exit__(self, exc_type, exc_value, traceback)
+
+    def _finishStep(self):
+        step = self.steps[-1]
+        step.seconds = time.time() - step.start
+
+    def _updateOld(self):
+        with self._lock:
+            if self.autoStep and len(self.steps[-1].solves) > 0:
+                self._finishStep()
+                self.steps.append(_Step())
+
+    def _record(self, category, name, seconds, own):
+        with self._lock:
+            record = getattr(self.steps[-1], category).setdefault(name, dict(calls=0, seconds=0., selfSeconds=0.))
+            record['calls'] += 1
+            record['seconds'] += seconds
+            record['selfSeconds'] += own
+
+    def _recordTerm(self, term, seconds, own):
+        """Record the building of the matrix of `term`
+
+        Terms may be built, and recorded, by several threads at once
+
+            >>> from multiprocessing.pool import ThreadPool
+            >>> from fipy import DiffusionTerm
+            >>> counting = Instrumentation()
+            >>> def build(task):
+            ...     for i in range(1000):
+            ...         counting._recordTerm(DiffusionTerm(), 1., 1.)
+            >>> pool = ThreadPool(4)
+            >>> with counting:
+            ...     output = pool.map(build, range(4))
+            >>> pool.close()
+            >>> print(counting.report()[0]['terms']['DiffusionTerm']['calls'])
+            4000
+        """
+        self._record("terms", type(term).__name__, seconds, own)
+
+    def _recordVariable(self, var, value, seconds, own):
+        """Record the evaluation of `var`
+
+        Each variable is recorded under its own label, even when it is
+        created after another has been collected
+
+            >>> from fipy import CellVariable, Grid1D
+            >>> phi = CellVariable(mesh=Grid1D(nx=10), name="phi")
+            >>> counting = Instrumentation()
+            >>> with counting:
+            ...     for i in range(50):
+            ...         for name, var in (("plus", phi + 1), ("double", 2 * phi)):
+            ...             var.name = name
+            ...             value = var.value
+            >>> variables = counting.report()[0]['variables']
+            >>> print(variables['plus']['calls'], variables['double']['calls'])
+            50 50
+            >>> print(len(counting._labels) <= 2)
+            True
+        """
+        self._record("variables", self._labels[var], seconds, own)
+
+    def _recordSolve(self, solve):
+        with self._lock:
+            self.steps[-1].solves.append(solve)
+
+    def report(self):
+        """The record of each step, as a `list` of `dict`"""
+        return [step.toDict() for step in self.steps]
+
+    def _open(self, stream, mode):
+        if hasattr(stream, 'write'):
+            return stream, False
+        return open(stream, mode), True
+
+    def toJSON(self, stream):
+        """Write the report as JSON to a file name or stream"""
+        stream, close = self._open(stream, 'w')
+        try:
+            json.dump(self.report(), stream, indent=1)
+        finally:
+            if close:
+                stream.close()
+
+    def toCSV(self, stream):
+        """Write the report as comma-separated values to a file name or
+        stream, one row per term class, variable and solve of each step"""
+        stream, close = self._open(stream, 'w')
+        try:
+            writer = csv.writer(stream, lineterminator='\n')
+            writer.writerow(["step", "category", "name", "calls", "seconds", "selfSeconds",
+                             "setupSeconds", "iterations", "initialResidual", "finalResidual"])
+            for index, step in enumerate(self.report()):
+                for name, record in sorted(step['terms'].items()):
+                    writer.writerow([index, "term", name, record['calls'], record['seconds'],
+                                     record['selfSeconds'], "", "", "", ""])
+                for name, record in sorted(step['variables'].items()):
+                    writer.writerow([index, "variable", name, record['calls'], record['seconds'],
+                                     record['selfSeconds'], "", "", "", ""])
+                for solve in step['solves']:
+                    writer.writerow([index, "solve", solve['solver'], 1, solve['seconds'], "",
+                                     solve['setupSeconds'], solve['iterations'],
+                                     solve['initialResidual'], solve['finalResidual']])
+        finally:
+            if close:
+                stream.close()
+
+    def write(self, filename):
+        """Write the report to `filename`, as CSV if it ends in `.csv` and
+        as JSON otherwise"""
+        if filename.lower().endswith('.csv'):
+            self.toCSV(filename)
+        else:
+            self.toJSON(filename)
+
+    def __str__(self):
+        return "%d steps, %d solves" % (len(self.steps),
+                                        sum(len(step.solves) for step in self.steps))
+
+def _calcValue(var):
+    """Evaluate `var`, recording the time it takes"""
+    nested = _nested()
+    nested.append(0.)
+    start = time.time()
+    value = None
+    try:
+        value = var._calcValue()
+        return value
+    finally:
+        seconds = time.time() - start
+        own = seconds - nested.pop()
+        if nested:
+            nested[-1] += seconds
+        for instrument in _instruments:
+            instrument._recordVariable(var, value, seconds, own)
+
+def _buildMatrix(term, *args, **kwargs):
+    """Build the matrix of `term`, recording the time it takes"""
+    nested = _nested()
+    nested.append(0.)
+    start = time.time()
+    try:
+        return term._buildMatrix(*args, **kwargs)
+    finally:
+        seconds = time.time() - start
+        own = seconds - nested.pop()
+        if nested:
+            nested[-1] += seconds
+        for instrument in _instruments:
+            instrument._recordTerm(term, seconds, own)
+
+def _solve(solver):
+    """Solve the system stored in `solver`, recording its progress"""
+    record = _Solve(type(solver).__name__)
+    for instrument in _instruments:
+        instrument._recordSolve(record)
+
+    solver._instrumentedSolve = record
+    record.initialResidual = float(solver._calcResidual())
+    start = time.time()
+    try:
+        solver._solve()
+    finally:
+        record.seconds = time.time() - start
+        solver._instrumentedSolve = None
+    record.finalResidual = float(solver._calcResidual())
+
+def _setup(solver, build):
+    """Set up `solver`, *e.g.*, with `build()` a preconditioner, and record
+    the time it takes"""
+    record = getattr(solver, '_instrumentedSolve', None)
+    if record is None:
+        return build()
+    start = time.time()
+    try:
+        return build()
+    finally:
+        record.setup += time.time() - start
+
+def _iterations(solver, iterations):
+    record = getattr(solver, '_instrumentedSolve', None)
+    if record is not None:
+        record.iterations = int(iterations)
+
+def _updateOld():
+    for instrument in _instruments:
+        instrument._updateOld()
+
+if 'FIPY_INSTRUMENT' in os.environ:
+    import atexit
+
+    def _writeEnvironmentReport(instrumentation, filename):
+        instrumentation.__exit__(None, None, None)
+        from fipy.tools import parallelComm
+        if parallelComm.Nproc > 1:
+            base, ext = os.path.splitext(filename)
+            filename = "%s.%d%s" % (base, parallelComm.procID, ext)
+        instrumentation.write(filename)
+
+    _environmentInstrumentation = Instrumentation(autoStep=True).__enter__()
+    atexit.register(_writeEnvironmentReport,
+                    _environmentInstrumentation, os.environ['FIPY_INSTRUMENT'])
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,310 @@
+"""Find out where a simulation's memory goes
+
+A :class:`MemoryProfile` traces, with :mod:`tracemalloc`, every allocation
+made while it is active, and attributes the memory still held at the end
+to the phase that allocated it, from the :term:`FiPy` frames of the
+allocation's traceback:
+
+`mesh`
+    construction of meshes and their geometry, including the geometry
+    calculated on demand and held in variables, wherever it is requested,
+`evaluation`
+    evaluation of variables,
+`assembly`
+    building of the terms' matrices,
+`solve`
+    the solvers, and
+`other`
+    everything else.
+
+Otherwise, the innermost frame in :term:`FiPy` decides, so that, e.g., the
+evaluation of a coefficient while a matrix is built counts as evaluation.
+
+It also records the peak of the traced memory and, where it can be read,
+the peak resident set size (RSS) of the process, which includes the memory
+of libraries that :mod:`tracemalloc` cannot see, and the size of the
+largest values calculated by variables.
+
+Tracing slows Python down considerably, so profile a few representative
+steps of a simulation, rather than all of them.
+"""
+from __future__ import division
+from __future__ import unicode_literals
+from __future__ import print_function
+__docformat__ = 'restructuredtext'
+
+import os
+import threading
+import weakref
+
+from fipy.tools import instrumentation
+
+__all__ = ["MemoryProfile"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+_fipyDirectory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# phase of allocations made by each subpackage
+_phases = [("meshes", "mesh"),
+           ("variables", "evaluation"),
+           ("terms", "assembly"),
+           ("matrices", "assembly"),
+           ("solvers", "solve")]
+
+def _subpackage(frame):
+    """Subpackage of `fipy` that holds `frame`, if any"""
+    if frame.filename.startswith(_fipyDirectory):
+        return frame.filename[len(_fipyDirectory):].lstrip(os.sep).split(os.sep)[0]
+    return None
+
+def _phase(traceback):
+    """Phase and site of the allocation with `traceback`"""
+    frames = list(reversed(traceback))
+    for frame in frames:
+        if _subpackage(frame) == "meshes":
+            return "mesh", frame
+    for frame in frames:
+        subpackage = _subpackage(frame)
+        for directory, phase in _phases:
+            if subpackage == directory:
+                return phase, frame
+    return "other", frames[0]
+
+def _site(frame):
+    filename = frame.filename
+    if filename.startswith(_fipyDirectory):
+        filename = "fipy" + filename[len(_fipyDirectory):]
+    return "%s:%d" % (filename, frame.lineno)
+
+def _rss():
+    """Resident set size of this process, in bytes, if it can be found"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf(str("SC_PAGE_SIZE"))
+    except (IOError, OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+class _RSSSampler(threading.Thread):
+    """Samples the resident set size until stopped"""
+    def __init__(self, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.peak = _rss()
+        self._finished = threading.Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            self.peak = max(self.peak, _rss())
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+        self.peak = max(self.peak, _rss())
+
+class MemoryProfile(instrumentation._Instrument):
+    """
+    Record where the memory held by a simulation was allocated.
+
+        >>> from fipy import CellVariable, Grid2D, DiffusionTerm
+        >>> with MemoryProfile() as memory:
+        ...     mesh = Grid2D(nx=100, ny=100)
+        ...     phi = CellVariable(mesh=mesh, name="phi")
+        ...     phi.constrain(1., where=mesh.facesLeft)
+        ...     DiffusionTerm(coeff=1 + phi.faceValue).solve(var=phi)
+
+    Each phase holds some memory, and is summarized by its largest
+    allocation sites
+
+        >>> report = memory.report()
+        >>> print(sorted(report['phases'].keys()))
+        ['assembly', 'evaluation', 'mesh', 'other', 'solve']
+        >>> print(report['phases']['mesh']['bytes'] > 0)
+        True
+        >>> print(report['phases']['mesh']['sites'][0]['site'].startswith("fipy"))
+        True
+        >>> print(report['peak'] >= report['phases']['mesh']['bytes'])
+        True
+
+    The largest values are those of the face variables
+
+        >>> print(report['variables'][0]['bytes'] >= mesh.numberOfFaces * 8)
+        True
+    """
+
+    def __init__(self, nframe=25, top=10, interval=0.01):
+        """
+        Parameters
+        ----------
+        nframe : int
+            Number of frames of each traceback to keep. The phase is found
+            from the innermost frame in `fipy`, so this only needs to be
+            large enough to reach it.
+        top : int
+            Number of allocation sites of each phase, and of variables, to
+            report.
+        interval : float
+            Time between samples of the resident set size, in seconds.
+        """
+        self.nframe = nframe
+        self.top = top
+        self.interval = interval
+        self._variables = {}
+        self._collected = []
+        self._lock = threading.Lock()
+        self._report = None
+
+    def __enter__(self):
+        import tracemalloc
+        self._startedTracing = not tracemalloc.is_tracing()
+        if self._startedTracing:
+            tracemalloc.start(self.nframe)
+        self._start = tracemalloc.take_snapshot()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._startTraced = tracemalloc.get_traced_memory()[0]
+        self._startRSS = _rss()
+        self._sampler = None
+        if self._startRSS is not None:
+            self._sampler = _RSSSampler(self.interval)
+            self._sampler.start()
+        self._variables = {}
+        self._collected = []
+        self._report = None
+        return instrumentation._Instrument.__enter__(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        import tracemalloc
+        instrumentation._Instrument.__exit__(self, exc_type, exc_value, traceback)
+        end = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._startedTracing:
+            tracemalloc.stop()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+        # leave out the profile's own allocations, including its sampler's
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                   tracemalloc.Filter(False, __file__, all_frames=True)]
+        differences = end.filter_traces(filters).compare_to(self._start.filter_traces(filters),
+                                                              'traceback')
+
+        phases = {}
+        for phase in ["mesh", "evaluation", "assembly", "solve", "other"]:
+            phases[phase] = dict(bytes=0, blocks=0, sites={})
+        for difference in differences:
+            if difference.size_diff <= 0:
+                continue
+            phase, frame = _phase(difference.traceback)
+            record = phases[phase]
+            record['bytes'] += difference.size_diff
+            record['blocks'] += difference.count_diff
+            site = _site(frame)
+            size, count = record['sites'].get(site, (0, 0))
+            record['sites'][site] = (size + difference.size_diff,
+                                     count + difference.count_diff)
+
+        for record in phases.values():
+            sites = sorted(record['sites'].items(), key=lambda item: -item[1][0])
+            record['sites'] = [dict(site=site, bytes=size, blocks=count)
+                               for site, (size, count) in sites[:self.top]]
+
+        with self._lock:
+            variables = self._collected + [(name, largest)
+                                           for ref, name, largest in self._variables.values()]
+        variables = sorted(variables, key=lambda item: -item[1])
+        self._report = dict(peak=peak - self._startTraced,
+                            startRSS=self._startRSS,
+                            peakRSS=None if self._sampler is None else self._sampler.peak,
+                            phases=phases,
+                            variables=[dict(name=name, bytes=size)
+                                       for name, size in variables[:self.top]])
+        self._start = None
+
+    def _recordVariable(self, var, value, seconds, own):
+        """Record the size of the value of `var`
+
+        The sizes of a variable are kept with a weak reference to it, and
+        set aside when it is collected, so that a variable created later
+        at the same address is recorded as itself
+
+            >>> from fipy import CellVariable, Grid1D
+            >>> phi = CellVariable(mesh=Grid1D(nx=1000), name="phi")
+            >>> with MemoryProfile(top=100) as memory:
+            ...     for i in range(20):
+            ...         for name, var in (("small", phi + 1),
+            ...                           ("big", phi * [[1.], [2.], [3.]])):
+            ...             var.name = name
+            ...             value = var.value
+            >>> from collections import Counter
+            >>> print(sorted(Counter((var['name'], var['bytes'])
+            ...                      for var in memory.report()['variables']).items()))
+            [(('big', 24000), 20), (('small', 8000), 20)]
+        """
+        size = getattr(value, 'nbytes', 0)
+        key = id(var)
+        with self._lock:
+            entry = self._variables.get(key)
+            if entry is not None and entry[0]() is var:
+                self._variables[key] = (entry[0], entry[1], max(entry[2], size))
+                return
+
+        variables = self._variables
+        collected = self._collected
+        lock = self._lock
+        top = self.top
+
+        def setAside(ref, key=key):
+            with lock:
+                entry = variables.get(key)
+                if entry is not None and entry[0] is ref:
+                    del variables[key]
+                    collected.append(entry[1:])
+                    if len(collected) > 2 * top:
+                        collected.sort(key=lambda item: -item[1])
+                        del collected[top:]
+
+        entry = (weakref.ref(var, setAside), instrumentation._label(var), size)
+        with self._lock:
+            self._variables[key] = entry
+
+    def report(self):
+        """The memory held by each phase and the largest variables, as a
+        `dict`, in bytes
+
+        `peak` is the peak of the memory traced, above that at the start,
+        and `startRSS` and `peakRSS` the resident set size at the start and
+        at its peak (or `None`, if it cannot be read).
+        """
+        return self._report
+
+    def __str__(self):
+        report = self.report()
+        if report is None:
+            return "MemoryProfile()"
+        lines = ["peak traced memory: %d B" % report['peak']]
+        if report['peakRSS'] is not None:
+            lines.append("peak RSS: %d B (%+d B)" % (report['peakRSS'],
+                                                     report['peakRSS'] - report['startRSS']))
+        for phase in ["mesh", "evaluation", "assembly", "solve", "other"]:
+            record = report['phases'][phase]
+            lines.append("%s: %d B in %d blocks" % (phase, record['bytes'], record['blocks']))
+            for site in record['sites']:
+                lines.append("  %12d B  %s" % (site['bytes'], site['site']))
+        lines.append("largest variables:")
+        for var in report['variables']:
+            lines.append("  %12d B  %s" % (var['bytes'], var['name']))
+        return "\n".join(lines)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
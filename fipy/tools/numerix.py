@@ -472,6 +472,69 @@ def nearest(data, points, max_mem=1e8):
     [4 5 7 8]
     >>> print(nearest(m0.cellCenters.globalValue, m1.cellCenters.globalValue, max_mem=10000))
     [4 5 7 8]
+
+    Of several equally close points, the first is found
+
+    >>> print(nearest([[0., 1., 2., 3.]], [[1.5, -1., 2.5, 0.5]]))
+    [1 0 2 0]
+    """
+    return _NearestIndex(data, max_mem=max_mem).query(points)
+
+class _NearestIndex(object):
+    """Spatial index of `data` for repeated searches by :func:`nearest`
+
+    A k-d tree is built with :mod:`scipy`, when available, so that each
+    search takes on the order of `log(N)` operations, rather than the
+    `N` distance calculations of the brute-force search used otherwise.
+
+    >>> index = _NearestIndex([[0., 1., 2., 3.],
+    ...                        [0., 0., 0., 1.]])
+    >>> print(index.query([[0.1, 2.9, 0.5],
+    ...                    [0.2, 0.9, 0.]]))
+    [0 3 0]
+    >>> print(index.query([[0.6], [0.]]))
+    [1]
+    """
+    def __init__(self, data, max_mem=1e8):
+        self.data = asanyarray(data)
+        self.max_mem = max_mem
+        self._tree = None
+
+        if _isPhysical(self.data) or self.data.shape[-1] == 0:
+            return
+
+        try:
+            from scipy.spatial import cKDTree
+        except ImportError:
+            pass
+        else:
+            self._tree = cKDTree(NUMERIX.asarray(self.data, dtype=float).T)
+
+    def query(self, points):
+        """Return the indices of `data` that are closest to `points`"""
+        points = asanyarray(points)
+        if self._tree is None or _isPhysical(points):
+            return _bruteForceNearest(self.data, points, max_mem=self.max_mem)
+
+        D, N = self.data.shape
+        if points.shape[-1] == 0:
+            return empty((0,), dtype=INT_DTYPE)
+
+        # query enough neighbors to see every cell center equidistant from
+        # a point on a grid, so that ties resolve to the lowest index, as
+        # for the brute-force search
+        k = min(N, 2**D)
+        distances, indices = self._tree.query(NUMERIX.asarray(points, dtype=float).T, k=k)
+        if k == 1:
+            return indices.astype(INT_DTYPE)
+
+        tied = distances == distances[..., :1]
+        indices = NUMERIX.where(tied, indices, N)
+        return indices.min(axis=-1).astype(INT_DTYPE)
+
+def _bruteForceNearest(data, points, max_mem=1e8):
+    """find the indices of `data` that are closest to `points` by
+    calculating the distance between every pair
     """
     data = asanyarray(data)
     points = asanyarray(points)
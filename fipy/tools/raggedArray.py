@@ -0,0 +1,187 @@
+"""Compressed sparse row storage for ragged connectivity
+
+FiPy meshes describe their connectivity, e.g., the vertices of each face
+or the faces of each cell, as `(maxItemsPerElement, numberOfElements)`
+masked arrays. On meshes that mix element types, most of such an array
+can be padding. A `_RaggedArray` instead keeps the items of every
+element contiguously in one flat array of `indices`, with the items of
+element `i` found at `indices[offsets[i]:offsets[i+1]]`.
+"""
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+__all__ = []
+
+from fipy.tools import numerix
+from fipy.tools.numerix import MA
+
+def _indexType(maximum):
+    """Narrowest integer type able to hold `maximum`"""
+    if maximum < numerix.iinfo(numerix.int32).max:
+        return numerix.int32
+    else:
+        return numerix.int64
+
+class _RaggedArray(object):
+    """Ragged array of integer IDs, e.g., the faces of each cell
+
+        >>> ids = MA.masked_values(((0, 1, 3),
+        ...                         (2, 4, -1),
+        ...                         (5, -1, -1)), -1)
+        >>> ragged = _RaggedArray.fromMasked(ids)
+        >>> print(ragged.offsets)
+        [0 3 5 6]
+        >>> print(ragged.indices)
+        [0 2 5 1 4 3]
+        >>> print(ragged.indices.dtype)
+        int32
+        >>> print(ragged.counts)
+        [3 2 1]
+        >>> print(ragged[1])
+        [1 4]
+        >>> print(ragged.toMasked())
+        [[0 1 3]
+         [2 4 --]
+         [5 -- --]]
+
+    Per-element reductions of values gathered by ID do not materialize
+    the padded array
+
+        >>> print(ragged.sum(numerix.array((1., 2., 3., 4., 5., 6.))))
+        [ 10.   7.   4.]
+
+    The inverse relation, e.g., the cells bounded by each face, is also
+    ragged
+
+        >>> print(ragged.inverted().toMasked())
+        [[0 1 0 2 1 0]]
+        >>> faces = _RaggedArray.fromMasked(((0, 1), (1, 2)))
+        >>> print(faces.inverted().toMasked())
+        [[0 0 1]
+         [-- 1 --]]
+    """
+
+    def __init__(self, offsets, indices, numberOfTargets=None):
+        self.indices = numerix.asarray(indices)
+        self.offsets = numerix.asarray(offsets)
+        self._numberOfTargets = numberOfTargets
+
+    @classmethod
+    def fromMasked(cls, ids, fill=-1):
+        """Build from a `(maxItemsPerElement, numberOfElements)` array
+        whose missing items are masked or equal to `fill`
+        """
+        if isinstance(ids, cls):
+            return ids
+
+        ids = MA.masked_values(ids, fill)
+        mask = MA.getmaskarray(ids)
+        data = MA.filled(ids, fill)
+
+        counts = (~mask).sum(axis=0)
+        offsets = numerix.zeros((len(counts) + 1,), dtype=_indexType(counts.sum()))
+        numerix.cumsum(counts, out=offsets[1:])
+
+        # transpose, so that the items of each element are contiguous
+        indices = data.T[~mask.T]
+        if len(indices) > 0:
+            indices = indices.astype(_indexType(indices.max()))
+        else:
+            indices = indices.astype(numerix.int32)
+
+        return cls(offsets=offsets, indices=indices)
+
+    @property
+    def numberOfElements(self):
+        return len(self.offsets) - 1
+
+    def __len__(self):
+        return self.numberOfElements
+
+    def __getitem__(self, element):
+        return self.indices[self.offsets[element]:self.offsets[element + 1]]
+
+    @property
+    def counts(self):
+        """Number of items of each element"""
+        return numerix.diff(self.offsets)
+
+    @property
+    def maxCount(self):
+        if self.numberOfElements == 0:
+            return 0
+        return int(self.counts.max())
+
+    @property
+    def numberOfTargets(self):
+        """Number of distinct objects the IDs can refer to"""
+        if self._numberOfTargets is None:
+            if len(self.indices) == 0:
+                return 0
+            return int(self.indices.max()) + 1
+        return self._numberOfTargets
+
+    @property
+    def elementIDs(self):
+        """The element of each item in `indices`"""
+        return numerix.repeat(numerix.arange(self.numberOfElements,
+                                             dtype=self.indices.dtype),
+                              self.counts)
+
+    @property
+    def positions(self):
+        """The position of each item of `indices` within its element"""
+        return (numerix.arange(len(self.indices), dtype=self.offsets.dtype)
+                - numerix.repeat(self.offsets[:-1], self.counts))
+
+    @property
+    def nbytes(self):
+        return self.indices.nbytes + self.offsets.nbytes
+
+    def toMasked(self, maxCount=None):
+        """Materialize as a `(maxCount, numberOfElements)` masked array"""
+        if maxCount is None:
+            maxCount = self.maxCount
+        data = numerix.empty((maxCount, self.numberOfElements), dtype=numerix.INT_DTYPE)
+        data.fill(-1)
+        data[self.positions, self.elementIDs] = self.indices
+        return MA.masked_values(data, -1)
+
+    def sum(self, values):
+        """Sum `values` over the items of each element
+
+        `values` are indexed by ID along their last axis.
+        """
+        values = numerix.asarray(values)
+        result = numerix.zeros(values.shape[:-1] + (self.numberOfElements,),
+                               dtype=values.dtype)
+        nonempty = self.counts > 0
+        if len(self.indices) > 0:
+            gathered = numerix.take(values, self.indices, axis=-1)
+            result[..., nonempty] = numerix.add.reduceat(gathered,
+                                                         self.offsets[:-1][nonempty],
+                                                         axis=-1)
+        return result
+
+    def inverted(self, numberOfTargets=None):
+        """The elements that refer to each target, in ascending order"""
+        if numberOfTargets is None:
+            numberOfTargets = self.numberOfTargets
+
+        order = numerix.argsort(self.indices, kind='stable')
+        counts = numerix.bincount(self.indices, minlength=numberOfTargets)
+        offsets = numerix.zeros((numberOfTargets + 1,), dtype=self.offsets.dtype)
+        numerix.cumsum(counts, out=offsets[1:])
+
+        return _RaggedArray(offsets=offsets,
+                            indices=self.elementIDs[order],
+                            numberOfTargets=self.numberOfElements)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -0,0 +1,154 @@
+"""Parameter sweeps on a pool of processes
+
+Runs a model for each set of parameters of a sweep on a pool of worker
+processes and streams the results back as they finish. The mesh is built
+once, by the caller, and handed to each worker once, rather than once per
+run. Where processes can be forked, the workers simply inherit the mesh,
+with its geometry already calculated, and the imported `fipy`, so
+neither is pickled nor imported again; the operating system shares the
+geometry arrays among the workers until they are modified.
+"""
+from __future__ import unicode_literals
+__docformat__ = 'restructuredtext'
+
+import itertools
+import multiprocessing
+import os
+
+__all__ = ["sweep", "parameterGrid"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+def parameterGrid(**axes):
+    """Every combination of the values given for each parameter
+
+        >>> for parameters in parameterGrid(D=(1., 2.), k=(0., 3.)):
+        ...     print(sorted(parameters.items()))
+        [('D', 1.0), ('k', 0.0)]
+        [('D', 1.0), ('k', 3.0)]
+        [('D', 2.0), ('k', 0.0)]
+        [('D', 2.0), ('k', 3.0)]
+
+    Parameters
+    ----------
+    **axes : iterable
+        The values to sweep for each named parameter.
+    """
+    names = sorted(axes.keys())
+    for values in itertools.product(*[axes[name] for name in names]):
+        yield dict(zip(names, values))
+
+# model and mesh of the sweep run by this worker process
+_run = None
+_mesh = None
+
+def _initialize(run, mesh):
+    global _run, _mesh
+    _run = run
+    _mesh = mesh
+
+def _task(args):
+    index, parameters, path = args
+    result = _run(_mesh, **parameters)
+    if path is not None:
+        from fipy.tools import dump
+        filename = os.path.join(path, "run%d.gz" % index)
+        dump.write(result, filename=filename)
+        result = filename
+    return index, parameters, result
+
+def _context():
+    """Forked workers inherit the caller's imports and mesh"""
+    try:
+        return multiprocessing.get_context('fork')
+    except (AttributeError, ValueError):
+        # either Python 2, which forks where it can, or no fork at all
+        return multiprocessing
+
+def sweep(run, parameters, mesh=None, processes=None, path=None):
+    """Run a model for each set of parameters on a pool of processes
+
+    Each run solves its own problem on the shared `mesh`
+
+        >>> from fipy import Grid1D, CellVariable, DiffusionTerm, ImplicitSourceTerm
+        >>> from fipy.tools import numerix
+        >>> def run(mesh, k):
+        ...     phi = CellVariable(mesh=mesh)
+        ...     phi.constrain(1., where=mesh.facesLeft)
+        ...     (DiffusionTerm() == ImplicitSourceTerm(k)).solve(var=phi)
+        ...     return phi.value
+
+    and results arrive in the order the runs finish
+
+        >>> mesh = Grid1D(nx=100, dx=0.01)
+        >>> x = mesh.cellCenters[0]
+        >>> for index, parameters, phi in sorted(sweep(run, parameterGrid(k=(1., 4., 9.)),
+        ...                                            mesh=mesh, processes=2)):
+        ...     k = parameters['k']
+        ...     analytical = numerix.cosh(numerix.sqrt(k) * (1 - x)) / numerix.cosh(numerix.sqrt(k))
+        ...     print(index, k, numerix.allclose(phi, analytical, atol=1e-3))
+        0 1.0 True
+        1 4.0 True
+        2 9.0 True
+
+    Large results can instead be written with :func:`~fipy.tools.dump.write`
+    by the workers, which then only return the file names
+
+        >>> import tempfile, shutil
+        >>> from fipy.tools import dump
+        >>> path = tempfile.mkdtemp()
+        >>> results = dict((index, filename) for index, parameters, filename
+        ...                in sweep(run, [dict(k=1.), dict(k=4.)], mesh=mesh, path=path))
+        >>> print(os.path.basename(results[1]))
+        run1.gz
+        >>> print(numerix.allclose(dump.read(results[1]),
+        ...                        numerix.cosh(2 * (1 - x)) / numerix.cosh(2), atol=1e-3))
+        True
+        >>> shutil.rmtree(path)
+
+    Parameters
+    ----------
+    run : callable
+        Called as `run(mesh, **parameters)` for each set of `parameters`;
+        returns a picklable result. Return values, rather than
+        variables, to avoid sending the mesh back with each result.
+    parameters : iterable of dict
+        The keyword arguments of each run, e.g., from
+        :func:`parameterGrid`.
+    mesh : ~fipy.meshes.mesh.Mesh
+        Built once and shared by every run.
+    processes : int
+        Number of worker processes. Defaults to the number of CPUs.
+    path : str
+        If given, each result is dumped to `path/run<index>.gz` and its
+        file name is returned in its place.
+
+    Returns
+    -------
+    generator
+        Yields `(index, parameters, result)` for each run, where `index`
+        is the position of `parameters` in the sweep, as soon as the run
+        finishes.
+    """
+    if path is not None and not os.path.exists(path):
+        os.makedirs(path)
+
+    tasks = [(index, dict(p), path) for index, p in enumerate(parameters)]
+
+    pool = _context().Pool(processes=processes,
+                           initializer=_initialize,
+                           initargs=(run, mesh))
+    try:
+        for result in pool.imap_unordered(_task, tasks):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
@@ -10,6 +10,11 @@ def _suite():
             'numerix',
             'dump',
             'vector',
+            'inline',
+            'raggedArray',
+            'sweep',
+            'instrumentation',
+            'memory',
         ), base = __name__)
 
     return theSuite
@@ -3,6 +3,7 @@ __docformat__ = 'restructuredtext'
 
 from fipy.variables.meshVariable import _MeshVariable
 from fipy.tools import numerix
+from fipy.tools import instrumentation
 from fipy.tools.decorators import deprecate
 
 __all__ = ["CellVariable"]
@@ -135,9 +136,10 @@ class CellVariable(_MeshVariable):
 
     def __call__(self, points=None, order=0, nearestCellIDs=None):
         r"""
-        Interpolates the `CellVariable` to a set of points using a
-        method that has a memory requirement on the order of `Ncells` by
-        `Npoints` in general, but uses only `Ncells` when the
+        Interpolates the `CellVariable` to a set of points, from the value
+        (`order=0`) or the value and gradient (`order=1`) in the nearest
+        cell. The nearest cells are found with a spatial index of the cell
+        centers that the mesh builds once and reuses, or directly when the
         `CellVariable`'s mesh is a `UniformGrid` object.
 
         Tests
@@ -469,6 +471,8 @@ class CellVariable(_MeshVariable):
             raise AssertionError('The updateOld method requires the CellVariable to have an old value. Set hasOld to True when instantiating the CellVariable.')
         else:
             self._old.value = self.value.copy()
+            if instrumentation._instruments:
+                instrumentation._updateOld()
 
     def _resetToOld(self):
         if self._old is not None:
@@ -649,8 +653,22 @@ class CellVariable(_MeshVariable):
         """
 
 class _ReMeshedCellVariable(CellVariable):
-    def __init__(self, oldVar, newMesh):
-        newValues = oldVar.getValue(points = newMesh.cellCenters)
+    """Interpolation of `oldVar` onto the cells of `newMesh`
+
+        >>> from fipy import *
+        >>> m0 = Grid2D(dx=(1., 1., 1.), dy=(1., 1.))
+        >>> v0 = CellVariable(mesh=m0, value=m0.cellCenters[0], name="v")
+        >>> m1 = Grid2D(dx=(.5,) * 6, dy=(1.,))
+        >>> v1 = _ReMeshedCellVariable(v0, m1)
+        >>> print(v1.name)
+        v
+        >>> print(v1)
+        [ 0.5  0.5  1.5  1.5  2.5  2.5]
+        >>> print(_ReMeshedCellVariable(v0, m1, order=1))
+        [ 0.375  0.625  1.25   1.75   2.375  2.625]
+    """
+    def __init__(self, oldVar, newMesh, order=0):
+        newValues = oldVar(points=newMesh.cellCenters.globalValue, order=order)
         CellVariable.__init__(self, newMesh, name = oldVar.name, value = newValues, unit = oldVar.unit)
 
 def _test():
@@ -0,0 +1,370 @@
+"""Optimization of the graph of `_OperatorVariable` objects
+
+The first time an `_OperatorVariable` is evaluated, the expression it
+heads is rewritten once:
+
+- structurally identical subexpressions, within the expression or
+  among any other optimized expressions, are replaced by a single
+  node, which caches its value once it is shared (hash-consing),
+- operations on nothing but constants are evaluated and replaced by
+  the resulting constant, and
+- chains of uncached, element-wise operations are fused into a single
+  function of their inputs, evaluated without visiting each node.
+
+Setting :envvar:`FIPY_NO_GRAPH_OPTIMIZATION` leaves expressions as they
+are built.
+"""
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+__all__ = []
+
+import os
+import threading
+import weakref
+
+from fipy.tools import numerix
+
+# whether expressions are optimized at all
+_enabled = 'FIPY_NO_GRAPH_OPTIMIZATION' not in os.environ
+
+# canonical node for each structural key of every optimized expression
+_canonicalNodes = weakref.WeakValueDictionary()
+
+# guards `_canonicalNodes` and the rewriting of expressions, which may be
+# evaluated by the threads that build terms
+_lock = threading.RLock()
+
+def _isOperator(var):
+    return hasattr(var, 'op') and hasattr(var, 'var')
+
+def _isConstant(var):
+    from fipy.variables.constant import _Constant
+    return isinstance(var, _Constant)
+
+def _hashable(obj):
+    """Return a hashable key that compares equal for equal values of `obj`
+
+        >>> _hashable(2) == _hashable(2)
+        True
+        >>> _hashable(2) == _hashable(2.)
+        False
+        >>> _hashable(numerix.array((1., 2.))) == _hashable(numerix.array((1., 2.)))
+        True
+    """
+    if isinstance(obj, numerix.ndarray):
+        return ('array', obj.dtype.str, obj.shape, obj.tobytes())
+    try:
+        hash(obj)
+    except TypeError:
+        return ('id', id(obj))
+    else:
+        return ('value', type(obj), obj)
+
+def _operatorKey(op):
+    """Key that is equal for operations that always give the same result
+
+    The objects a function closes over, or takes as defaults, are
+    identified by identity, as they may be mutable. Both functions keep
+    them alive, so their identities cannot be reused while the key is.
+
+        >>> def scaleBy(factor):
+        ...     return lambda a: a * factor
+        >>> _operatorKey(scaleBy(2)) == _operatorKey(scaleBy(2))
+        True
+        >>> f, g = scaleBy([2]), scaleBy([2])
+        >>> _operatorKey(f) == _operatorKey(g)
+        False
+    """
+    if isinstance(op, numerix.ufunc) or not hasattr(op, '__code__'):
+        return ('function', _hashable(op))
+
+    closure = tuple(id(cell.cell_contents) for cell in (op.__closure__ or ()))
+    defaults = tuple(id(default) for default in (op.__defaults__ or ()))
+    return ('code', op.__code__, id(op.__globals__), closure, defaults)
+
+def _structuralKey(var):
+    """Key that is equal for variables that always evaluate to the same value
+    """
+    if _isOperator(var):
+        return (type(var).__name__,
+                var._variableClass,
+                id(getattr(var, 'mesh', None)),
+                _operatorKey(var.op),
+                tuple(var.opShape),
+                _hashable(var._unit),
+                tuple(var.valueMattersForUnit),
+                tuple(_childKey(child) for child in var.var))
+    else:
+        return _childKey(var)
+
+def _childKey(var):
+    if _isConstant(var) and isinstance(var._value, (numerix.ndarray, int, float, complex)):
+        return ('constant', _hashable(var._value))
+    elif _isOperator(var) and getattr(var, '_graph', None) is not None:
+        return ('operator', id(var))
+    else:
+        return ('variable', id(var))
+
+def _replaceChild(parent, index, new):
+    old = parent.var[index]
+    parent.var[index] = new
+
+    if not any(v is old for v in parent.var):
+        parent.requiredVariables = [v for v in parent.requiredVariables if v is not old]
+        old.subscribedVariables = [ref for ref in old.subscribedVariables if ref() is not parent]
+
+    parent._requires(new)
+
+def _shareable(var):
+    """Whether caching `var` leaves its value unchanged"""
+    from fipy.variables.variable import Variable
+    return (_isOperator(var)
+            and len(var.constraints) == 0
+            and getattr(type(var), '_setValueInternal', None) is Variable._setValueInternal)
+
+def _foldable(var):
+    return (_isOperator(var)
+            and all(_isConstant(child) and child.unit.isDimensionless() for child in var.var))
+
+def _optimize(root):
+    """Rewrite the expression headed by `root`
+
+    Children of each operator are optimized first, so that identical
+    subexpressions are recognized from the bottom up.
+
+        >>> from fipy.variables.variable import Variable
+        >>> x = Variable(value=(1., 2., 3.))
+        >>> a = (x * x + 1) * (x * x + 1)
+        >>> print(a.var[0] is a.var[1])
+        False
+        >>> print(a)
+        [   4.   25.  100.]
+        >>> print(a.var[0] is a.var[1])
+        True
+
+    The shared subexpression is now cached, so it is evaluated once and
+    kept up to date
+
+        >>> print(a.var[0]._isCached())
+        True
+        >>> x.value = (0., 1., 2.)
+        >>> print(a)
+        [  1.   4.  25.]
+
+    Identical expressions built independently share their evaluation
+
+        >>> b = x * x + 1
+        >>> print(b)
+        [ 1.  2.  5.]
+        >>> print(b._graph.alias is a.var[0])
+        True
+
+    Operations on constants are evaluated once
+
+        >>> from fipy.variables.constant import _Constant
+        >>> c = x * (_Constant(value=3.) * 4.)
+        >>> print(c)
+        [  0.  12.  24.]
+        >>> print(c.var[1])
+        12.0
+
+    Nothing is rewritten when optimization is switched off
+
+        >>> from fipy.variables import expressionGraph
+        >>> expressionGraph._enabled = False
+        >>> d = (x * x + 1) * (x * x + 1)
+        >>> print(d)
+        [  1.   4.  25.]
+        >>> print(d.var[0] is d.var[1], getattr(d, '_graph', None))
+        False None
+        >>> expressionGraph._enabled = True
+    """
+    graph = getattr(root, '_graph', None)
+    if graph is not None:
+        return graph
+
+    with _lock:
+        return _optimizeLocked(root)
+
+def _optimizeLocked(root):
+    graph = getattr(root, '_graph', None)
+    if graph is not None:
+        # optimized by another thread in the meantime
+        return graph
+
+    graph = _rewrite(root)
+
+    if _foldable(root):
+        root.cacheMe()
+    elif _shareable(root):
+        canonical = _canonicalNodes.setdefault(_structuralKey(root), root)
+        if canonical is not root:
+            graph.alias = canonical
+            canonical.cacheMe()
+            root._requires(canonical)
+
+    return graph
+
+def _rewrite(root):
+    """Fold and hash-cons the operands of `root`, from the bottom up"""
+    graph = _Graph(root)
+    root._graph = graph
+
+    for index, child in enumerate(root.var):
+        if not _isOperator(child):
+            continue
+
+        if getattr(child, '_graph', None) is None:
+            _rewrite(child)
+
+        if _foldable(child):
+            from fipy.variables.constant import _Constant
+            _replaceChild(root, index, _Constant(value=child.value))
+            continue
+
+        if _shareable(child):
+            canonical = _canonicalNodes.setdefault(_structuralKey(child), child)
+            if canonical is not child:
+                # `canonical` now has several subscribers, so it caches itself
+                _replaceChild(root, index, canonical)
+
+    return graph
+
+class _Graph(object):
+    """The optimized evaluation of an `_OperatorVariable`
+
+    Holds either an `alias`, an identical expression whose (cached)
+    value is used instead, or a fused function of the `inputs` of the
+    chain of uncached, element-wise operations headed by `root`.
+    """
+    def __init__(self, root):
+        self.root = weakref.ref(root)
+        self.alias = None
+        self.function = None
+        self.inputs = []
+        self.interior = []
+        self._fused = False
+
+    def _fusable(self, var):
+        return (_isOperator(var)
+                and var.canInline
+                and not var._isCached()
+                and len(var.constraints) == 0
+                and len(var.var) in (1, 2))
+
+    def _build(self, var):
+        if var is self.root() or self._fusable(var):
+            if var is not self.root():
+                self.interior.append(var)
+            op = var.op
+            args = [self._build(child) for child in var.var]
+            if len(args) == 1:
+                arg0, = args
+                return lambda values: op(arg0(values))
+            else:
+                arg0, arg1 = args
+                return lambda values: op(arg0(values), arg1(values))
+        else:
+            index = len(self.inputs)
+            self.inputs.append(var)
+            return lambda values: values[index]
+
+    def fuse(self):
+        """Build the fused function, if there is anything to fuse"""
+        self._fused = True
+        self.inputs = []
+        self.interior = []
+        root = self.root()
+        if root.canInline:
+            function = self._build(root)
+            if len(self.interior) > 0:
+                self.function = function
+                return
+        self.function = None
+        self.interior = []
+        self.inputs = []
+
+    @property
+    def fused(self):
+        """Whether the fused function (still) applies"""
+        with _lock:
+            if not self._fused:
+                self.fuse()
+            elif self.function is not None and any(var._isCached() for var in self.interior):
+                # a fused operation has since become shared, so stop recomputing it
+                self.fuse()
+            return self.function is not None
+
+    def evaluate(self):
+        if self.alias is not None:
+            return self.alias.value
+
+        with _lock:
+            function, inputs, interior = self.function, list(self.inputs), list(self.interior)
+
+        value = function([var.value for var in inputs])
+        from fipy.variables.variable import Variable
+        for var in interior:
+            # as though each fused operation had been evaluated, uncached
+            var._value = None
+            var.stale = 0
+            for counter in Variable._recomputeCounters:
+                counter._count(var)
+        return value
+
+def _explain(var, graph=None, indent="", seen=None):
+    """Describe the optimized graph of `var`, one node per line
+
+    Operations fused into the kernel of an enclosing `graph` are tagged
+    "fused". A shared operation is only expanded where it first appears.
+    """
+    if seen is None:
+        seen = []
+
+    if _isOperator(var):
+        description = var._getRepresentation(style="name")
+    else:
+        description = var.name or repr(var)
+
+    if _isConstant(var):
+        return indent + description + "  [constant]"
+    elif not _isOperator(var):
+        return indent + description + "  [input]"
+
+    if graph is not None and any(var is v for v in graph.interior):
+        tags = ["fused"]
+    elif not _enabled:
+        tags = ["cached"] if var._isCached() and graph is not None else []
+        graph = _Graph(var)
+    else:
+        top = (graph is None)
+        graph = _optimize(var)
+        tags = []
+        if var._isCached() and not top:
+            tags.append("cached")
+        if graph.alias is not None:
+            tags.append("alias")
+        elif graph.fused:
+            tags.append("fused kernel")
+
+    if any(var is v for v in seen):
+        return indent + description + "  [" + ", ".join(tags + ["see above"]) + "]"
+    seen.append(var)
+
+    lines = [indent + description + "  [" + (", ".join(tags) or "operator") + "]"]
+    if graph.alias is not None and graph.root() is var:
+        lines.append(_explain(graph.alias, graph=graph, indent=indent + "    ", seen=seen))
+    else:
+        for child in var.var:
+            lines.append(_explain(child, graph=graph, indent=indent + "    ", seen=seen))
+
+    return "\n".join(lines)
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
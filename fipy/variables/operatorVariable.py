@@ -24,6 +24,7 @@ def _OperatorVariableClass(baseClass=object):
             else:
                 self.valueMattersForUnit = valueMattersForUnit
             self.canInline = canInline  #allows for certain functions to opt out of --inline
+            self._graph = None
             baseClass.__init__(self, value=None, *args, **kwargs)
             self.name = ''
             for var in self.var:    #C does not accept units
@@ -45,14 +46,28 @@ def _OperatorVariableClass(baseClass=object):
             raise TypeError("The value of an `_OperatorVariable` cannot be assigned")
 
         def _calcValue(self):
-            if not self.canInline:
-                return self._calcValue_()
+            from fipy.variables import expressionGraph
+            if expressionGraph._enabled:
+                graph = expressionGraph._optimize(self)
             else:
+                graph = None
+            if graph is not None and graph.alias is not None:
+                return graph.evaluate()
+
+            if self.canInline:
                 from fipy.tools import inline
-                if inline.doInline:
-                    return self._execInline(comment=self.comment)
-                else:
-                    return self._calcValue_()
+                if inline.backend is not None:
+                    try:
+                        return self._execInline(comment=self.comment)
+                    except (inline._KernelError, SyntaxError):
+                        # this expression cannot be compiled by the
+                        # inline backend, so stick with NumPy
+                        self.canInline = False
+
+            if graph is not None and graph.fused:
+                return graph.evaluate()
+            else:
+                return self._calcValue_()
 
         def _calcValue_(self):
             pass
@@ -67,7 +82,7 @@ def _OperatorVariableClass(baseClass=object):
             else:
                 s = baseClass._getCstring(self, argDict=argDict, id=id)
             if freshen:
-                self._markFresh()
+                self.stale = 0
 
             return s
 
@@ -195,9 +210,13 @@ def _OperatorVariableClass(baseClass=object):
 
         def _py3kInstructions(self, instructions, style, argDict, id, freshen):
             stack = []
-            
+            kwnames = ()
+
             for ins in instructions:
-                if ins.opname == 'UNARY_CONVERT':
+                if ins.opname in ('RESUME', 'PRECALL', 'PUSH_NULL', 'NOP', 'CACHE'):
+                    # bookkeeping instructions of Python >= 3.11
+                    continue
+                elif ins.opname == 'UNARY_CONVERT':
                     stack.append("`" + stack.pop() + "`")
                 elif ins.opname == 'BINARY_SUBSCR':
                     stack.append(stack.pop(-2) + "[" + stack.pop() + "]")
@@ -209,10 +228,13 @@ def _OperatorVariableClass(baseClass=object):
                         return s
                 elif ins.opname == 'LOAD_CONST':
                     stack.append(ins.argval)
-                elif ins.opname == 'LOAD_ATTR':
+                elif ins.opname in ('LOAD_ATTR', 'LOAD_METHOD'):
                     stack.append(stack.pop() + "." + ins.argval)
                 elif ins.opname == 'COMPARE_OP':
-                    stack.append(stack.pop(-2) + " " + dis.cmp_op[ins.arg] + " " + stack.pop())
+                    stack.append(stack.pop(-2) + " " + ins.argrepr + " " + stack.pop())
+                elif ins.opname == 'BINARY_OP':
+                    # Python >= 3.11 folds all binary operators into one instruction
+                    stack.append(stack.pop(-2) + " " + ins.argrepr + " " + stack.pop())
                 elif ins.opname == 'LOAD_GLOBAL':
                     stack.append(ins.argval)
                 elif ins.opname == 'LOAD_FAST':
@@ -221,6 +243,17 @@ def _OperatorVariableClass(baseClass=object):
                     # args are last ins.arg items on stack
                     args, stack = stack[-ins.arg:], stack[:-ins.arg]
                     stack.append(stack.pop() + "(" + ", ".join(args) + ")")
+                elif ins.opname == 'KW_NAMES':
+                    kwnames = self.op.__code__.co_consts[ins.arg]
+                elif ins.opname == 'CALL':
+                    # Python >= 3.11: positional arguments followed by the
+                    # values of any keywords named by a preceding `KW_NAMES`
+                    args, stack = stack[len(stack) - ins.arg:], stack[:len(stack) - ins.arg]
+                    kwargs = []
+                    for kw in reversed(kwnames):
+                        kwargs.insert(0, kw + "=" + args.pop())
+                    kwnames = ()
+                    stack.append(stack.pop() + "(" + ", ".join(args + kwargs) + ")")
                 elif ins.opname == 'CALL_FUNCTION_KW':
                     kws = list(stack.pop())
                     # args are last ins.arg items on stack
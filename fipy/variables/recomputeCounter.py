@@ -0,0 +1,79 @@
+from __future__ import division
+from __future__ import unicode_literals
+from builtins import object
+__docformat__ = 'restructuredtext'
+
+__all__ = ["RecomputeCounter"]
+from future.utils import text_to_native_str
+__all__ = [text_to_native_str(n) for n in __all__]
+
+from fipy.variables.variable import Variable
+
+class RecomputeCounter(object):
+    """
+    Count how many :class:`~fipy.variables.variable.Variable` objects
+    are recomputed in each step of a simulation.
+
+    Each `with` block of the counter is one step.
+
+        >>> from fipy import CellVariable, Grid1D
+        >>> mesh = Grid1D(nx=3)
+        >>> phase = CellVariable(mesh=mesh, value=(0.1, 0.5, 0.9))
+        >>> energy = phase**2 * (1 - phase)**2
+        >>> energy.cacheMe()
+        >>> counter = RecomputeCounter()
+        >>> for step in range(3):
+        ...     with counter:
+        ...         if step != 1:
+        ...             phase.value = phase.value / 2
+        ...         print(energy)
+        [ 0.00225625  0.03515625  0.06125625]
+        [ 0.00225625  0.03515625  0.06125625]
+        [ 0.00059414  0.01196289  0.03040664]
+        >>> print(counter.steps) # doctest: +NOT_INLINE
+        [5, 0, 5]
+
+    Nothing that `energy` requires changed in the second step, so
+    nothing was recomputed. The counts are also broken down by class
+
+        >>> print(counter.total) # doctest: +NOT_INLINE
+        10
+        >>> print(sorted(counter.counts.items())) # doctest: +NOT_INLINE
+        [('binOp', 8), ('unOp', 2)]
+        >>> print(counter) # doctest: +NOT_INLINE
+        3 steps, 10 recomputations (3.33 per step)
+    """
+
+    def __init__(self):
+        self.steps = []
+        self.counts = {}
+
+    def __enter__(self):
+        self.steps.append(0)
+        Variable._recomputeCounters.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        Variable._recomputeCounters.remove(self)
+
+    def _count(self, var):
+        self.steps[-1] += 1
+        name = type(var).__name__
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @property
+    def total(self):
+        """Number of recomputations in all steps"""
+        return sum(self.steps)
+
+    def __str__(self):
+        return "%d steps, %d recomputations (%.3g per step)" % (len(self.steps),
+                                                                self.total,
+                                                                self.total / max(len(self.steps), 1))
+
+def _test():
+    import fipy.tests.doctestPlus
+    return fipy.tests.doctestPlus.testmod()
+
+if __name__ == "__main__":
+    _test()
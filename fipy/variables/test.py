@@ -15,6 +15,7 @@ def _suite():
             'fipy.variables.cellVariable',
             'fipy.variables.faceVariable',
             'fipy.variables.operatorVariable',
+            'fipy.variables.expressionGraph',
             'fipy.variables.betaNoiseVariable',
             'fipy.variables.exponentialNoiseVariable',
             'fipy.variables.gammaNoiseVariable',
@@ -31,7 +32,8 @@ def _suite():
             'fipy.variables.surfactantConvectionVariable',
             'fipy.variables.surfactantVariable',
             'fipy.variables.levelSetDiffusionVariable',
-            'fipy.variables.distanceVariable'
+            'fipy.variables.distanceVariable',
+            'fipy.variables.recomputeCounter'
         ))
 
 if __name__ == '__main__':
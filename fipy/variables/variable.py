@@ -5,12 +5,15 @@ from builtins import str
 from future.utils import string_types
 __docformat__ = 'restructuredtext'
 
+import contextlib
 import os
+import threading
 
 from fipy.tools.dimensions import physicalField
 from fipy.tools import numerix
 from fipy.tools import parser
 from fipy.tools import inline
+from fipy.tools import instrumentation
 
 __all__ = ["Variable"]
 from future.utils import text_to_native_str
@@ -48,6 +51,9 @@ class Variable(object):
 
     _cacheNever = False
 
+    # active `RecomputeCounter` objects
+    _recomputeCounters = []
+
     def __new__(cls, *args, **kwds):
         return object.__new__(cls)
 
@@ -441,6 +447,36 @@ class Variable(object):
                                 suppress_small=suppress_small,
                                 separator=separator)
 
+    def explain(self):
+        """
+        Print the graph of operations that evaluates the `Variable`, as
+        optimized when it is first evaluated.
+
+            >>> x = Variable(name="x", value=(1., 2., 3.))
+            >>> y = Variable(name="y", value=(4., 5., 6.))
+            >>> a = (x * x + 1) * (x * x + 1) * y - 2 * 3
+            >>> a.explain()
+            (((((x * x) + _Constant(...)) * ((x * x) + _Constant(...))) * y) - _Constant(...))  [fused kernel]
+                ((((x * x) + _Constant(...)) * ((x * x) + _Constant(...))) * y)  [fused]
+                    (((x * x) + _Constant(...)) * ((x * x) + _Constant(...)))  [fused]
+                        ((x * x) + _Constant(...))  [cached, fused kernel]
+                            (x * x)  [fused]
+                                x  [input]
+                                x  [input]
+                            1  [constant]
+                        ((x * x) + _Constant(...))  [cached, fused kernel, see above]
+                    y  [input]
+                6  [constant]
+            >>> print(a)
+            [  10.  119.  594.]
+
+        Identical subexpressions are evaluated once and cached, constants
+        are folded, and the remaining chain of element-wise operations is
+        evaluated as a single fused kernel.
+        """
+        from fipy.variables import expressionGraph
+        print(expressionGraph._explain(self))
+
     def __setitem__(self, index, value):
         if self._value is None:
             self._getValue()
@@ -489,15 +525,15 @@ class Variable(object):
 
         """
 
-        if self.stale or not self._isCached() or self._value is None:
-            value = self._calcValue()
-            if self._isCached():
-                self._setValueInternal(value=value)
-            else:
-                self._setValueInternal(value=None)
-            self._markFresh()
+        if Variable._concurrency:
+            # one thread at a time evaluates, and caches, a `Variable`
+            lock = self.__dict__.get('_evaluationLock')
+            if lock is None:
+                lock = self.__dict__.setdefault('_evaluationLock', threading.RLock())
+            with lock:
+                value = self._evaluate(version=self._getVersion())
         else:
-            value = self._value
+            value = self._evaluate()
 
         if len(self.constraints) > 0:
             value = value.copy()
@@ -620,6 +656,33 @@ class Variable(object):
             for var in self.requiredVariables:
                 var.dontCacheMe(recursive=False)
 
+    def _evaluate(self, version=None):
+        """Cached value of `self`, recalculated if stale
+
+        If `version` is given, the value is fresh as of that version,
+        found before the value was calculated, rather than as of the
+        version found afterwards.
+        """
+        if self.stale or not self._isCached() or self._value is None:
+            if instrumentation._instruments:
+                value = instrumentation._calcValue(self)
+            else:
+                value = self._calcValue()
+            if self._isCached():
+                self._setValueInternal(value=value)
+            else:
+                self._setValueInternal(value=None)
+            if version is None:
+                self.stale = 0
+            else:
+                self._freshVersion = version
+            for counter in Variable._recomputeCounters:
+                counter._count(self)
+        else:
+            value = self._value
+
+        return value
+
     def _setValueInternal(self, value, unit=None, array=None):
         self._value = self._makeValue(value=value, unit=unit, array=array)
 
@@ -810,25 +873,95 @@ class Variable(object):
     subscribedVariables = property(_getSubscribedVariables,
                                    _setSubscribedVariables)
 
-    def __markStale(self):
-        for subscriber in self.subscribedVariables:
-            if subscriber() is not None:
-                ## Even though getSubscribedVariables() strips out dead
-                ## references, subscriber() might still be dead due to the
-                ## vagaries of garbage collection and the possibility that
-                ## later subscribedVariables were removed, changing the
-                ## dependencies of this subscriber.
-                ## See <https://github.com/usnistgov/fipy/issues/103> for more explanation.
-                subscriber()._markStale()
+    ## Staleness is tracked with generation counters, rather than by
+    ## walking `subscribedVariables` whenever a value changes. Every change
+    ## advances the global `_clock` and records it in `_changed`. The
+    ## version of a `Variable` is the latest `_changed` of itself and of
+    ## everything it requires, and it is stale if its version is newer than
+    ## the one it was last evaluated at. Versions are checked lazily, and
+    ## at most once per tick of the clock. The clock is advanced under a
+    ## lock, as variables may be evaluated by the threads that build terms,
+    ## and a version is stored together with the tick it was found at, so
+    ## that threads that find it at different ticks cannot mix the two.
+    ## While `_concurrency` is nonzero, each `Variable` is evaluated by one
+    ## thread at a time.
+
+    _clock = 0
+    _clockLock = threading.Lock()
+    _changed = 0
+    _freshVersion = -1
+    _checkedVersion = (-1, 0)
+    _concurrency = 0
+
+    @staticmethod
+    @contextlib.contextmanager
+    def _concurrentEvaluation():
+        """Context in which variables may be evaluated by several threads
+
+            >>> a = Variable(value=3)
+            >>> b = a * 4
+            >>> with Variable._concurrentEvaluation():
+            ...     print(Variable._concurrency, b.value)
+            1 12
+            >>> print(Variable._concurrency)
+            0
+        """
+        with Variable._clockLock:
+            Variable._concurrency += 1
+        try:
+            yield
+        finally:
+            with Variable._clockLock:
+                Variable._concurrency -= 1
+
+    @staticmethod
+    def _tick():
+        with Variable._clockLock:
+            Variable._clock += 1
+            return Variable._clock
+
+    def _getVersion(self):
+        """
+        Generation of the latest change to `self` or to any `Variable` it
+        requires
+
+            >>> a = Variable(value=3)
+            >>> b = a * 4
+            >>> version = b._getVersion()
+            >>> a.value = 5
+            >>> print(b._getVersion() > version)
+            True
+            >>> print(b._getVersion() == a._getVersion())
+            True
+        """
+        # a tick while the version is found leaves it to be checked again
+        clock = Variable._clock
+        checkedAt, version = self._checkedVersion
+        if checkedAt != clock:
+            version = self._changed
+            for var in self.requiredVariables:
+                version = max(version, var._getVersion())
+            self._checkedVersion = (clock, version)
+
+        return version
+
+    def _getStale(self):
+        return self._getVersion() > self._freshVersion
+
+    def _setStale(self, stale):
+        if stale:
+            self._changed = self._tick()
+        else:
+            self._freshVersion = self._getVersion()
+
+    stale = property(_getStale, _setStale)
 
     def _markFresh(self):
-        self.stale = 0
-        self.__markStale()
+        """The value of `self` has changed, so anything that requires it is stale"""
+        self._changed = self._freshVersion = self._tick()
 
     def _markStale(self):
-        if not self.stale:
-            self.stale = 1
-            self.__markStale()
+        self.stale = 1
 
     def _requires(self, var):
         if isinstance(var, Variable):
@@ -938,7 +1071,10 @@ class Variable(object):
             if resultShape == ():
                 argDict['result'] = numerix.reshape(argDict['result'], (1,))
 
-            inline._runInline(string, converters=None, comment=comment, **argDict)
+            if inline.doInline:
+                inline._runInline(string, converters=None, comment=comment, **argDict)
+            else:
+                inline._runKernel(string, comment=comment, **argDict)
 
             if resultShape == ():
                 argDict['result'] = numerix.reshape(argDict['result'], resultShape)
@@ -4,25 +4,82 @@ __docformat__ = 'restructuredtext'
 
 __all__ = []
 
-try:
-    from fipy.viewers.matplotlibViewer import *
-    __all__.extend(matplotlibViewer.__all__)
-except:
-    pass
-
-try:
-    from fipy.viewers.mayaviViewer import *
-    __all__.extend(mayaviViewer.__all__)
-except:
-    pass
-
-from fipy.viewers.multiViewer import *
-from fipy.viewers.tsvViewer import *
-from fipy.viewers.vtkViewer import *
-
-__all__.extend(multiViewer.__all__)
-__all__.extend(tsvViewer.__all__)
-__all__.extend(vtkViewer.__all__)
+import sys
+
+# the viewers of each submodule, which is only imported once one of them is used
+_lazyViewers = {
+    "matplotlibViewer": ["MatplotlibViewer",
+                         "Matplotlib1DViewer",
+                         "Matplotlib2DGridViewer",
+                         "Matplotlib2DGridContourViewer",
+                         "Matplotlib2DViewer",
+                         "MatplotlibVectorViewer",
+                         "MatplotlibStreamViewer"],
+    "mayaviViewer": ["MayaviClient"],
+    "multiViewer": ["MultiViewer"],
+    "tsvViewer": ["TSVViewer"],
+    "vtkViewer": ["VTKViewer", "VTKCellViewer", "VTKFaceViewer"]
+}
+
+for _names in _lazyViewers.values():
+    __all__.extend(_names)
+del _names
+
+def _importViewers(submodule):
+    import importlib
+    module = importlib.import_module("fipy.viewers." + submodule)
+    for name in _lazyViewers[submodule]:
+        globals()[name] = getattr(module, name)
+    return module
+
+def __getattr__(name):
+    """Import viewers on first use
+
+    Module attributes are only looked up lazily from Python 3.7.
+
+        >>> import importlib
+        >>> for submodule, names in sorted(_lazyViewers.items()):
+        ...     module = importlib.import_module("fipy.viewers." + submodule)
+        ...     print(submodule, sorted(module.__all__) == sorted(names))
+        matplotlibViewer True
+        mayaviViewer True
+        multiViewer True
+        tsvViewer True
+        vtkViewer True
+
+    `from fipy import *` does not import them; they must be imported by
+    name, or created with :func:`Viewer`.
+
+        >>> import subprocess
+        >>> script = "\\n".join(["import sys",
+        ...                     "from fipy import *",
+        ...                     "print([name for name in sys.modules",
+        ...                     "       if name.split('.')[-1] in _lazyViewers])",
+        ...                     "print('Matplotlib1DViewer' in dir())",
+        ...                     "from fipy import TSVViewer",
+        ...                     "print(TSVViewer.__module__)"])
+        >>> script = script.replace("_lazyViewers", repr(sorted(_lazyViewers)))
+        >>> output = subprocess.check_output([sys.executable, "-W", "ignore", "-c", script])
+        >>> print(output.decode('ascii').strip())
+        []
+        False
+        fipy.viewers.tsvViewer
+    """
+    for submodule, names in _lazyViewers.items():
+        if name == submodule:
+            return _importViewers(submodule)
+        elif name in names:
+            _importViewers(submodule)
+            return globals()[name]
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+if sys.version_info < (3, 7):
+    for _submodule in _lazyViewers:
+        try:
+            _importViewers(_submodule)
+        except:
+            __all__ = [name for name in __all__ if name not in _lazyViewers[_submodule]]
+    del _submodule
 
 # what about vector variables?
 
@@ -130,6 +187,7 @@ def Viewer(vars, title=None, limits={}, FIPY_VIEWER=None, **kwlimits):
         raise ImportError("Failed to import a viewer: %s" % str(errors))
 
     if len(viewers) > 1:
+        from fipy.viewers.multiViewer import MultiViewer
         return MultiViewer(viewers = viewers)
     else:
         return viewers[0]
@@ -31,6 +31,7 @@ def MatplotlibViewer(vars, title=None, limits={}, cmap=None, colorbar='vertical'
 
     >>> from matplotlib import pyplot as plt
     >>> from fipy import *
+    >>> from fipy import MultiViewer
 
     >>> plt.ion()
     >>> fig = plt.figure()
@@ -9,11 +9,17 @@ from fipy.tests.doctestPlus import _LateImportDocTestSuite
 import fipy.tests.testProgram
 
 def _suite():
-    return _LateImportDocTestSuite(testModuleNames = (
+    theSuite = _LateImportDocTestSuite(testModuleNames = (
         'vtkViewer.test',),
                                    docTestModuleNames = (
         'tsvViewer',
         ), base = __name__)
+    # the package itself
+    theSuite.addTest(_LateImportDocTestSuite(docTestModuleNames = (
+        'viewers',
+        ), base = 'fipy.viewers'))
+
+    return theSuite
 
 if __name__ == '__main__':
     fipy.tests.testProgram.main(defaultTest='_suite')